@@ -0,0 +1 @@
+# Fichier vide pour indiquer que le dossier est un package Python
@@ -0,0 +1,176 @@
+"""Outils du banc d'essai : répertoire de travail isolé, mesure des écritures disque et des updates"""
+import asyncio
+import builtins
+import os
+import time
+
+from modules.update_processor import PerChatUpdateProcessor
+from tools.generate_fixtures import FIRST_USER_ID, generate_access_codes, generate_catalog, write_json, write_users
+
+ADMIN_ID = 1
+
+# Fichiers écrits sans passer par open() : base SQLite (et son WAL) et journal du bot
+SIZE_TRACKED_SUFFIXES = ('.db', '.db-wal', '.db-journal', '.log')
+
+
+def percentile(values, fraction: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * fraction))]
+
+
+def write_workdir(workdir: str, api_url: str, users: int, categories: int, products: int, media: int,
+                  config_overrides: dict = None, seed: int = 0) -> list:
+    """Prépare config/ et data/ dans `workdir` pour une exécution du bot contre la fausse API
+
+    Les données viennent de tools/generate_fixtures.py : `categories` × `products` produits
+    de `media` photos chacun, tous les utilisateurs autorisés. Retourne leurs identifiants.
+    """
+    user_ids = [FIRST_USER_ID + i for i in range(users)]
+
+    config = {
+        "token": "123456:BENCH",
+        "admin_ids": [str(ADMIN_ID)],
+        "catalog_file": "config/catalog.json",
+        "bot_api_base_url": api_url,
+        "order_url": None,
+        "order_text": None,
+        "contact_username": None,
+        "contact_url": None,
+        "banner_image": None,
+        "welcome_message": "<b>Bienvenue</b>",
+        "info_button_enabled": True,
+        "info_message": "Informations",
+        "custom_buttons": [],
+        "log_level": "WARNING",
+        "log_file": "bot.log",
+        "broadcast_rate": 1000000.0,
+        "broadcast_concurrency": 100
+    }
+    config.update(config_overrides or {})
+
+    write_json(os.path.join(workdir, 'config', 'config.json'), config)
+    write_json(os.path.join(workdir, 'config', 'catalog.json'),
+               generate_catalog(categories, products, media, seed, video_ratio=0.0))
+    write_users(os.path.join(workdir, 'data', 'users.json'), users, seed + 1)
+    write_json(os.path.join(workdir, 'data', 'access_codes.json'),
+               generate_access_codes(users, seed + 2, admin_id=ADMIN_ID))
+    return user_ids
+
+
+class _CountingFile:
+    """Fichier ouvert en écriture : les octets écrits sont comptés à la fermeture"""
+
+    def __init__(self, file, counter, initial_size: int):
+        self._file = file
+        self._counter = counter
+        self._initial_size = initial_size
+
+    def close(self):
+        if not self._file.closed:
+            try:
+                self._file.flush()
+                self._counter.bytes_written += max(0, os.fstat(self._file.fileno()).st_size - self._initial_size)
+            except (OSError, ValueError):
+                pass
+        self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def __iter__(self):
+        return iter(self._file)
+
+    def __getattr__(self, name):
+        return getattr(self._file, name)
+
+
+class DiskWriteCounter:
+    """Octets écrits sur le disque sous `root` entre start() et stop()
+
+    Les fichiers ouverts en écriture avec open() sont mesurés à leur fermeture (taille
+    finale moins taille initiale ; une réécriture complète compte donc le fichier entier).
+    Les fichiers écrits hors de open() (SIZE_TRACKED_SUFFIXES) sont comptés par
+    l'augmentation de leur taille, ce qui sous-estime les réécritures de pages SQLite.
+    """
+
+    def __init__(self, root: str):
+        self.root = os.path.abspath(root)
+        self.bytes_written = 0
+        self._open = None
+        self._sizes = {}
+
+    def _tracked_sizes(self) -> dict:
+        sizes = {}
+        for directory, _, files in os.walk(self.root):
+            for name in files:
+                if name.endswith(SIZE_TRACKED_SUFFIXES):
+                    path = os.path.join(directory, name)
+                    try:
+                        sizes[path] = os.path.getsize(path)
+                    except OSError:
+                        pass
+        return sizes
+
+    def start(self) -> None:
+        self.bytes_written = 0
+        self._sizes = self._tracked_sizes()
+        self._open = builtins.open
+        original_open = self._open
+
+        def counting_open(file, mode='r', *args, **kwargs):
+            f = original_open(file, mode, *args, **kwargs)
+            if not isinstance(file, (str, bytes, os.PathLike)) or not any(flag in mode for flag in 'wax+'):
+                return f
+            path = os.path.abspath(os.fsdecode(file))
+            if not path.startswith(self.root) or path.endswith(SIZE_TRACKED_SUFFIXES):
+                return f
+            initial_size = os.fstat(f.fileno()).st_size if 'a' in mode or '+' in mode else 0
+            return _CountingFile(f, self, initial_size)
+
+        builtins.open = counting_open
+
+    def stop(self) -> int:
+        if self._open is not None:
+            builtins.open = self._open
+            self._open = None
+        for path, size in self._tracked_sizes().items():
+            self.bytes_written += max(0, size - self._sizes.get(path, 0))
+        return self.bytes_written
+
+
+class TimedUpdateProcessor(PerChatUpdateProcessor):
+    """Traitement par chat du bot, avec la durée de chaque update (hors attente du verrou du chat)"""
+
+    def __init__(self, max_concurrent_updates: int):
+        super().__init__(max_concurrent_updates)
+        self.latencies = []
+        self._expected = 0
+        self._done = None
+
+    def expect(self, count: int) -> None:
+        """Remet les mesures à zéro et attend `count` updates"""
+        self.latencies = []
+        self._expected = count
+        self._done = asyncio.Event()
+        if count == 0:
+            self._done.set()
+
+    async def wait(self, timeout: float) -> None:
+        await asyncio.wait_for(self._done.wait(), timeout)
+
+    async def _timed(self, coroutine):
+        started = time.perf_counter()
+        try:
+            await coroutine
+        finally:
+            self.latencies.append(time.perf_counter() - started)
+            if self._done is not None and len(self.latencies) >= self._expected:
+                self._done.set()
+
+    async def do_process_update(self, update, coroutine) -> None:
+        await super().do_process_update(update, self._timed(coroutine))
@@ -0,0 +1,173 @@
+"""Banc d'essai hors ligne : le vrai bot (main.build_application) contre une fausse API Telegram
+
+Usage (depuis la racine du dépôt) :
+    python -m bench.run                          toutes les charges, une par processus
+    python -m bench.run --scenario browse --count 5000 --concurrency 64
+    python -m bench.run --scenario broadcast --recipients 10000 --json
+
+Chaque charge tourne dans un répertoire de travail temporaire (config/, data/,
+catalogue et utilisateurs synthétiques). Les updates sont servis par getUpdates de
+tools/fake_telegram.py et traités par l'Application complète. Résultats : updates
+par seconde, latence p50/p99 du traitement d'un update et octets écrits sur le
+disque par update (écritures différées de l'arrêt comprises).
+"""
+import argparse
+import asyncio
+import importlib
+import json
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO_ROOT)
+
+from bench.harness import DiskWriteCounter, TimedUpdateProcessor, percentile, write_workdir
+from bench.workloads import WORKLOADS
+from tools.fake_telegram import FakeBotAPI
+
+
+async def _replay(api: FakeBotAPI, processor: TimedUpdateProcessor, updates: list, timeout: float) -> None:
+    processor.expect(len(updates))
+    for update in updates:
+        api.push_update(update)
+    await processor.wait(timeout)
+
+
+async def _wait_deliveries(api: FakeBotAPI, target: int, timeout: float) -> None:
+    deadline = time.monotonic() + timeout
+    while api.calls['sendMessage'] < target:
+        if time.monotonic() > deadline:
+            raise asyncio.TimeoutError(f"{api.calls['sendMessage']}/{target} messages envoyés")
+        await asyncio.sleep(0.01)
+
+
+async def run_scenario(name: str, args) -> dict:
+    """Exécute une charge dans ce processus (le module main ne peut être importé qu'une fois)"""
+    workdir = tempfile.mkdtemp(prefix=f"bench-{name}-")
+    api = FakeBotAPI('127.0.0.1', 0, latency=args.api_latency)
+    await api.start()
+    try:
+        users = args.recipients if name == 'broadcast' else args.users
+        user_ids = write_workdir(
+            workdir, api.base_url, users, args.categories, args.products, args.media,
+            {"storage_backend": args.storage, "concurrent_updates": args.concurrency}, args.seed
+        )
+        os.chdir(workdir)
+        bot = importlib.import_module('main')
+
+        processor = TimedUpdateProcessor(args.concurrency)
+        application = bot.build_application(update_processor=processor)
+        workload = WORKLOADS[name](bot, user_ids, args.count, args.seed)
+
+        counter = DiskWriteCounter(workdir)
+        await application.initialize()
+        await application.post_init(application)
+        await application.start()
+        await application.updater.start_polling(poll_interval=0.0, timeout=1)
+
+        await _replay(api, processor, workload.warmup, args.timeout)
+
+        counter.start()
+        api_calls = sum(api.calls.values())
+        target = api.calls['sendMessage'] + workload.deliveries
+        started = time.perf_counter()
+        await _replay(api, processor, workload.updates, args.timeout)
+        if workload.deliveries:
+            await _wait_deliveries(api, target, args.timeout)
+        elapsed = time.perf_counter() - started
+        latencies = list(processor.latencies)
+        api_calls = sum(api.calls.values()) - api_calls
+
+        await application.updater.stop()
+        await application.stop()
+        await application.shutdown()
+        await application.post_shutdown(application)
+        bytes_written = counter.stop()
+    finally:
+        await api.stop()
+        os.chdir(REPO_ROOT)
+        if not args.keep:
+            shutil.rmtree(workdir, ignore_errors=True)
+
+    count = len(workload.updates)
+    result = {
+        "scenario": name,
+        "updates": count,
+        "seconds": round(elapsed, 3),
+        "updates_per_second": round(count / elapsed, 1) if elapsed else 0.0,
+        "p50_ms": round(percentile(latencies, 0.50) * 1000, 2),
+        "p99_ms": round(percentile(latencies, 0.99) * 1000, 2),
+        "disk_bytes": bytes_written,
+        "disk_bytes_per_update": round(bytes_written / count, 1) if count else 0.0,
+        "api_calls": api_calls,
+    }
+    if workload.deliveries:
+        result["deliveries_per_second"] = round(workload.deliveries / elapsed, 1) if elapsed else 0.0
+    if args.keep:
+        result["workdir"] = workdir
+    return result
+
+
+def _run_isolated(name: str, argv: list) -> dict:
+    """Lance une charge dans un processus neuf et lit son résultat JSON"""
+    completed = subprocess.run(
+        [sys.executable, '-m', 'bench.run', '--scenario', name, '--json'] + argv,
+        cwd=REPO_ROOT, stdout=subprocess.PIPE, text=True
+    )
+    if completed.returncode != 0:
+        return {"scenario": name, "error": f"code de sortie {completed.returncode}"}
+    return json.loads(completed.stdout)
+
+
+def _print_table(results: list) -> None:
+    columns = ("scenario", "updates", "updates_per_second", "p50_ms", "p99_ms", "disk_bytes_per_update", "api_calls")
+    print("  ".join(f"{column:>22}" for column in columns))
+    for result in results:
+        if "error" in result:
+            print(f"{result['scenario']:>22}  erreur : {result['error']}")
+            continue
+        print("  ".join(f"{result[column]!s:>22}" for column in columns))
+        if "deliveries_per_second" in result:
+            print(f"{'':>22}  {result['deliveries_per_second']} envois/s")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--scenario', default='all', choices=['all'] + list(WORKLOADS))
+    parser.add_argument('--count', type=int, default=2000, help="updates mesurés par charge")
+    parser.add_argument('--users', type=int, default=200)
+    parser.add_argument('--recipients', type=int, default=10000, help="destinataires de la diffusion")
+    parser.add_argument('--categories', type=int, default=20)
+    parser.add_argument('--products', type=int, default=25, help="produits par catégorie")
+    parser.add_argument('--media', type=int, default=4, help="photos par produit")
+    parser.add_argument('--concurrency', type=int, default=32, help="updates traités en parallèle")
+    parser.add_argument('--api-latency', type=float, default=0.0, help="délai de chaque réponse de la fausse API (secondes)")
+    parser.add_argument('--storage', default='json', choices=['json', 'sqlite'])
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--timeout', type=float, default=600.0)
+    parser.add_argument('--keep', action='store_true', help="conserve le répertoire de travail")
+    parser.add_argument('--json', action='store_true', help="résultat au format JSON")
+    args = parser.parse_args()
+
+    if args.scenario == 'all':
+        argv = [arg for arg in sys.argv[1:] if arg != '--json']
+        if '--scenario' in argv:
+            index = argv.index('--scenario')
+            del argv[index:index + 2]
+        results = [_run_isolated(name, argv) for name in WORKLOADS]
+    else:
+        results = [asyncio.run(run_scenario(args.scenario, args))]
+
+    if args.json:
+        print(json.dumps(results[0] if len(results) == 1 and args.scenario != 'all' else results, indent=4))
+    else:
+        _print_table(results)
+    return 0 if all("error" not in result for result in results) else 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,103 @@
+"""Charges synthétiques rejouées par bench/run.py
+
+Chaque charge retourne un Workload : les updates de préparation (non mesurés, par
+exemple le /start qui ouvre la conversation), les updates mesurés et, pour une
+diffusion, le nombre d'envois attendus à la fausse API avant de considérer la
+mesure terminée. Les identifiants des catégories et produits viennent du module
+`main` déjà importé, pour construire les mêmes callback_data que le bot.
+"""
+import itertools
+import random
+from collections import namedtuple
+
+from bench.harness import ADMIN_ID
+from tools.fake_telegram import callback_update, message_update
+
+Workload = namedtuple('Workload', 'warmup updates deliveries')
+
+
+def _on_photo(update: dict, file_id: str) -> dict:
+    """Le bouton est cliqué sous un message photo (cas des fiches produit)"""
+    update['callback_query']['message'].pop('text', None)
+    update['callback_query']['message']['photo'] = [
+        {"file_id": file_id, "file_unique_id": f"u{file_id}", "width": 800, "height": 600}
+    ]
+    return update
+
+
+def _open_sessions(ids, user_ids) -> list:
+    """Un /start par utilisateur : les boutons suivants arrivent dans la conversation ouverte"""
+    return [message_update(next(ids), user_id, "/start") for user_id in user_ids]
+
+
+def start_storm(bot, user_ids, count: int, seed: int) -> Workload:
+    """Rafale de /start répartis sur tous les utilisateurs"""
+    rng = random.Random(seed)
+    ids = itertools.count(1)
+    updates = [message_update(next(ids), rng.choice(user_ids), "/start") for _ in range(count)]
+    return Workload([], updates, 0)
+
+
+def browse(bot, user_ids, count: int, seed: int) -> Workload:
+    """Navigation : liste des catégories, pages de produits d'une catégorie, retour à l'accueil"""
+    rng = random.Random(seed)
+    ids = itertools.count(1)
+    categories = [name for name, products in bot.CATALOG.items() if isinstance(products, list)]
+    warmup = _open_sessions(ids, user_ids)
+
+    updates = []
+    for _ in range(count):
+        user_id = rng.choice(user_ids)
+        roll = rng.random()
+        if roll < 0.25:
+            data = "show_categories"
+        elif roll < 0.3:
+            data = "back_to_home"
+        else:
+            data = bot.category_callback(bot.CB_VIEW_CATEGORY, rng.choice(categories), rng.randrange(2))
+        updates.append(callback_update(next(ids), user_id, data))
+    return Workload(warmup, updates, 0)
+
+
+def media_swipe(bot, user_ids, count: int, seed: int) -> Workload:
+    """Fiche produit puis défilement de ses médias, message photo édité sur place"""
+    rng = random.Random(seed)
+    ids = itertools.count(1)
+    products = [product for product in bot.product_index.products() if len(product.get('media') or []) > 1]
+    warmup = _open_sessions(ids, user_ids)
+
+    updates = []
+    while len(updates) < count:
+        user_id = rng.choice(user_ids)
+        product = rng.choice(products)
+        media = product['media']
+        updates.append(_on_photo(
+            callback_update(next(ids), user_id, bot.product_callback(bot.CB_PRODUCT, product['id'])),
+            media[0]['media_id']
+        ))
+        for index in range(1, len(media)):
+            updates.append(_on_photo(
+                callback_update(next(ids), user_id, bot.product_callback(bot.CB_MEDIA, product['id'], index)),
+                media[index - 1]['media_id']
+            ))
+    return Workload(warmup, updates[:count], 0)
+
+
+def broadcast(bot, user_ids, count: int, seed: int) -> Workload:
+    """Diffusion d'un message texte par l'admin à tous les utilisateurs autorisés"""
+    ids = itertools.count(1)
+    warmup = [
+        message_update(next(ids), ADMIN_ID, "/admin"),
+        callback_update(next(ids), ADMIN_ID, "start_broadcast")
+    ]
+    updates = [message_update(next(ids), ADMIN_ID, "Annonce du banc d'essai")]
+    # Un message de progression puis un envoi par destinataire
+    return Workload(warmup, updates, 1 + len(user_ids))
+
+
+WORKLOADS = {
+    "start_storm": start_storm,
+    "browse": browse,
+    "media_swipe": media_swipe,
+    "broadcast": broadcast,
+}
@@ -0,0 +1,142 @@
+import logging
+import time
+import asyncio
+from collections import deque
+from telegram.error import RetryAfter
+
+logger = logging.getLogger(__name__)
+
+
+def _retry_delay(error: RetryAfter) -> float:
+    """Durée d'attente demandée par Telegram (int ou timedelta selon la version)"""
+    delay = error.retry_after
+    if hasattr(delay, 'total_seconds'):
+        delay = delay.total_seconds()
+    return float(delay)
+
+
+class TokenBucket:
+    """Limiteur de débit global : `rate` envois par seconde, avec une rafale de `capacity`"""
+
+    def __init__(self, rate: float, capacity: float = None):
+        self.rate = rate
+        self.capacity = capacity or rate
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    async def acquire(self) -> None:
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+                self._updated = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                await asyncio.sleep((1 - self._tokens) / self.rate)
+
+
+class BroadcastResult:
+    def __init__(self, total: int):
+        self.total = total
+        self.success = 0
+        self.failed = 0
+        self.message_ids = {}
+
+    @property
+    def done(self) -> int:
+        return self.success + self.failed
+
+
+def default_progress_text(result: BroadcastResult) -> str:
+    return (
+        f"📤 <b>Envoi du message en cours...</b>\n\n"
+        f"{result.done}/{result.total} traités "
+        f"({result.success} succès, {result.failed} échecs)"
+    )
+
+
+class BroadcastEngine:
+    """Envoie un message à une liste de destinataires en parallèle, en respectant les limites de Telegram"""
+
+    def __init__(self, rate: float = 25.0, concurrency: int = 20, max_retries: int = 3, progress_interval: float = 3.0):
+        self.rate = rate
+        self.concurrency = concurrency
+        self.max_retries = max_retries
+        self.progress_interval = progress_interval
+        # Un seul seau partagé : plusieurs diffusions simultanées se partagent la limite globale du bot
+        self.bucket = TokenBucket(rate)
+
+    async def _deliver(self, chat_id, send, result: BroadcastResult):
+        for attempt in range(self.max_retries + 1):
+            await self.bucket.acquire()
+            try:
+                sent = await send(chat_id)
+            except RetryAfter as e:
+                # Seul ce destinataire attend : les autres envois continuent au rythme du seau global
+                if attempt < self.max_retries:
+                    await asyncio.sleep(_retry_delay(e))
+                    continue
+                logger.warning(f"Abandon de l'envoi à {chat_id} après {attempt + 1} tentatives (flood control)")
+            except Exception as e:
+                logger.warning(f"Error sending to user {chat_id}: {e}")
+            else:
+                if sent is not None and hasattr(sent, 'message_id'):
+                    result.message_ids[str(chat_id)] = sent.message_id
+                result.success += 1
+                return
+            break
+        result.failed += 1
+
+    async def _worker(self, queue, send, result: BroadcastResult):
+        while True:
+            try:
+                chat_id = queue.popleft()
+            except IndexError:
+                return
+            await self._deliver(chat_id, send, result)
+
+    async def _report_progress(self, progress_message, result: BroadcastResult, progress_text):
+        last_text = None
+        while True:
+            await asyncio.sleep(self.progress_interval)
+            text = progress_text(result)
+            if text == last_text:
+                continue
+            try:
+                await progress_message.edit_text(text, parse_mode='HTML')
+                last_text = text
+            except RetryAfter as e:
+                await asyncio.sleep(_retry_delay(e))
+            except Exception as e:
+                logger.warning(f"Erreur lors de la mise à jour de la progression : {e}")
+
+    async def run(self, recipients, send, progress_message=None, progress_text=default_progress_text) -> BroadcastResult:
+        """Envoie à tous les destinataires et retourne le rapport d'envoi
+
+        `send(chat_id)` est une coroutine qui effectue l'appel à l'API pour un destinataire.
+        """
+        queue = deque(recipients)
+        result = BroadcastResult(len(queue))
+
+        reporter = None
+        if progress_message is not None and self.progress_interval:
+            reporter = asyncio.create_task(self._report_progress(progress_message, result, progress_text))
+
+        try:
+            workers = [
+                asyncio.create_task(self._worker(queue, send, result))
+                for _ in range(min(self.concurrency, len(queue)))
+            ]
+            if workers:
+                await asyncio.gather(*workers)
+        finally:
+            if reporter is not None:
+                reporter.cancel()
+                try:
+                    await reporter
+                except asyncio.CancelledError:
+                    pass
+
+        return result
@@ -1,68 +1,88 @@
-﻿import json
-import pytz  
+﻿import logging
+import copy
+import json
 import asyncio
 from datetime import datetime
 from telegram import Update, InlineKeyboardButton, InlineKeyboardMarkup
 from telegram.ext import ContextTypes
+from telegram.error import RetryAfter
+from broadcast.engine import BroadcastEngine
+from users.registry import UserRegistry
+
+logger = logging.getLogger(__name__)
 
 class AdminFeatures:
-    def __init__(self, users_file: str = 'data/users.json', access_codes_file: str = 'data/access_codes.json', broadcasts_file: str = 'data/broadcasts.json'):
+    def __init__(self, users_file: str = 'data/users.json', access_codes_file: str = 'data/access_codes.json', broadcasts_file: str = 'data/broadcasts.json',
+                 users_flush_interval: float = 30.0, users_flush_threshold: int = 50,
+                 broadcast_rate: float = 25.0, broadcast_concurrency: int = 20, backend=None, executor=None):
         self.users_file = users_file
         self.access_codes_file = access_codes_file
         self.broadcasts_file = broadcasts_file
-        self._users = self._load_users()
+        # Backend SQLite optionnel : remplace les fichiers JSON des utilisateurs, codes d'accès et diffusions
+        self.backend = backend
+        # Exécuteur d'E/S optionnel : lectures et écritures hors de la boucle d'événements
+        self.executor = executor
+        self.user_registry = UserRegistry(users_file, users_flush_interval, users_flush_threshold,
+                                          backend=backend, executor=executor)
+        self._users = self.user_registry.users
+        self.broadcast_engine = BroadcastEngine(rate=broadcast_rate, concurrency=broadcast_concurrency)
         self._access_codes = self._load_access_codes()
         self.broadcasts = self._load_broadcasts()
 
     def _load_access_codes(self):
         """Charge les codes d'accès depuis le fichier"""
+        if self.backend is not None:
+            return self.backend.load_access_codes()
         try:
             with open(self.access_codes_file, 'r', encoding='utf-8') as f:
                 data = json.load(f)
                 return data
         except FileNotFoundError:
-            print(f"Access codes file not found: {self.access_codes_file}")
+            logger.warning(f"Access codes file not found: {self.access_codes_file}")
             return {"authorized_users": []}
         except json.JSONDecodeError as e:
-            print(f"Error decoding access codes file: {e}")
+            logger.error(f"Error decoding access codes file: {e}")
             return {"authorized_users": []}
         except Exception as e:
-            print(f"Unexpected error loading access codes: {e}")
+            logger.error(f"Unexpected error loading access codes: {e}")
             return {"authorized_users": []}
 
-    def is_user_authorized(self, user_id: int) -> bool:
+    async def _run(self, func, *args):
+        if self.executor is None:
+            return func(*args)
+        return await self.executor.run(func, *args)
+
+    async def is_user_authorized(self, user_id: int) -> bool:
         """Vérifie si l'utilisateur est autorisé"""
         # Recharger les codes d'accès à chaque vérification
-        self._access_codes = self._load_access_codes()
+        await self.reload_access_codes()
         
         # Convertir l'ID en nombre et vérifier sa présence
         return int(user_id) in self._access_codes.get("authorized_users", [])
 
-    def is_user_banned(self, user_id: int) -> bool:
+    async def is_user_banned(self, user_id: int) -> bool:
         """Vérifie si l'utilisateur est banni"""
-        self._access_codes = self._load_access_codes()
+        await self.reload_access_codes()
         return int(user_id) in self._access_codes.get("banned_users", [])
 
-    def reload_access_codes(self):
+    async def reload_access_codes(self):
         """Recharge les codes d'accès depuis le fichier"""
-        self._access_codes = self._load_access_codes()
+        self._access_codes = await self._run(self._load_access_codes)
         return self._access_codes.get("authorized_users", [])
 
-    def _load_users(self):
-        """Charge les utilisateurs depuis le fichier"""
-        try:
-            with open(self.users_file, 'r', encoding='utf-8') as f:
-                return json.load(f)
-        except FileNotFoundError:
-            return {}
+    async def get_broadcast_recipients(self, exclude_user_id: int = None) -> list:
+        """Calcule une seule fois l'audience d'une diffusion : autorisés, moins bannis, moins l'expéditeur"""
+        await self.reload_access_codes()
+        eligible = set(self._access_codes.get("authorized_users", []))
+        eligible.difference_update(self._access_codes.get("banned_users", []))
+        if exclude_user_id is not None:
+            eligible.discard(int(exclude_user_id))
+
+        return [user_id for user_id in self._users.keys() if int(user_id) in eligible]
 
     def _save_users(self):
-        """Sauvegarde les utilisateurs"""
-        try:
-            with open(self.users_file, 'w', encoding='utf-8') as f:
-                json.dump(self._users, f, indent=4, ensure_ascii=False)
-        except Exception as e:
-            print(f"Erreur lors de la sauvegarde des utilisateurs : {e}")
+        """Sauvegarde immédiatement les utilisateurs modifiés"""
+        self.user_registry.flush_now()
 
     def _create_message_keyboard(self):
         """Crée le clavier standard pour les messages"""
@@ -72,6 +92,8 @@ class AdminFeatures:
 
     def _load_broadcasts(self):
         """Charge les broadcasts depuis le fichier"""
+        if self.backend is not None:
+            return self.backend.load_broadcasts()
         try:
             with open(self.broadcasts_file, 'r', encoding='utf-8') as f:
                 broadcasts = json.load(f)
@@ -89,24 +111,35 @@ class AdminFeatures:
         except FileNotFoundError:
             return {}
         except json.JSONDecodeError:
-            print("Erreur de décodage JSON, création d'un nouveau fichier broadcasts")
+            logger.error("Erreur de décodage JSON, création d'un nouveau fichier broadcasts")
             return {}
 
-    def _save_broadcasts(self):
+    def _write_file(self, path: str, data: str):
+        with open(path, 'w', encoding='utf-8') as f:
+            f.write(data)
+
+    async def _save_broadcasts(self):
         """Sauvegarde les broadcasts"""
+        # Les données sont copiées ou sérialisées ici, avant de quitter la boucle d'événements
         try:
-            with open(self.broadcasts_file, 'w', encoding='utf-8') as f:
-                json.dump(self.broadcasts, f, indent=4, ensure_ascii=False)
+            if self.backend is not None:
+                await self._run(self.backend.save_broadcasts, copy.deepcopy(self.broadcasts))
+                return
+            data = json.dumps(self.broadcasts, indent=4, ensure_ascii=False)
+            await self._run(self._write_file, self.broadcasts_file, data)
         except Exception as e:
-            print(f"Erreur lors de la sauvegarde des broadcasts : {e}")
+            logger.error(f"Erreur lors de la sauvegarde des broadcasts : {e}")
 
-    def _save_access_codes(self):
+    async def _save_access_codes(self):
         """Sauvegarde les codes d'accès"""
         try:
-            with open(self.access_codes_file, 'w', encoding='utf-8') as f:
-                json.dump(self._access_codes, f, indent=4)
+            if self.backend is not None:
+                await self._run(self.backend.save_access_codes, copy.deepcopy(self._access_codes))
+                return
+            data = json.dumps(self._access_codes, indent=4)
+            await self._run(self._write_file, self.access_codes_file, data)
         except Exception as e:
-            print(f"Erreur lors de la sauvegarde des codes d'accès : {e}")
+            logger.error(f"Erreur lors de la sauvegarde des codes d'accès : {e}")
 
     async def ban_user(self, user_id: int, context: ContextTypes.DEFAULT_TYPE = None) -> bool:
         """Banni un utilisateur"""
@@ -117,7 +150,7 @@ class AdminFeatures:
             # Retirer l'utilisateur des codes d'accès s'il y est
             if user_id in self._access_codes.get("authorized_users", []):
                 self._access_codes["authorized_users"].remove(user_id)
-                self._save_access_codes()
+                await self._save_access_codes()
 
             # Ajouter l'utilisateur à la liste des bannis si elle existe, sinon la créer
             if "banned_users" not in self._access_codes:
@@ -125,7 +158,7 @@ class AdminFeatures:
         
             if user_id not in self._access_codes["banned_users"]:
                 self._access_codes["banned_users"].append(user_id)
-                self._save_access_codes()
+                await self._save_access_codes()
         
             # Si on a le context, on supprime les messages précédents
             if context and hasattr(context, 'user_data'):
@@ -150,14 +183,14 @@ class AdminFeatures:
                             )
                             del context.user_data[message_key]
                         except Exception as e:
-                            print(f"Erreur lors de la suppression du message {message_key}: {e}")
+                            logger.warning(f"Erreur lors de la suppression du message {message_key}: {e}")
             
                 # Vider toutes les données utilisateur
                 context.user_data.clear()
         
             return True
         except Exception as e:
-            print(f"Erreur lors du bannissement de l'utilisateur : {e}")
+            logger.error(f"Erreur lors du bannissement de l'utilisateur : {e}")
             return False
 
     async def unban_user(self, user_id: int) -> bool:
@@ -166,10 +199,10 @@ class AdminFeatures:
             user_id = int(user_id)
             if "banned_users" in self._access_codes and user_id in self._access_codes["banned_users"]:
                 self._access_codes["banned_users"].remove(user_id)
-                self._save_access_codes()
+                await self._save_access_codes()
             return True
         except Exception as e:
-            print(f"Erreur lors du débannissement de l'utilisateur : {e}")
+            logger.error(f"Erreur lors du débannissement de l'utilisateur : {e}")
             return False
 
     async def show_banned_users(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
@@ -220,14 +253,14 @@ class AdminFeatures:
             return "CHOOSING"
         
         except Exception as e:
-            print(f"Erreur dans show_banned_users : {e}")
+            logger.error(f"Erreur dans show_banned_users : {e}")
             return "CHOOSING"
 
     async def handle_ban_command(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
         """Gère la commande /ban"""
         try:
             # Vérifier si l'utilisateur est admin
-            if not self.is_user_authorized(update.effective_user.id):
+            if not await self.is_user_authorized(update.effective_user.id):
                 return
 
             # Vérifier les arguments
@@ -266,7 +299,7 @@ class AdminFeatures:
                     except Exception:
                         continue
             except Exception as e:
-                print(f"Erreur lors de la suppression des messages: {e}")
+                logger.warning(f"Erreur lors de la suppression des messages: {e}")
 
             # Bannir l'utilisateur
             if await self.ban_user(target_user_id, context):
@@ -290,7 +323,7 @@ class AdminFeatures:
             await message.delete()
 
         except Exception as e:
-            print(f"Erreur dans handle_ban_command: {e}")
+            logger.error(f"Erreur dans handle_ban_command: {e}")
             message = await context.bot.send_message(
                 chat_id=update.effective_chat.id,
                 text="❌ Une erreur est survenue"
@@ -320,22 +353,12 @@ class AdminFeatures:
                 await query.answer("❌ Erreur lors du débannissement.")
             
         except Exception as e:
-            print(f"Erreur dans handle_unban_callback : {e}")
+            logger.error(f"Erreur dans handle_unban_callback : {e}")
             await query.answer("❌ Une erreur est survenue.")
 
     async def register_user(self, user):
-        """Enregistre ou met à jour un utilisateur"""
-        user_id = str(user.id)
-        paris_tz = pytz.timezone('Europe/Paris')
-        paris_time = datetime.utcnow().replace(tzinfo=pytz.UTC).astimezone(paris_tz)
-        
-        self._users[user_id] = {
-            'username': user.username,
-            'first_name': user.first_name,
-            'last_name': user.last_name,
-            'last_seen': paris_time.strftime("%Y-%m-%d %H:%M:%S")
-        }
-        self._save_users()
+        """Enregistre ou met à jour un utilisateur (écriture différée)"""
+        self.user_registry.touch(user)
 
     async def handle_broadcast(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
         """Démarre le processus de diffusion"""
@@ -358,7 +381,7 @@ class AdminFeatures:
             context.user_data['instruction_message_id'] = message.message_id
             return "WAITING_BROADCAST_MESSAGE"
         except Exception as e:
-            print(f"Erreur dans handle_broadcast : {e}")
+            logger.error(f"Erreur dans handle_broadcast : {e}")
             return "CHOOSING"
 
     async def manage_broadcasts(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
@@ -450,7 +473,7 @@ class AdminFeatures:
                         message_id=context.user_data['instruction_message_id']
                     )
             except Exception as e:
-                print(f"Error deleting messages: {e}")
+                logger.warning(f"Error deleting messages: {e}")
 
             admin_id = update.effective_user.id
             new_content = update.message.text if update.message.text else update.message.caption if update.message.caption else "Media sans texte"
@@ -472,54 +495,43 @@ class AdminFeatures:
             broadcast['content'] = new_content
             broadcast['entities'] = new_entities
 
-            success = 0
-            failed = 0
-            messages_updated = []
-        
-            # Tenter de modifier les messages existants
-            for user_id, msg_id in broadcast['message_ids'].items():
-                if int(user_id) == admin_id:  # Skip l'admin
-                    continue
-                try:
-                    await context.bot.edit_message_text(
-                        chat_id=user_id,
-                        message_id=msg_id,
-                        text=new_content,
-                        entities=update.message.entities,
-                        reply_markup=self._create_message_keyboard()
-                    )
-                    success += 1
-                    messages_updated.append(user_id)
-                except Exception as e:
-                    print(f"Error updating message for user {user_id}: {e}")
-                    failed += 1
-
-            # Pour les utilisateurs qui n'ont pas reçu le message
-            for user_id in self._users.keys():
-                if (str(user_id) not in messages_updated and 
-                    self.is_user_authorized(int(user_id)) and 
-                    int(user_id) != admin_id):  # Skip l'admin
+            entities = update.message.entities
+            message_ids = broadcast['message_ids']
+            eligible = set(await self.get_broadcast_recipients(exclude_user_id=admin_id))
+            # Les messages déjà envoyés sont modifiés, les nouveaux autorisés reçoivent un nouveau message
+            recipients = [user_id for user_id in message_ids if int(user_id) != admin_id]
+            recipients += [user_id for user_id in eligible if user_id not in message_ids]
+
+            async def send(user_id):
+                msg_id = message_ids.get(user_id)
+                if msg_id is not None:
                     try:
-                        sent_msg = await context.bot.send_message(
+                        return await context.bot.edit_message_text(
                             chat_id=user_id,
+                            message_id=msg_id,
                             text=new_content,
-                            entities=update.message.entities,
+                            entities=entities,
                             reply_markup=self._create_message_keyboard()
                         )
-                        broadcast['message_ids'][str(user_id)] = sent_msg.message_id
-                        success += 1
+                    except RetryAfter:
+                        raise
                     except Exception as e:
-                        print(f"Error sending new message to user {user_id}: {e}")
-                        failed += 1
-
-            self._save_broadcasts()
+                        logger.warning(f"Error updating message for user {user_id}: {e}")
+                        if user_id not in eligible:
+                            raise
+                return await context.bot.send_message(
+                    chat_id=user_id,
+                    text=new_content,
+                    entities=entities,
+                    reply_markup=self._create_message_keyboard()
+                )
 
             # Créer la bannière de gestion des annonces
             keyboard = []
             if self.broadcasts:
-                for b_id, broadcast in self.broadcasts.items():
+                for b_id, b in self.broadcasts.items():
                     keyboard.append([InlineKeyboardButton(
-                        f"📢 {broadcast['content'][:30]}...",
+                        f"📢 {b['content'][:30]}...",
                         callback_data=f"edit_broadcast_{b_id}"
                     )])
         
@@ -535,28 +547,41 @@ class AdminFeatures:
                 reply_markup=InlineKeyboardMarkup(keyboard)
             )
 
-            # Message de confirmation avec le contenu
-            confirmation_message = await context.bot.send_message(
+            progress_message = await context.bot.send_message(
                 chat_id=update.effective_chat.id,
-                text=f"✅ Message modifié ({success} succès, {failed} échecs)\n\n"
-                     f"📝 *Contenu de l'annonce :*\n{new_content}",
-                parse_mode='Markdown'
+                text="📤 <b>Modification de l'annonce en cours...</b>",
+                parse_mode='HTML'
             )
 
-            # Programmer la suppression du message après 3 secondes
-            async def delete_message():
+            async def run_edit():
+                result = await self.broadcast_engine.run(recipients, send, progress_message)
+                message_ids.update(result.message_ids)
+                await self._save_broadcasts()
+
+                # Message de confirmation avec le contenu
+                try:
+                    await progress_message.edit_text(
+                        f"✅ Message modifié ({result.success} succès, {result.failed} échecs)\n\n"
+                        f"📝 *Contenu de l'annonce :*\n{new_content}",
+                        parse_mode='Markdown'
+                    )
+                except Exception as e:
+                    logger.warning(f"Error editing confirmation message: {e}")
+
+                # Supprimer la confirmation après 3 secondes
                 await asyncio.sleep(3)
                 try:
-                    await confirmation_message.delete()
+                    await progress_message.delete()
                 except Exception as e:
-                    print(f"Error deleting confirmation message: {e}")
+                    logger.warning(f"Error deleting confirmation message: {e}")
 
-            asyncio.create_task(delete_message())
+            # La diffusion tourne en arrière-plan pour ne pas bloquer l'admin
+            context.application.create_task(run_edit(), update=update)
 
             return "CHOOSING"
 
         except Exception as e:
-            print(f"Error in handle_broadcast_edit: {e}")
+            logger.error(f"Error in handle_broadcast_edit: {e}")
             return "CHOOSING"
 
     async def resend_broadcast(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
@@ -574,61 +599,55 @@ class AdminFeatures:
             return "CHOOSING"
 
         broadcast = self.broadcasts[broadcast_id]
-        success = 0
-        failed = 0
+        message_text = broadcast.get('content', '')
+        is_photo = broadcast['type'] == 'photo' and broadcast['file_id']
 
         progress_message = await query.edit_message_text(
             "📤 *Renvoi de l'annonce en cours...*",
             parse_mode='Markdown'
         )
 
-        for user_id in self._users.keys():
-            user_id_int = int(user_id)
-            if not self.is_user_authorized(user_id_int):
-                print(f"User {user_id_int} not authorized")
-                continue
-        
-            try:
-                if broadcast['type'] == 'photo' and broadcast['file_id']:
-                    await context.bot.send_photo(
-                        chat_id=user_id,
-                        photo=broadcast['file_id'],
-                        caption=broadcast['caption'] if broadcast['caption'] else '',
-                        parse_mode='Markdown',  # Ajout du parse_mode
-                        reply_markup=self._create_message_keyboard()
-                    )
-                else:
-                    message_text = broadcast.get('content', '')
-                    if not message_text:
-                        print(f"No content found for broadcast {broadcast_id}")
-                        continue
-        
-                    await context.bot.send_message(
-                        chat_id=user_id,
-                        text=message_text,
-                        parse_mode='Markdown',  # Ajout du parse_mode
-                        reply_markup=self._create_message_keyboard()
-                    )
-                success += 1
-                print(f"Successfully sent to user {user_id}")
-            except Exception as e:
-                print(f"Error sending to user {user_id}: {e}")
-                failed += 1
-
-        keyboard = [
-            [InlineKeyboardButton("📢 Retour aux annonces", callback_data="manage_broadcasts")],
-            [InlineKeyboardButton("🔙 Menu admin", callback_data="admin")]
-        ]
-
-        await progress_message.edit_text(
-            f"✅ *Annonce renvoyée !*\n\n"
-            f"📊 *Rapport d'envoi :*\n"
-            f"• Envois réussis : {success}\n"
-            f"• Échecs : {failed}\n"
-            f"• Total : {success + failed}",
-            parse_mode='Markdown',
-            reply_markup=InlineKeyboardMarkup(keyboard)
-        )
+        recipients = await self.get_broadcast_recipients()
+        if not is_photo and not message_text:
+            logger.warning(f"No content found for broadcast {broadcast_id}")
+            recipients = []
+
+        async def send(user_id):
+            if is_photo:
+                return await context.bot.send_photo(
+                    chat_id=user_id,
+                    photo=broadcast['file_id'],
+                    caption=broadcast['caption'] if broadcast['caption'] else '',
+                    parse_mode='Markdown',  # Ajout du parse_mode
+                    reply_markup=self._create_message_keyboard()
+                )
+            return await context.bot.send_message(
+                chat_id=user_id,
+                text=message_text,
+                parse_mode='Markdown',  # Ajout du parse_mode
+                reply_markup=self._create_message_keyboard()
+            )
+
+        async def run_resend():
+            result = await self.broadcast_engine.run(recipients, send, progress_message)
+
+            keyboard = [
+                [InlineKeyboardButton("📢 Retour aux annonces", callback_data="manage_broadcasts")],
+                [InlineKeyboardButton("🔙 Menu admin", callback_data="admin")]
+            ]
+
+            await progress_message.edit_text(
+                f"✅ *Annonce renvoyée !*\n\n"
+                f"📊 *Rapport d'envoi :*\n"
+                f"• Envois réussis : {result.success}\n"
+                f"• Échecs : {result.failed}\n"
+                f"• Total : {result.total}",
+                parse_mode='Markdown',
+                reply_markup=InlineKeyboardMarkup(keyboard)
+            )
+
+        # La diffusion tourne en arrière-plan pour ne pas bloquer l'admin
+        context.application.create_task(run_resend(), update=update)
 
         return "CHOOSING"
 
@@ -639,7 +658,7 @@ class AdminFeatures:
         
         if broadcast_id in self.broadcasts:
             del self.broadcasts[broadcast_id]
-            self._save_broadcasts()  # Sauvegarder après suppression
+            await self._save_broadcasts()  # Sauvegarder après suppression
         await query.edit_message_text(
             "✅ *L'annonce a été supprimée avec succès !*",
             parse_mode='Markdown',
@@ -652,10 +671,7 @@ class AdminFeatures:
 
     async def send_broadcast_message(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
         """Envoie le message aux utilisateurs autorisés"""
-        success = 0
-        failed = 0
         chat_id = update.effective_chat.id
-        message_ids = {}  # Pour stocker les IDs des messages envoyés
 
         try:
             # Supprimer les messages précédents
@@ -667,7 +683,7 @@ class AdminFeatures:
                         message_id=context.user_data['instruction_message_id']
                     )
             except Exception as e:
-                print(f"Erreur lors de la suppression du message: {e}")
+                logger.warning(f"Erreur lors de la suppression du message: {e}")
 
             # Enregistrer le broadcast
             broadcast_id = str(datetime.now().timestamp())
@@ -696,6 +712,8 @@ class AdminFeatures:
                 'parse_mode': None  # On n'utilise plus parse_mode car on utilise les entités
             }
 
+            broadcast = self.broadcasts[broadcast_id]
+
             # Message de progression
             progress_message = await context.bot.send_message(
                 chat_id=chat_id,
@@ -703,58 +721,58 @@ class AdminFeatures:
                 parse_mode='HTML'
             )
 
-            # Envoi aux utilisateurs autorisés
-            for user_id in self._users.keys():
-                user_id_int = int(user_id)
-                if not self.is_user_authorized(user_id_int) or user_id_int == update.effective_user.id:  # Skip non-autorisés et admin
-                    print(f"User {user_id_int} skipped")
-                    continue
-            
-                try:
-                    if update.message.photo:
-                        sent_msg = await context.bot.send_photo(
-                            chat_id=user_id,
-                            photo=update.message.photo[-1].file_id,
-                            caption=update.message.caption if update.message.caption else '',
-                            caption_entities=update.message.caption_entities,
-                            reply_markup=self._create_message_keyboard()
-                        )
-                    else:
-                        sent_msg = await context.bot.send_message(
-                            chat_id=user_id,
-                            text=message_content,
-                            entities=update.message.entities,
-                            reply_markup=self._create_message_keyboard()
-                        )
-                    self.broadcasts[broadcast_id]['message_ids'][str(user_id)] = sent_msg.message_id  # Assurer que user_id est un string
-                    success += 1
-                except Exception as e:
-                    print(f"Error sending to user {user_id}: {e}")
-                    failed += 1
+            # Envoi aux utilisateurs autorisés (hors admin)
+            sender_id = update.effective_user.id
+            recipients = await self.get_broadcast_recipients(exclude_user_id=sender_id)
 
-            # Sauvegarder les broadcasts
-            self._save_broadcasts()
+            message = update.message
 
-            # Rapport final
-            keyboard = [
-                [InlineKeyboardButton("📢 Gérer les annonces", callback_data="manage_broadcasts")],
-                [InlineKeyboardButton("🔙 Menu admin", callback_data="admin")]
-            ]
+            async def send(user_id):
+                if message.photo:
+                    return await context.bot.send_photo(
+                        chat_id=user_id,
+                        photo=message.photo[-1].file_id,
+                        caption=message.caption if message.caption else '',
+                        caption_entities=message.caption_entities,
+                        reply_markup=self._create_message_keyboard()
+                    )
+                return await context.bot.send_message(
+                    chat_id=user_id,
+                    text=message_content,
+                    entities=message.entities,
+                    reply_markup=self._create_message_keyboard()
+                )
 
-            await progress_message.edit_text(
-                f"✅ *Message envoyé avec succès !*\n\n"
-                f"📊 *Rapport d'envoi :*\n"
-                f"• Envois réussis : {success}\n"
-                f"• Échecs : {failed}\n"
-                f"• Total : {success + failed}",
-                parse_mode='Markdown',
-                reply_markup=InlineKeyboardMarkup(keyboard)
-            )
+            async def run_broadcast():
+                result = await self.broadcast_engine.run(recipients, send, progress_message)
+                broadcast['message_ids'].update(result.message_ids)
+
+                # Sauvegarder les broadcasts
+                await self._save_broadcasts()
+
+                # Rapport final
+                keyboard = [
+                    [InlineKeyboardButton("📢 Gérer les annonces", callback_data="manage_broadcasts")],
+                    [InlineKeyboardButton("🔙 Menu admin", callback_data="admin")]
+                ]
+
+                await progress_message.edit_text(
+                    f"✅ *Message envoyé avec succès !*\n\n"
+                    f"📊 *Rapport d'envoi :*\n"
+                    f"• Envois réussis : {result.success}\n"
+                    f"• Échecs : {result.failed}\n"
+                    f"• Total : {result.total}",
+                    parse_mode='Markdown',
+                    reply_markup=InlineKeyboardMarkup(keyboard)
+                )
+
+            # La diffusion tourne en arrière-plan pour ne pas bloquer l'admin
+            context.application.create_task(run_broadcast(), update=update)
 
             return "CHOOSING"
 
         except Exception as e:
-            print(f"Erreur lors de l'envoi du broadcast : {e}")
+            logger.error(f"Erreur lors de l'envoi du broadcast : {e}")
             return "CHOOSING"
 
     async def handle_user_management(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
@@ -886,7 +904,7 @@ class AdminFeatures:
             return "CHOOSING"
 
         except Exception as e:
-            print(f"Erreur dans handle_user_management : {e}")
+            logger.error(f"Erreur dans handle_user_management : {e}")
             await update.callback_query.edit_message_text(
                 "Erreur lors de l'affichage des utilisateurs.",
                 reply_markup=InlineKeyboardMarkup([[
@@ -900,5 +918,5 @@ class AdminFeatures:
         try:
             keyboard.insert(-1, [InlineKeyboardButton("👥 Gérer utilisateurs", callback_data="manage_users")])
         except Exception as e:
-            print(f"Erreur lors de l'ajout des boutons admin : {e}")
+            logger.error(f"Erreur lors de l'ajout des boutons admin : {e}")
         return keyboard
\ No newline at end of file
@@ -1,19 +1,32 @@
 ﻿from handlers.admin_features import AdminFeatures
 from modules.access_manager import AccessManager
+from modules.stats_aggregator import StatsAggregator
+from modules.callback_router import CallbackRouter
+from modules.render_cache import RenderCache
+from modules.pagination import PagedMenu, PAGE_INDICATOR
+from modules.product_index import ProductIndex, CategoryIndex
+from modules.visibility_index import VisibilityIndex
+from modules.catalog_store import CatalogStore
+from modules.sqlite_store import SQLiteStore, migrate_from_json
+from modules.io_executor import IOExecutor
+from modules.log_setup import setup_logging
+from modules.metrics import Metrics, InstrumentedRequest, serve_metrics
+from modules.media_health import MediaHealth, is_file_id_error, normalize_catalog_media, sort_media
+from modules.update_processor import PerChatUpdateProcessor
+from modules import callback_codec
+from modules.bounded_store import BoundedStore
 import json
 import logging
 import asyncio
+import time
 import shutil
-import hashlib
 import os
+import importlib.util
 import re
-import random
-from datetime import datetime, time
+from datetime import datetime
 import pytz
-import base64
-from urllib.parse import quote, unquote
-from telegram.error import NetworkError, TimedOut, RetryAfter
-from telegram import Update, InlineKeyboardButton, InlineKeyboardMarkup
+from telegram.error import NetworkError, TimedOut, BadRequest
+from telegram import Update, InlineKeyboardButton, InlineKeyboardMarkup, InputMediaPhoto, InputMediaVideo
 from telegram.ext import (
     Application, 
     CommandHandler, 
@@ -21,24 +34,14 @@ from telegram.ext import (
     MessageHandler, 
     filters, 
     ContextTypes, 
-    ConversationHandler
+    ConversationHandler,
+    TypeHandler
 )
 paris_tz = pytz.timezone('Europe/Paris')
 
-STATS_CACHE = None
-LAST_CACHE_UPDATE = None
 admin_features = None
+stats_aggregator = None
 
-logging.getLogger("httpx").setLevel(logging.WARNING)
-
-logging.basicConfig(
-    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
-    level=logging.INFO,
-    handlers=[
-        logging.FileHandler('bot.log'),
-        logging.StreamHandler()
-    ]
-)
 logger = logging.getLogger(__name__)
 
 try:
@@ -47,78 +50,81 @@ try:
         TOKEN = CONFIG['token']
         ADMIN_IDS = CONFIG['admin_ids']
 except FileNotFoundError:
-    print("Erreur: Le fichier config.json n'a pas été trouvé!")
+    logger.error("Erreur: Le fichier config.json n'a pas été trouvé!")
     exit(1)
 except KeyError as e:
-    print(f"Erreur: La clé {e} est manquante dans le fichier config.json!")
+    logger.error(f"Erreur: La clé {e} est manquante dans le fichier config.json!")
     exit(1)
 
+log_listener = setup_logging(CONFIG)
+
+metrics = Metrics()
+io_executor = IOExecutor(metrics=metrics)
+
+def _read_config():
+    with open('config/config.json', 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+def _write_config(data):
+    with open('config/config.json', 'w', encoding='utf-8') as f:
+        f.write(data)
+
+async def load_config():
+    """Relit config/config.json hors de la boucle d'événements"""
+    return await io_executor.run(_read_config)
+
+async def save_config(config):
+    """Écrit config/config.json hors de la boucle d'événements"""
+    await io_executor.run(_write_config, json.dumps(config, indent=4))
+
+storage_backend = None
+if CONFIG.get('storage_backend', 'json') == 'sqlite':
+    storage_backend = SQLiteStore(CONFIG.get('sqlite_file', 'data/bot.db'))
+    if storage_backend.is_empty():
+        logger.info("Base SQLite vide : import des fichiers JSON existants...")
+        logger.info("Import terminé : %s", migrate_from_json(storage_backend, CONFIG['catalog_file']))
+    catalog_store = storage_backend
+else:
+    catalog_store = CatalogStore(
+        CONFIG['catalog_file'],
+        journal=CONFIG.get('catalog_journal', True),
+        compact_every=CONFIG.get('catalog_compact_every', 100)
+    )
+
 def load_catalog():
-    try:
-        with open(CONFIG['catalog_file'], 'r', encoding='utf-8') as f:
-            return json.load(f)
-    except FileNotFoundError:
-        return {}
-
-def save_catalog(catalog):
-    with open(CONFIG['catalog_file'], 'w', encoding='utf-8') as f:
-        json.dump(catalog, f, indent=4, ensure_ascii=False)
-
-def clean_stats():
-    """Nettoie les statistiques des produits et catégories qui n'existent plus"""
-    if 'stats' not in CATALOG:
-        return
-    
-    stats = CATALOG['stats']
-    
-    if 'category_views' in stats:
-        categories_to_remove = []
-        for category in stats['category_views']:
-            if category not in CATALOG or category == 'stats':
-                categories_to_remove.append(category)
-        
-        for category in categories_to_remove:
-            del stats['category_views'][category]
-            print(f"🧹 Suppression des stats de la catégorie: {category}")
-
-    if 'product_views' in stats:
-        categories_to_remove = []
-        for category in stats['product_views']:
-            if category not in CATALOG or category == 'stats':
-                categories_to_remove.append(category)
-                continue
-            
-            products_to_remove = []
-            existing_products = [p['name'] for p in CATALOG[category]]
-            
-            for product_name in stats['product_views'][category]:
-                if product_name not in existing_products:
-                    products_to_remove.append(product_name)
-            
-            for product in products_to_remove:
-                del stats['product_views'][category][product]
-                print(f"🧹 Suppression des stats du produit: {product} dans {category}")
-            
-            if not stats['product_views'][category]:
-                categories_to_remove.append(category)
-        
-        for category in categories_to_remove:
-            if category in stats['product_views']:
-                del stats['product_views'][category]
+    return catalog_store.load()
 
-    stats['last_updated'] = datetime.utcnow().strftime("%Y-%m-%d %H:%M:%S")
-    save_catalog(CATALOG)
+async def save_catalog(catalog, *categories):
+    """Persiste le catalogue : seules les catégories données sont journalisées, sinon instantané complet
+
+    La sérialisation se fait ici, l'écriture dans le thread d'E/S.
+    """
+    product_index.assign_ids()
+    operation = catalog_store.prepare(catalog, *categories)
+    await io_executor.run(catalog_store.write, operation)
+
+    category_index.assign_ids()
+    await save_catalog_meta()
+
+async def save_catalog_meta():
+    """Persiste les identifiants du catalogue s'ils ont changé depuis la dernière écriture"""
+    meta = catalog_meta()
+    if meta != saved_catalog_meta:
+        await io_executor.run(catalog_store.save_meta, meta)
+        saved_catalog_meta.clear()
+        saved_catalog_meta.update(meta)
+
+def catalog_meta():
+    """Identifiants persistés à côté du catalogue : ceux des catégories et les prochains à attribuer"""
+    return {
+        "next_product_id": product_index.next_id,
+        "next_category_id": category_index.next_id,
+        "category_ids": category_index.to_dict()
+    }
 
 def get_stats():
-    global STATS_CACHE, LAST_CACHE_UPDATE
-    current_time = datetime.utcnow().strftime("%Y-%m-%d %H:%M:%S")
-    
-    if STATS_CACHE and LAST_CACHE_UPDATE and (current_time - LAST_CACHE_UPDATE).seconds < 30:
-        return STATS_CACHE
-        
-    STATS_CACHE = load_catalog()['stats']
-    LAST_CACHE_UPDATE = current_time
-    return STATS_CACHE
+    """Retourne les statistiques en mémoire de l'agrégateur"""
+    return stats_aggregator.stats
 
 def backup_data():
     """Crée une sauvegarde des fichiers de données"""
@@ -135,86 +141,110 @@ def backup_data():
         shutil.copy2("config/catalog.json", f"{backup_dir}/catalog_{timestamp}.json")
 
 def print_catalog_debug():
-    """Fonction de debug pour afficher le contenu du catalogue"""
+    """Fonction de debug pour afficher le contenu du catalogue (niveau DEBUG uniquement)"""
+    if not logger.isEnabledFor(logging.DEBUG):
+        return
     for category, products in CATALOG.items():
         if category != 'stats':
-            print(f"\nCatégorie: {category}")
+            logger.debug("Catégorie: %s", category)
             for product in products:
-                print(f"  Produit: {product['name']}")
+                logger.debug("  Produit: %s", product['name'])
                 if 'media' in product:
-                    print(f"    Médias ({len(product['media'])}): {product['media']}")
+                    logger.debug("    Médias (%d): %s", len(product['media']), product['media'])
+
+# Routes des callback_data compacts (modules/callback_codec.py).
+# Ces numéros sont enregistrés dans les boutons déjà envoyés : ne jamais les réattribuer.
+CB_VIEW_CATEGORY = 1
+CB_PRODUCT = 2
+CB_MEDIA = 3
+CB_SELECT_CATEGORY = 4
+CB_EDIT_PRODUCT_CATEGORY = 5
+CB_EDIT_PRODUCT = 6
+CB_DELETE_PRODUCT_CATEGORY = 7
+CB_CONFIRM_DELETE_PRODUCT = 8
+CB_REALLY_DELETE_PRODUCT = 9
+CB_DELETE_CATEGORY = 10
+CB_CONFIRM_DELETE_CATEGORY = 11
+CB_EDIT_CATEGORY = 12
+CB_EDIT_CATEGORY_NAME = 13
+CB_ADD_SOLDOUT = 14
+CB_CONFIRM_SOLDOUT = 15
+CB_CATEGORIES_PAGE = 16
+CB_ADD_PRODUCT_PAGE = 17
+CB_EDIT_PRODUCT_PAGE = 18
+CB_DELETE_PRODUCT_PAGE = 19
+CB_DELETE_CATEGORY_PAGE = 20
+CB_EDIT_CATEGORY_PAGE = 21
+
+PACKED_ROUTES = {}
+
+def packed_route(*route_ids):
+    """Décorateur : enregistre un handler (update, context, payload) pour des routes compactes"""
+    def decorator(handler):
+        for route_id in route_ids:
+            if route_id in PACKED_ROUTES:
+                raise ValueError(f"Route compacte déjà enregistrée : {route_id}")
+            PACKED_ROUTES[route_id] = handler
+        return handler
+    return decorator
+
+def category_callback(route_id, category, page=0):
+    """callback_data d'un bouton portant une catégorie (par son identifiant)"""
+    return callback_codec.encode(route_id, category_index.id_of(category), page)
+
+def product_callback(route_id, product_id, media=0):
+    """callback_data d'un bouton portant un produit et, éventuellement, un index de média"""
+    return callback_codec.encode(route_id, product_id, media=media)
+
+def get_sibling_products(product_id, user_id=None):
+    """Retourne les produits visibles précédent et suivant dans la catégorie du produit"""
+    entry = product_index.get(product_id)
+    if entry is None:
+        return None, None
+    category, _, product = entry
 
-def sanitize_callback_data(text):
-    """Sanitize text for use in callback_data by removing special characters and encoding"""
-    text = re.sub(r'[^\w\s\-_]', '', text)
-    text = text.strip().replace(' ', '_')[:20]
-    return text
+    visibility_index.set_groups(admin_features._access_codes.get("groups", {}))
+    prev_id, next_id = visibility_index.siblings(category, product['id'], user_id)
 
-def encode_callback_data(category, product=None):
-    """Encode category and optionally product name for callback_data"""
-    if product:
-        data = f"{category}|||{product}"
-    else:
-        data = category
-    return base64.b64encode(data.encode()).decode()
+    return product_index.get_product(prev_id), product_index.get_product(next_id)
 
-def decode_callback_data(data):
-    """Decode callback_data back to category and optionally product"""
-    try:
-        decoded = base64.b64decode(data.encode()).decode()
-        if '|||' in decoded:
-            category, product = decoded.split('|||')
-            return category, product
-        return decoded, None
-    except:
-        return None, None
-        
-def create_safe_callback_data(prefix, data, max_length=64):
-    """
-    Crée un callback_data sécurisé et dans les limites de taille de Telegram
-    """
-    hash_object = hashlib.md5(data.encode())
-    short_hash = hash_object.hexdigest()[:8]
-    
-    safe_data = re.sub(r'[^\w\-]', '_', data)
-    safe_data = safe_data[:10]  
-    
-    callback_data = f"{prefix}_{safe_data}_{short_hash}"
-    
-    if len(callback_data) > max_length:
-        callback_data = f"{prefix}_{short_hash}"
-    
-    return callback_data
+async def navigation_expired(query, back_callback="admin"):
+    """Réponse aux boutons dont la catégorie ou le produit n'existe plus, ou d'un format inconnu"""
+    await query.message.edit_text(
+        "⌛ Ce bouton a expiré. Veuillez recommencer depuis le menu.",
+        reply_markup=InlineKeyboardMarkup([[
+            InlineKeyboardButton("🔙 Retour au menu", callback_data=back_callback)
+        ]])
+    )
+    return CHOOSING
 
-def get_sibling_products(category, product_name, user_id=None):
-    products = CATALOG[category]
-    visible_products = []
-    
-    for product in products:
-        show_product = True
-        for group_name in admin_features._access_codes.get("groups", {}).keys():
-            if product['name'].startswith(f"{group_name}_"):
-                if user_id not in admin_features._access_codes["groups"][group_name]:
-                    show_product = False
-                break
-        if show_product:
-            visible_products.append(product)
-    
-    current_index = next((i for i, p in enumerate(visible_products) if p['name'] == product_name), -1)
-    
-    prev_product = visible_products[current_index - 1] if current_index > 0 else None
-    next_product = visible_products[current_index + 1] if current_index < len(visible_products) - 1 else None
-    
-    return prev_product, next_product
-CALLBACK_DATA_MAPPING = {}
+def drop_session(application, user_id, chat_id):
+    """Libère context.user_data (et chat_data du chat privé) d'un utilisateur inactif
 
-def store_callback_mapping(callback_data, original_data):
-    """Stocke la correspondance entre le callback_data et les données originales"""
-    CALLBACK_DATA_MAPPING[callback_data] = original_data
+    Les boutons déjà envoyés restent utilisables : ils portent les identifiants persistants
+    du produit ou de la catégorie, pas un état gardé en mémoire.
+    """
+    application.drop_user_data(user_id)
+    if chat_id == user_id:
+        application.drop_chat_data(chat_id)
+
+# Sessions actives : au-delà de la limite ou de la durée d'inactivité, les données de session sont libérées
+active_sessions = BoundedStore(
+    max_entries=CONFIG.get('session_max_entries', 10000),
+    ttl=CONFIG.get('session_ttl', 86400)
+)
+metrics.register_gauge("bot_sessions", lambda: active_sessions.stats())
 
-def get_original_data(callback_data):
-    """Récupère les données originales à partir du callback_data"""
-    return CALLBACK_DATA_MAPPING.get(callback_data)
+async def track_session(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """Marque la session de l'utilisateur comme récente (groupe -1 : avant les autres handlers)"""
+    if update.effective_user is not None:
+        active_sessions[update.effective_user.id] = update.effective_chat.id if update.effective_chat else None
+
+    # Une session évincée pendant le traitement d'un de ses updates est recréée par PTB : libérée ici
+    user_data = context.application.user_data
+    if len(user_data) > active_sessions.max_entries:
+        for user_id in [user_id for user_id in user_data if user_id not in active_sessions]:
+            drop_session(context.application, user_id, user_id)
 
 WAITING_FOR_ACCESS_CODE = "WAITING_FOR_ACCESS_CODE"
 CHOOSING = "CHOOSING"
@@ -241,7 +271,176 @@ WAITING_BUTTON_VALUE = "WAITING_BUTTON_VALUE"
 WAITING_BROADCAST_EDIT = "WAITING_BROADCAST_EDIT"
 
 
+saved_catalog_meta = catalog_store.load_meta()
 CATALOG = load_catalog()
+product_index = ProductIndex(CATALOG, saved_catalog_meta.get('next_product_id', 1))
+category_index = CategoryIndex(
+    CATALOG, saved_catalog_meta.get('category_ids'), saved_catalog_meta.get('next_category_id', 1)
+)
+if product_index.assign_ids():
+    catalog_store.save(CATALOG)
+# Identifiants attribués au chargement : persistés par post_init(), pas à l'import
+category_index.assign_ids()
+if normalize_catalog_media(CATALOG):
+    catalog_store.save(CATALOG)
+product_index.rebuild()
+visibility_index = VisibilityIndex(CATALOG)
+metrics.register_gauge("bot_products", lambda: len(product_index))
+metrics.register_gauge("bot_media_files", lambda: media_health.stats())
+media_health = MediaHealth(
+    validation_delay=CONFIG.get('media_validation_delay', 0.5),
+    revalidate_interval=CONFIG.get('media_revalidate_interval', 86400)
+)
+
+def catalog_media_ids():
+    """Tous les file_id des médias du catalogue, pour la vérification en arrière-plan"""
+    for product in product_index.products():
+        for media in product.get('media') or []:
+            yield media.get('media_id')
+
+callback_router = CallbackRouter()
+home_cache = RenderCache()
+category_names_cache = RenderCache()
+MENU_PAGE_SIZE = CONFIG.get('menu_page_size', 10)
+
+def category_names():
+    """Noms des catégories dans l'ordre du catalogue (hors entrées qui ne sont pas des catégories)"""
+    return category_names_cache.get(
+        None, lambda: [category for category, products in CATALOG.items() if isinstance(products, list)]
+    )
+
+def is_sold_out(category):
+    products = CATALOG.get(category)
+    return not products or (len(products) == 1 and products[0].get('name') == 'SOLD OUT ! ❌')
+
+def category_menu(item_route, page_route, footer, label=None):
+    """Menu paginé des catégories : chaque bouton mène à `item_route` avec l'identifiant de la catégorie"""
+    return PagedMenu(
+        lambda _: category_names(),
+        lambda _, category: InlineKeyboardButton(
+            label(category) if label else category,
+            callback_data=category_callback(item_route, category)
+        ),
+        lambda _, page: callback_codec.encode(page_route, page=page),
+        footer,
+        MENU_PAGE_SIZE
+    )
+
+def product_menu(item_route, page_route, footer):
+    """Menu paginé des produits d'une catégorie (la clé du menu est le nom de la catégorie)"""
+    return PagedMenu(
+        lambda category: CATALOG.get(category, []),
+        lambda _, product: InlineKeyboardButton(
+            product['name'],
+            callback_data=product_callback(item_route, product['id'])
+        ),
+        lambda category, page: category_callback(page_route, category, page),
+        footer,
+        MENU_PAGE_SIZE
+    )
+
+categories_menu = category_menu(
+    CB_VIEW_CATEGORY, CB_CATEGORIES_PAGE,
+    [[InlineKeyboardButton("🔙 Retour à l'accueil", callback_data="back_to_home")]]
+)
+add_product_menu = category_menu(
+    CB_SELECT_CATEGORY, CB_ADD_PRODUCT_PAGE,
+    [[InlineKeyboardButton("🔙 Annuler", callback_data="cancel_add_product")]]
+)
+edit_product_menu = category_menu(
+    CB_EDIT_PRODUCT_CATEGORY, CB_EDIT_PRODUCT_PAGE,
+    [[InlineKeyboardButton("🔙 Annuler", callback_data="cancel_edit")]]
+)
+delete_product_menu = category_menu(
+    CB_DELETE_PRODUCT_CATEGORY, CB_DELETE_PRODUCT_PAGE,
+    [[InlineKeyboardButton("🔙 Annuler", callback_data="cancel_delete_product")]],
+    label=lambda category: category[:50]
+)
+delete_category_menu = category_menu(
+    CB_DELETE_CATEGORY, CB_DELETE_CATEGORY_PAGE,
+    [[InlineKeyboardButton("🔙 Annuler", callback_data="cancel_delete_category")]],
+    label=lambda category: category[:50]
+)
+edit_category_menu = category_menu(
+    CB_EDIT_CATEGORY, CB_EDIT_CATEGORY_PAGE,
+    [[InlineKeyboardButton("🔙 Retour", callback_data="admin")]],
+    label=lambda category: f"{category} {'(SOLD OUT ❌)' if is_sold_out(category) else ''}"
+)
+listing_menu = product_menu(
+    CB_PRODUCT, CB_VIEW_CATEGORY,
+    [[InlineKeyboardButton("🔙 Retour au menu", callback_data="show_categories")]]
+)
+edit_product_products_menu = product_menu(
+    CB_EDIT_PRODUCT, CB_EDIT_PRODUCT_CATEGORY,
+    [[InlineKeyboardButton("🔙 Annuler", callback_data="cancel_edit")]]
+)
+delete_product_products_menu = product_menu(
+    CB_CONFIRM_DELETE_PRODUCT, CB_DELETE_PRODUCT_CATEGORY,
+    [[InlineKeyboardButton("🔙 Annuler", callback_data="cancel_delete_product")]]
+)
+CATEGORY_MENUS = (categories_menu, add_product_menu, edit_product_menu, delete_product_menu,
+                  delete_category_menu, edit_category_menu)
+PRODUCT_MENUS = (listing_menu, edit_product_products_menu, delete_product_products_menu)
+
+# Lignes de l'écran des statistiques : produits les plus vus et catégories affichées
+STATS_TOP_PRODUCTS = CONFIG.get('stats_top_products', 5)
+STATS_TOP_CATEGORIES = CONFIG.get('stats_top_categories', 30)
+
+def get_category_listing(category, page=0):
+    """Retourne (texte, clavier, page) d'une page de la catégorie, depuis le cache"""
+    reply_markup, page, _ = listing_menu.render(category, page)
+    return f"*{category}*\n\n", reply_markup, page
+
+def catalog_changed(*categories):
+    """À appeler après chaque modification du catalogue (toutes les catégories si aucune n'est précisée)"""
+    product_index.rebuild(*categories)
+    visibility_index.invalidate(*categories)
+    category_names_cache.invalidate()
+    # Les statistiques des produits et catégories supprimés sont retirées ici, pas à l'affichage
+    stats_aggregator.prune(CATALOG, categories or None)
+    for menu in CATEGORY_MENUS:
+        menu.invalidate()
+    for menu in PRODUCT_MENUS:
+        if not categories:
+            menu.invalidate()
+        for category in categories:
+            menu.invalidate(category)
+
+def build_home_screen(is_admin: bool):
+    """Construit le message d'accueil, son clavier et la bannière"""
+    keyboard = [
+        [InlineKeyboardButton("📋 MENU", callback_data="show_categories")]
+    ]
+
+    for button in CONFIG.get('custom_buttons', []):
+        if button['type'] == 'url':
+            keyboard.append([InlineKeyboardButton(button['name'], url=button['value'])])
+        elif button['type'] == 'text':
+            keyboard.append([InlineKeyboardButton(button['name'], callback_data=f"custom_text_{button['id']}")])
+
+    keyboard.append([InlineKeyboardButton("📱 Réseaux", callback_data="show_networks")])
+
+    if is_admin:
+        keyboard.append([InlineKeyboardButton("🔧 Menu Admin", callback_data="admin")])
+
+    welcome_text = CONFIG.get('welcome_message', 
+        "🌿 <b>Bienvenue sur votre bot !</b> 🌿\n\n"
+        "<b>Pour changer ce message d accueil, rendez vous dans l onglet admin.</b>\n"
+        "📋 Cliquez sur MENU pour voir les catégories"
+    )
+
+    return welcome_text, InlineKeyboardMarkup(keyboard), CONFIG.get('banner_image')
+
+def get_home_screen(user_id):
+    """Retourne (texte, clavier, bannière) de l'accueil depuis le cache (variante admin ou non)"""
+    is_admin = str(user_id) in ADMIN_IDS
+    return home_cache.get(is_admin, build_home_screen, is_admin)
+
+def refresh_home_screen(config=None):
+    """Invalide l'accueil en cache après une modification des boutons, du message ou de la bannière"""
+    if config is not None:
+        CONFIG['custom_buttons'] = config.get('custom_buttons', [])
+    home_cache.invalidate()
 
 
 
@@ -256,7 +455,7 @@ async def handle_access_code(update: Update, context: ContextTypes.DEFAULT_TYPE)
     except Exception as e:
         pass
 
-    is_valid, reason = access_manager.verify_code(code, user_id)
+    is_valid, reason = await access_manager.verify_code(code, user_id)
     
     if is_valid:
         try:
@@ -305,7 +504,7 @@ async def admin_generate_code(update: Update, context: ContextTypes.DEFAULT_TYPE
         await update.message.reply_text("❌ Cette commande est réservée aux administrateurs.")
         return
 
-    code, expiration = access_manager.generate_code(update.effective_user.id)
+    code, expiration = await access_manager.generate_code(update.effective_user.id)
     
     exp_date = datetime.fromisoformat(expiration)
     exp_str = exp_date.strftime("%d/%m/%Y %H:%M")
@@ -323,7 +522,7 @@ async def admin_list_codes(update: Update, context: ContextTypes.DEFAULT_TYPE):
         await update.message.reply_text("❌ Cette commande est réservée aux administrateurs.")
         return
 
-    active_codes = access_manager.list_active_codes()
+    active_codes = await access_manager.list_active_codes()
     
     if not active_codes:
         await update.message.reply_text("Aucun code actif.")
@@ -338,6 +537,14 @@ async def admin_list_codes(update: Update, context: ContextTypes.DEFAULT_TYPE):
 
     await update.message.reply_text(message, parse_mode='Markdown')
 
+async def admin_metrics(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """Affiche les latences mesurées (commande admin)"""
+    if str(update.effective_user.id) not in ADMIN_IDS:
+        await update.message.reply_text("❌ Cette commande est réservée aux administrateurs.")
+        return
+
+    await update.message.reply_text(f"📈 Métriques\n\n{metrics.summary()}")
+
 async def start(update: Update, context: ContextTypes.DEFAULT_TYPE):
     chat_id = update.effective_chat.id
     user = update.effective_user
@@ -350,7 +557,7 @@ async def start(update: Update, context: ContextTypes.DEFAULT_TYPE):
     
     await admin_features.register_user(user)
     
-    if not access_manager.is_authorized(user.id):
+    if not await access_manager.is_authorized(user.id):
 
         if 'initial_welcome_message_id' in context.user_data:
             try:
@@ -387,55 +594,30 @@ async def start(update: Update, context: ContextTypes.DEFAULT_TYPE):
         except:
             pass
     
-    keyboard = [
-        [InlineKeyboardButton("📋 MENU", callback_data="show_categories")]
-    ]
-
-    with open('config/config.json', 'r') as f:
-        config = json.load(f)
-    
-    for button in config.get('custom_buttons', []):
-        if button['type'] == 'url':
-            keyboard.append([InlineKeyboardButton(button['name'], url=button['value'])])
-        elif button['type'] == 'text':
-            keyboard.append([InlineKeyboardButton(button['name'], callback_data=f"custom_text_{button['id']}")])
-
-    welcome_text = CONFIG.get('welcome_message', 
-        "🌿 <b>Bienvenue sur votre bot !</b> 🌿\n\n"
-        "<b>Pour changer ce message d accueil, rendez vous dans l onglet admin.</b>\n"
-        "📋 Cliquez sur MENU pour voir les catégories"
-    )
-
-    keyboard.extend([
-        [InlineKeyboardButton("📱 Réseaux", callback_data="show_networks")]
-
-    ])
-
-    if str(update.effective_user.id) in ADMIN_IDS:
-        keyboard.append([InlineKeyboardButton("🔧 Menu Admin", callback_data="admin")])
+    welcome_text, reply_markup, banner_image = get_home_screen(user.id)
 
     try:
-        if CONFIG.get('banner_image'):
+        if banner_image:
             banner_message = await context.bot.send_photo(
                 chat_id=chat_id,
-                photo=CONFIG['banner_image']
+                photo=banner_image
             )
             context.user_data['banner_message_id'] = banner_message.message_id
 
         menu_message = await context.bot.send_message(
             chat_id=chat_id,
             text=welcome_text,
-            reply_markup=InlineKeyboardMarkup(keyboard),
+            reply_markup=reply_markup,
             parse_mode='HTML'  
         )
         context.user_data['menu_message_id'] = menu_message.message_id
         
     except Exception as e:
-        print(f"Erreur lors du démarrage: {e}")
+        logger.error(f"Erreur lors du démarrage: {e}")
         menu_message = await context.bot.send_message(
             chat_id=chat_id,
             text=welcome_text,
-            reply_markup=InlineKeyboardMarkup(keyboard),
+            reply_markup=reply_markup,
             parse_mode='HTML'
         )
         context.user_data['menu_message_id'] = menu_message.message_id
@@ -492,7 +674,7 @@ async def admin(update: Update, context: ContextTypes.DEFAULT_TYPE):
                     )
                     del context.user_data[message_key]
                 except Exception as e:
-                    print(f"Erreur lors de la suppression du message {message_key}: {e}")
+                    logger.warning(f"Erreur lors de la suppression du message {message_key}: {e}")
         
         if CONFIG.get('banner_image'):
             try:
@@ -502,7 +684,7 @@ async def admin(update: Update, context: ContextTypes.DEFAULT_TYPE):
                 )
                 context.user_data['banner_message_id'] = banner_message.message_id
             except Exception as e:
-                print(f"Erreur lors de l'envoi de la bannière: {e}")
+                logger.error(f"Erreur lors de l'envoi de la bannière: {e}")
         
         return await show_admin_menu(update, context)
     else:
@@ -511,7 +693,7 @@ async def admin(update: Update, context: ContextTypes.DEFAULT_TYPE):
 
 async def show_admin_menu(update: Update, context: ContextTypes.DEFAULT_TYPE):
     """Affiche le menu d'administration"""
-    is_enabled = access_manager.is_access_code_enabled()
+    is_enabled = await access_manager.is_access_code_enabled()
     status_text = "✅ Activé" if is_enabled else "❌ Désactivé"
     info_status = "✅ Activé" if CONFIG.get('info_button_enabled', True) else "❌ Désactivé"
 
@@ -554,7 +736,7 @@ async def show_admin_menu(update: Update, context: ContextTypes.DEFAULT_TYPE):
             )
             context.user_data['menu_message_id'] = message.message_id
     except Exception as e:
-        print(f"Erreur dans show_admin_menu: {e}")
+        logger.error(f"Erreur dans show_admin_menu: {e}")
         await context.bot.send_message(
             chat_id=update.effective_chat.id,
             text=admin_text,
@@ -607,8 +789,7 @@ async def handle_info_message(update: Update, context: ContextTypes.DEFAULT_TYPE
     new_info = update.message.text_html if hasattr(update.message, 'text_html') else update.message.text
 
     CONFIG['info_message'] = new_info
-    with open('config/config.json', 'w', encoding='utf-8') as f:
-        json.dump(CONFIG, f, indent=4)
+    await save_config(CONFIG)
 
     try:
         await update.message.delete()
@@ -617,7 +798,7 @@ async def handle_info_message(update: Update, context: ContextTypes.DEFAULT_TYPE
             message_id=update.message.message_id - 1
         )
     except Exception as e:
-        print(f"Erreur lors de la suppression des messages : {e}")
+        logger.warning(f"Erreur lors de la suppression des messages : {e}")
 
     success_msg = await context.bot.send_message(
         chat_id=update.effective_chat.id,
@@ -643,7 +824,7 @@ async def handle_new_category_name(update: Update, context: ContextTypes.DEFAULT
             await update.message.reply_text(
                 "❌ Une catégorie avec ce nom existe déjà.",
                 reply_markup=InlineKeyboardMarkup([[
-                    InlineKeyboardButton("🔙 Retour", callback_data=f"edit_cat_{old_name}")
+                    InlineKeyboardButton("🔙 Retour", callback_data=category_callback(CB_EDIT_CATEGORY, old_name))
                 ]])
             )
             return EDITING_CATEGORY
@@ -651,7 +832,10 @@ async def handle_new_category_name(update: Update, context: ContextTypes.DEFAULT
         products = CATALOG[old_name]
         del CATALOG[old_name]
         CATALOG[new_name] = products
-        save_catalog(CATALOG)
+        category_index.rename(old_name, new_name)
+        stats_aggregator.rename_category(old_name, new_name)
+        await save_catalog(CATALOG, old_name, new_name)
+        catalog_changed(old_name, new_name)
 
         try:
             await context.bot.delete_message(
@@ -736,8 +920,7 @@ async def handle_order_button_config(update: Update, context: ContextTypes.DEFAU
                 CONFIG['order_telegram'] = None
                 button_type = "texte"
             
-            with open('config/config.json', 'w', encoding='utf-8') as f:
-                json.dump(CONFIG, f, indent=4)
+            await save_config(CONFIG)
         
             if 'edit_order_button_message_id' in context.user_data:
                 try:
@@ -769,7 +952,7 @@ async def handle_order_button_config(update: Update, context: ContextTypes.DEFAU
             return await show_admin_menu(update, context)
         
         except Exception as e:
-            print(f"Erreur dans handle_order_button_config: {e}")
+            logger.error(f"Erreur dans handle_order_button_config: {e}")
             return WAITING_ORDER_BUTTON_CONFIG
 
 async def handle_button_name(update: Update, context: ContextTypes.DEFAULT_TYPE):
@@ -784,21 +967,20 @@ async def handle_button_name(update: Update, context: ContextTypes.DEFAULT_TYPE)
         try:
             await context.bot.delete_message(chat_id=chat_id, message_id=msg_id)
         except Exception as e:
-            print(f"Erreur lors de la suppression du message {msg_id}: {e}")
+            logger.warning(f"Erreur lors de la suppression du message {msg_id}: {e}")
     
     if 'editing_button_id' in context.user_data:
         button_id = context.user_data['editing_button_id']
         
-        with open('config/config.json', 'r') as f:
-            config = json.load(f)
+        config = await load_config()
         
         for button in config.get('custom_buttons', []):
             if button['id'] == button_id:
                 button['name'] = button_name
                 break
 
-        with open('config/config.json', 'w') as f:
-            json.dump(config, f, indent=4)
+        await save_config(config)
+        refresh_home_screen(config)
         
         keyboard = [
             [InlineKeyboardButton("✏️ Modifier le nom", callback_data=f"edit_button_name_{button_id}")],
@@ -840,8 +1022,7 @@ async def start_edit_button_name(update: Update, context: ContextTypes.DEFAULT_T
     button_id = query.data.replace("edit_button_name_", "")
     context.user_data['editing_button_id'] = button_id
     
-    with open('config/config.json', 'r') as f:
-        config = json.load(f)
+    config = await load_config()
     
     button = next((b for b in config.get('custom_buttons', []) if b['id'] == button_id), None)
     
@@ -866,8 +1047,7 @@ async def start_edit_button_value(update: Update, context: ContextTypes.DEFAULT_
     button_id = query.data.replace("edit_button_value_", "")
     context.user_data['editing_button_id'] = button_id
     
-    with open('config/config.json', 'r') as f:
-        config = json.load(f)
+    config = await load_config()
     
     button = next((b for b in config.get('custom_buttons', []) if b['id'] == button_id), None)
     
@@ -898,14 +1078,13 @@ async def handle_button_value(update: Update, context: ContextTypes.DEFAULT_TYPE
         try:
             await context.bot.delete_message(chat_id=chat_id, message_id=msg_id)
         except Exception as e:
-            print(f"Erreur lors de la suppression du message {msg_id}: {e}")
+            logger.warning(f"Erreur lors de la suppression du message {msg_id}: {e}")
     
     is_url = value.startswith(('http://', 'https://'))
     
     if 'editing_button_id' in context.user_data:
         button_id = context.user_data['editing_button_id']
-        with open('config/config.json', 'r') as f:
-            config = json.load(f)
+        config = await load_config()
         
         for button in config.get('custom_buttons', []):
             if button['id'] == button_id:
@@ -914,8 +1093,8 @@ async def handle_button_value(update: Update, context: ContextTypes.DEFAULT_TYPE
                 button['parse_mode'] = 'HTML' if not is_url else None  
                 break
         
-        with open('config/config.json', 'w') as f:
-            json.dump(config, f, indent=4)
+        await save_config(config)
+        refresh_home_screen(config)
         
         reply_message = await context.bot.send_message(
             chat_id=chat_id,
@@ -930,8 +1109,7 @@ async def handle_button_value(update: Update, context: ContextTypes.DEFAULT_TYPE
     
     temp_button = context.user_data.get('temp_button', {})
     
-    with open('config/config.json', 'r') as f:
-        config = json.load(f)
+    config = await load_config()
     
     if 'custom_buttons' not in config:
         config['custom_buttons'] = []
@@ -947,8 +1125,8 @@ async def handle_button_value(update: Update, context: ContextTypes.DEFAULT_TYPE
     
     config['custom_buttons'].append(new_button)
     
-    with open('config/config.json', 'w') as f:
-        json.dump(config, f, indent=4)
+    await save_config(config)
+    refresh_home_screen(config)
     
     await context.bot.send_message(
         chat_id=chat_id,
@@ -964,8 +1142,7 @@ async def list_buttons_for_deletion(update: Update, context: ContextTypes.DEFAUL
     query = update.callback_query
     await query.answer()
     
-    with open('config/config.json', 'r') as f:
-        config = json.load(f)
+    config = await load_config()
     
     buttons = config.get('custom_buttons', [])
     if not buttons:
@@ -999,13 +1176,12 @@ async def handle_button_deletion(update: Update, context: ContextTypes.DEFAULT_T
     
     button_id = query.data.replace("delete_button_", "")
     
-    with open('config/config.json', 'r') as f:
-        config = json.load(f)
+    config = await load_config()
     
     config['custom_buttons'] = [b for b in config.get('custom_buttons', []) if b['id'] != button_id]
     
-    with open('config/config.json', 'w') as f:
-        json.dump(config, f, indent=4)
+    await save_config(config)
+    refresh_home_screen(config)
     
     await query.edit_message_text(
         "✅ Bouton supprimé avec succès !",
@@ -1020,8 +1196,7 @@ async def list_buttons_for_editing(update: Update, context: ContextTypes.DEFAULT
     query = update.callback_query
     await query.answer()
     
-    with open('config/config.json', 'r') as f:
-        config = json.load(f)
+    config = await load_config()
     
     buttons = config.get('custom_buttons', [])
     if not buttons:
@@ -1056,8 +1231,7 @@ async def handle_button_editing(update: Update, context: ContextTypes.DEFAULT_TY
     button_id = query.data.replace("edit_button_", "")
     context.user_data['editing_button_id'] = button_id
     
-    with open('config/config.json', 'r') as f:
-        config = json.load(f)
+    config = await load_config()
     
     button = next((b for b in config.get('custom_buttons', []) if b['id'] == button_id), None)
     if button:
@@ -1090,17 +1264,16 @@ async def handle_banner_image(update: Update, context: ContextTypes.DEFAULT_TYPE
         del context.user_data['banner_msg']
 
     try:
-        with open('config/config.json', 'r', encoding='utf-8') as f:
-            current_config = json.load(f)
-            custom_buttons = current_config.get('custom_buttons', [])
+        current_config = await load_config()
+        custom_buttons = current_config.get('custom_buttons', [])
 
         file_id = update.message.photo[-1].file_id
         
         CONFIG['banner_image'] = file_id
         CONFIG['custom_buttons'] = custom_buttons 
 
-        with open('config/config.json', 'w', encoding='utf-8') as f:
-            json.dump(CONFIG, f, indent=4)
+        await save_config(CONFIG)
+        refresh_home_screen()
 
         await update.message.delete()
 
@@ -1131,12 +1304,12 @@ async def handle_banner_image(update: Update, context: ContextTypes.DEFAULT_TYPE
                 )
                 context.user_data['banner_message_id'] = banner_message.message_id
             except Exception as e:
-                print(f"Erreur lors de l'envoi de la bannière: {e}")
+                logger.error(f"Erreur lors de l'envoi de la bannière: {e}")
 
         return await show_admin_menu(update, context)
 
     except Exception as e:
-        print(f"Erreur lors de la mise à jour de la bannière: {e}")
+        logger.error(f"Erreur lors de la mise à jour de la bannière: {e}")
         await update.message.reply_text("❌ Une erreur est survenue lors de la mise à jour de la bannière.")
         return CHOOSING
 
@@ -1183,7 +1356,8 @@ async def handle_category_name(update: Update, context: ContextTypes.DEFAULT_TYP
         return WAITING_CATEGORY_NAME
     
     CATALOG[category_name] = []
-    save_catalog(CATALOG)
+    await save_catalog(CATALOG, category_name)
+    catalog_changed(category_name)
     
     await context.bot.delete_message(
         chat_id=update.effective_chat.id,
@@ -1202,7 +1376,8 @@ async def handle_product_name(update: Update, context: ContextTypes.DEFAULT_TYPE
     if category and CATALOG.get(category):
         if len(CATALOG[category]) == 1 and CATALOG[category][0].get('name') == 'SOLD OUT ! ❌':
             CATALOG[category] = []
-            save_catalog(CATALOG)
+            await save_catalog(CATALOG, category)
+            catalog_changed(category)
 
     if category and any(p.get('name') == product_name for p in CATALOG.get(category, [])):
         await update.message.reply_text(
@@ -1298,7 +1473,7 @@ async def handle_product_media(update: Update, context: ContextTypes.DEFAULT_TYP
             )
             del context.user_data['media_invitation_message_id']
         except Exception as e:
-            print(f"Erreur lors de la suppression du message d'invitation: {e}")
+            logger.warning(f"Erreur lors de la suppression du message d'invitation: {e}")
 
     if context.user_data.get('last_confirmation_message_id'):
         try:
@@ -1307,7 +1482,7 @@ async def handle_product_media(update: Update, context: ContextTypes.DEFAULT_TYP
                 message_id=context.user_data['last_confirmation_message_id']
             )
         except Exception as e:
-            print(f"Erreur lors de la suppression du message de confirmation: {e}")
+            logger.warning(f"Erreur lors de la suppression du message de confirmation: {e}")
 
     context.user_data['media_count'] += 1
 
@@ -1347,26 +1522,27 @@ async def finish_product_media(update: Update, context: ContextTypes.DEFAULT_TYP
     if not category:
         return await show_admin_menu(update, context)
 
+    media_health.schedule(*(media['media_id'] for media in context.user_data.get('temp_product_media', [])))
+
     if context.user_data.get('editing_category'):  
-        product_name = context.user_data.get('editing_product')
-        if product_name:
-            for product in CATALOG[category]:
-                if product['name'] == product_name:
-                    product['media'] = context.user_data.get('temp_product_media', [])
-                    save_catalog(CATALOG)
-                    break
+        product = product_index.get_product(context.user_data.get('editing_product_id'))
+        if product:
+            product['media'] = sort_media(context.user_data.get('temp_product_media'))
+            await save_catalog(CATALOG, category)
+            catalog_changed(category)
     else: 
         new_product = {
             'name': context.user_data.get('temp_product_name'),
             'price': context.user_data.get('temp_product_price'),
             'description': context.user_data.get('temp_product_description'),
-            'media': context.user_data.get('temp_product_media', [])
+            'media': sort_media(context.user_data.get('temp_product_media'))
         }
 
         if category not in CATALOG:
             CATALOG[category] = []
         CATALOG[category].append(new_product)
-        save_catalog(CATALOG)
+        await save_catalog(CATALOG, category)
+        catalog_changed(category)
 
     context.user_data.clear()
     keyboard = [
@@ -1415,28 +1591,30 @@ async def handle_new_value(update: Update, context: ContextTypes.DEFAULT_TYPE):
         await update.message.reply_text("❌ Une erreur est survenue. Veuillez réessayer.")
         return await show_admin_menu(update, context)
 
-    for product in CATALOG.get(category, []):
-        if product['name'] == product_name:
-            old_value = product.get(field, "Non défini")
-            product[field] = new_value
-            save_catalog(CATALOG)
+    product = product_index.get_product(context.user_data.get('editing_product_id'))
+    if product:
+        old_value = product.get(field, "Non défini")
+        product[field] = new_value
+        if field == 'name':
+            stats_aggregator.rename_product(category, old_value, new_value)
+        await save_catalog(CATALOG, category)
+        catalog_changed(category)
 
-            await context.bot.delete_message(
-                chat_id=update.effective_chat.id,
-                message_id=update.message.message_id - 1
-            )
-            await update.message.delete()
+        await context.bot.delete_message(
+            chat_id=update.effective_chat.id,
+            message_id=update.message.message_id - 1
+        )
+        await update.message.delete()
 
-            keyboard = [[InlineKeyboardButton("🔙 Retour au menu", callback_data="admin")]]
-            await context.bot.send_message(
-                chat_id=update.effective_chat.id,
-                text=f"✅ Modification effectuée avec succès !\n\n"
-                     f"Ancien {field}: {old_value}\n"
-                     f"Nouveau {field}: {new_value}",
-                reply_markup=InlineKeyboardMarkup(keyboard),
-                parse_mode='HTML' 
-            )
-            break
+        keyboard = [[InlineKeyboardButton("🔙 Retour au menu", callback_data="admin")]]
+        await context.bot.send_message(
+            chat_id=update.effective_chat.id,
+            text=f"✅ Modification effectuée avec succès !\n\n"
+                 f"Ancien {field}: {old_value}\n"
+                 f"Nouveau {field}: {new_value}",
+            reply_markup=InlineKeyboardMarkup(keyboard),
+            parse_mode='HTML' 
+        )
 
     return CHOOSING
 
@@ -1473,8 +1651,7 @@ async def handle_contact_username(update: Update, context: ContextTypes.DEFAULT_
             CONFIG['contact_url'] = None
             config_type = "Pseudo Telegram"
         
-        with open('config/config.json', 'w', encoding='utf-8') as f:
-            json.dump(CONFIG, f, indent=4)
+        await save_config(CONFIG)
         
         if 'edit_contact_message_id' in context.user_data:
             try:
@@ -1506,7 +1683,7 @@ async def handle_contact_username(update: Update, context: ContextTypes.DEFAULT_
         return await show_admin_menu(update, context)
         
     except Exception as e:
-        print(f"Erreur dans handle_contact_username: {e}")
+        logger.error(f"Erreur dans handle_contact_username: {e}")
         return WAITING_CONTACT_USERNAME
 
 async def handle_welcome_message(update: Update, context: ContextTypes.DEFAULT_TYPE):
@@ -1519,8 +1696,8 @@ async def handle_welcome_message(update: Update, context: ContextTypes.DEFAULT_T
         
         CONFIG['welcome_message'] = new_message
         
-        with open('config/config.json', 'w', encoding='utf-8') as f:
-            json.dump(CONFIG, f, indent=4)
+        await save_config(CONFIG)
+        refresh_home_screen()
         
         if 'edit_welcome_message_id' in context.user_data:
             try:
@@ -1547,1501 +1724,1382 @@ async def handle_welcome_message(update: Update, context: ContextTypes.DEFAULT_T
         return await show_admin_menu(update, context)
         
     except Exception as e:
-        print(f"Erreur dans handle_welcome_message: {e}")
+        logger.error(f"Erreur dans handle_welcome_message: {e}")
         return WAITING_WELCOME_MESSAGE
 
-async def handle_normal_buttons(update: Update, context: ContextTypes.DEFAULT_TYPE):
-    """Gestion des boutons normaux"""
-    global paris_tz 
+@callback_router.prefix(callback_codec.MARKER)
+async def route_packed(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """Aiguille un callback_data compact vers sa route, sans expression régulière ni table de correspondance"""
     query = update.callback_query
-    await query.answer()
-    await admin_features.register_user(update.effective_user)
+    payload = callback_codec.decode(query.data)
+    handler = PACKED_ROUTES.get(payload.route) if payload is not None else None
+    if handler is None:
+        return await navigation_expired(query)
+    return await handler(update, context, payload)
+
+@callback_router.exact("admin")
+async def route_admin(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    query = update.callback_query
+    if str(update.effective_user.id) in ADMIN_IDS:
+        return await show_admin_menu(update, context)
+    else:
+        await query.edit_message_text("❌ Vous n'êtes pas autorisé à accéder au menu d'administration.")
+        return CHOOSING
 
+@callback_router.exact("show_info_potato")
+async def route_show_info_potato(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    query = update.callback_query
+    text = (
+        "🔒 <b>Ceci est un exemple de bouton avec texte</b>\n\n"
+        "<code>Possible de mettre un id SESSION par exemple.</code>"
+    )
+    keyboard = [[InlineKeyboardButton("🔙 Retour aux réseaux", callback_data="show_networks")]]
 
-    if query.data == "admin":
-        if str(update.effective_user.id) in ADMIN_IDS:
-            return await show_admin_menu(update, context)
-        else:
-            await query.edit_message_text("❌ Vous n'êtes pas autorisé à accéder au menu d'administration.")
-            return CHOOSING
+    await query.edit_message_text(
+        text=text,
+        reply_markup=InlineKeyboardMarkup(keyboard),
+        parse_mode='HTML'
+    )
+    return CHOOSING
 
-    elif query.data == "show_info_potato":
-        text = (
-            "🔒 <b>Ceci est un exemple de bouton avec texte</b>\n\n"
-            "<code>Possible de mettre un id SESSION par exemple.</code>"
-        )
-        keyboard = [[InlineKeyboardButton("🔙 Retour aux réseaux", callback_data="show_networks")]]
-        
+@callback_router.prefix("custom_text_")
+async def route_custom_text(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    query = update.callback_query
+    button_id = query.data.replace("custom_text_", "")
+    button = next((b for b in CONFIG.get('custom_buttons', []) if b['id'] == button_id), None)
+    if button:
         await query.edit_message_text(
-            text=text,
-            reply_markup=InlineKeyboardMarkup(keyboard),
+            button['value'],
+            reply_markup=InlineKeyboardMarkup([[
+                InlineKeyboardButton("🔙 Retour", callback_data="back_to_home")
+            ]]),
             parse_mode='HTML'
         )
-        return CHOOSING
+    return CHOOSING
 
-    elif query.data.startswith("custom_text_"):
-        button_id = query.data.replace("custom_text_", "")
-        with open('config/config.json', 'r') as f:
-            config = json.load(f)
-        
-        button = next((b for b in config.get('custom_buttons', []) if b['id'] == button_id), None)
-        if button:
-            await query.edit_message_text(
-                button['value'],
-                reply_markup=InlineKeyboardMarkup([[
-                    InlineKeyboardButton("🔙 Retour", callback_data="back_to_home")
-                ]]),
-                parse_mode='HTML'
-            )
+@callback_router.exact("show_custom_buttons")
+async def route_show_custom_buttons(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    query = update.callback_query
+    if str(update.effective_user.id) not in ADMIN_IDS:
+        await query.answer("❌ Vous n'êtes pas autorisé à accéder à cette fonction.")
         return CHOOSING
 
-    elif query.data == "show_custom_buttons":
-        if str(update.effective_user.id) not in ADMIN_IDS:
-            await query.answer("❌ Vous n'êtes pas autorisé à accéder à cette fonction.")
-            return CHOOSING
+    keyboard = [
+        [InlineKeyboardButton("➕ Ajouter un bouton", callback_data="add_custom_button")],
+        [InlineKeyboardButton("❌ Supprimer un bouton", callback_data="list_buttons_delete")],
+        [InlineKeyboardButton("✏️ Modifier un bouton", callback_data="list_buttons_edit")],
+        [InlineKeyboardButton("🔙 Retour", callback_data="admin")]
+    ]
 
-        keyboard = [
-            [InlineKeyboardButton("➕ Ajouter un bouton", callback_data="add_custom_button")],
-            [InlineKeyboardButton("❌ Supprimer un bouton", callback_data="list_buttons_delete")],
-            [InlineKeyboardButton("✏️ Modifier un bouton", callback_data="list_buttons_edit")],
-            [InlineKeyboardButton("🔙 Retour", callback_data="admin")]
-        ]
+    await query.edit_message_text(
+        "🔧 Gestion des boutons personnalisés\n\n"
+        "Choisissez une action :",
+        reply_markup=InlineKeyboardMarkup(keyboard),
+        parse_mode='HTML'  
+    )
+    return CHOOSING
 
-        await query.edit_message_text(
-            "🔧 Gestion des boutons personnalisés\n\n"
-            "Choisissez une action :",
-            reply_markup=InlineKeyboardMarkup(keyboard),
-            parse_mode='HTML'  
-        )
+@callback_router.exact("add_custom_button")
+async def route_add_custom_button(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    query = update.callback_query
+    if str(update.effective_user.id) not in ADMIN_IDS:
+        await query.answer("Vous n'êtes pas autorisé à accéder à cette fonction.")
         return CHOOSING
 
-    elif query.data == "add_custom_button":
-        if str(update.effective_user.id) not in ADMIN_IDS:
-            await query.answer("Vous n'êtes pas autorisé à accéder à cette fonction.")
-            return CHOOSING
-
-        await query.edit_message_text(
-            "Ajout d'un nouveau bouton\n\n"
-            "Envoyez le nom du bouton (exemple: 'Mon Bouton') :",
-            reply_markup=InlineKeyboardMarkup([[
-                InlineKeyboardButton("Retour", callback_data="show_custom_buttons")
-            ]])
-        )
-        return WAITING_BUTTON_NAME
+    await query.edit_message_text(
+        "Ajout d'un nouveau bouton\n\n"
+        "Envoyez le nom du bouton (exemple: 'Mon Bouton') :",
+        reply_markup=InlineKeyboardMarkup([[
+            InlineKeyboardButton("Retour", callback_data="show_custom_buttons")
+        ]])
+    )
+    return WAITING_BUTTON_NAME
 
-    elif query.data == "list_buttons_delete":
-        if str(update.effective_user.id) not in ADMIN_IDS:
-            await query.answer("Vous n'êtes pas autorisé à accéder à cette fonction.")
-            return CHOOSING
-        
-        with open('config/config.json', 'r', encoding='utf-8') as f:
-            config = json.load(f)
-        
-        buttons = config.get('custom_buttons', [])
-        if not buttons:
-            await query.edit_message_text(
-                "Aucun bouton personnalise n'existe.",
-                reply_markup=InlineKeyboardMarkup([[
-                    InlineKeyboardButton("Retour", callback_data="show_custom_buttons")
-                ]])
-            )
-            return CHOOSING
-        
-        keyboard = []
-        for button in buttons:
-            keyboard.append([InlineKeyboardButton(
-                f"Supprimer {button['name']}", 
-                callback_data=f"delete_button_{button['id']}"
-            )])
-        
-        keyboard.append([InlineKeyboardButton("Retour", callback_data="show_custom_buttons")])
-        
-        await query.edit_message_text(
-            "Selectionnez le bouton a supprimer :",
-            reply_markup=InlineKeyboardMarkup(keyboard)
-        )
+@callback_router.exact("list_buttons_delete")
+async def route_list_buttons_delete(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    query = update.callback_query
+    if str(update.effective_user.id) not in ADMIN_IDS:
+        await query.answer("Vous n'êtes pas autorisé à accéder à cette fonction.")
         return CHOOSING
 
-    elif query.data.startswith("delete_button_"):
-        if str(update.effective_user.id) not in ADMIN_IDS:
-            await query.answer("❌ Vous n'êtes pas autorisé à accéder à cette fonction.")
-            return CHOOSING
-        
-        button_id = query.data.replace("delete_button_", "")
-        
-        with open('config/config.json', 'r', encoding='utf-8') as f:
-            config = json.load(f)
-        
-        config['custom_buttons'] = [b for b in config.get('custom_buttons', []) if b['id'] != button_id]
-        
-        with open('config/config.json', 'w', encoding='utf-8') as f:
-            json.dump(config, f, indent=4)
-        
+    config = await load_config()
+
+    buttons = config.get('custom_buttons', [])
+    if not buttons:
         await query.edit_message_text(
-            "✅ Bouton supprimé avec succès !",
+            "Aucun bouton personnalise n'existe.",
             reply_markup=InlineKeyboardMarkup([[
-                InlineKeyboardButton("🔙 Retour", callback_data="show_custom_buttons")
+                InlineKeyboardButton("Retour", callback_data="show_custom_buttons")
             ]])
         )
         return CHOOSING
 
-    elif query.data == "list_buttons_edit":
-        if str(update.effective_user.id) not in ADMIN_IDS:
-            await query.answer("❌ Vous n'êtes pas autorisé à accéder à cette fonction.")
-            return CHOOSING
-        
-        with open('config/config.json', 'r', encoding='utf-8') as f:
-            config = json.load(f)
-        
-        buttons = config.get('custom_buttons', [])
-        if not buttons:
-            await query.edit_message_text(
-                "Aucun bouton personnalisé n'existe.",
-                reply_markup=InlineKeyboardMarkup([[
-                    InlineKeyboardButton("🔙 Retour", callback_data="show_custom_buttons")
-                ]])
-            )
-            return CHOOSING
-        
-        keyboard = []
-        for button in buttons:
-            keyboard.append([InlineKeyboardButton(
-                f"✏️ {button['name']}", 
-                callback_data=f"edit_button_{button['id']}"
-            )])
-        
-        keyboard.append([InlineKeyboardButton("🔙 Retour", callback_data="show_custom_buttons")])
-        
-        await query.edit_message_text(
-            "Sélectionnez le bouton à modifier :",
-            reply_markup=InlineKeyboardMarkup(keyboard)
-        )
-        return CHOOSING
+    keyboard = []
+    for button in buttons:
+        keyboard.append([InlineKeyboardButton(
+            f"Supprimer {button['name']}", 
+            callback_data=f"delete_button_{button['id']}"
+        )])
 
-    elif query.data.startswith("edit_button_"):
-        if str(update.effective_user.id) not in ADMIN_IDS:
-            await query.answer("❌ Vous n'êtes pas autorisé à accéder à cette fonction.")
-            return CHOOSING
-        
-        button_id = query.data.replace("edit_button_", "")
-        context.user_data['editing_button_id'] = button_id
-        
-        with open('config/config.json', 'r', encoding='utf-8') as f:
-            config = json.load(f)
-        
-        button = next((b for b in config.get('custom_buttons', []) if b['id'] == button_id), None)
-        if button:
-            keyboard = [
-                [InlineKeyboardButton("✏️ Modifier le nom", callback_data=f"edit_button_name_{button_id}")],
-                [InlineKeyboardButton("🔗 Modifier la valeur", callback_data=f"edit_button_value_{button_id}")],
-                [InlineKeyboardButton("🔙 Retour", callback_data="list_buttons_edit")]
-            ]
-            
-            await query.edit_message_text(
-                f"Modification du bouton : {button['name']}\n"
-                f"Type actuel : {button['type']}\n"
-                f"Valeur actuelle : {button['value']}\n\n"
-                "Que souhaitez-vous modifier ?",
-                reply_markup=InlineKeyboardMarkup(keyboard)
-            )
-            return CHOOSING
+    keyboard.append([InlineKeyboardButton("Retour", callback_data="show_custom_buttons")])
 
-    elif query.data.startswith("edit_button_name_"):
-        button_id = query.data.replace("edit_button_name_", "")
-        context.user_data['editing_button_id'] = button_id
-        context.user_data['editing_button_field'] = 'name'
-        
-        await query.edit_message_text(
-            "✏️ Envoyez le nouveau nom du bouton :",
-            reply_markup=InlineKeyboardMarkup([[
-                InlineKeyboardButton("🔙 Annuler", callback_data=f"edit_button_{button_id}")
+    await query.edit_message_text(
+        "Selectionnez le bouton a supprimer :",
+        reply_markup=InlineKeyboardMarkup(keyboard)
+    )
+    return CHOOSING
+
+@callback_router.prefix("delete_button_")
+async def route_delete_button(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    query = update.callback_query
+    if str(update.effective_user.id) not in ADMIN_IDS:
+        await query.answer("❌ Vous n'êtes pas autorisé à accéder à cette fonction.")
+        return CHOOSING
+
+    button_id = query.data.replace("delete_button_", "")
+
+    config = await load_config()
+
+    config['custom_buttons'] = [b for b in config.get('custom_buttons', []) if b['id'] != button_id]
+
+    await save_config(config)
+    refresh_home_screen(config)
+
+    await query.edit_message_text(
+        "✅ Bouton supprimé avec succès !",
+        reply_markup=InlineKeyboardMarkup([[
+            InlineKeyboardButton("🔙 Retour", callback_data="show_custom_buttons")
+        ]])
+    )
+    return CHOOSING
+
+@callback_router.exact("list_buttons_edit")
+async def route_list_buttons_edit(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    query = update.callback_query
+    if str(update.effective_user.id) not in ADMIN_IDS:
+        await query.answer("❌ Vous n'êtes pas autorisé à accéder à cette fonction.")
+        return CHOOSING
+
+    config = await load_config()
+
+    buttons = config.get('custom_buttons', [])
+    if not buttons:
+        await query.edit_message_text(
+            "Aucun bouton personnalisé n'existe.",
+            reply_markup=InlineKeyboardMarkup([[
+                InlineKeyboardButton("🔙 Retour", callback_data="show_custom_buttons")
             ]])
         )
-        return WAITING_BUTTON_NAME
+        return CHOOSING
+
+    keyboard = []
+    for button in buttons:
+        keyboard.append([InlineKeyboardButton(
+            f"✏️ {button['name']}", 
+            callback_data=f"edit_button_{button['id']}"
+        )])
+
+    keyboard.append([InlineKeyboardButton("🔙 Retour", callback_data="show_custom_buttons")])
+
+    await query.edit_message_text(
+        "Sélectionnez le bouton à modifier :",
+        reply_markup=InlineKeyboardMarkup(keyboard)
+    )
+    return CHOOSING
+
+@callback_router.prefix("edit_button_")
+async def route_edit_button(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    query = update.callback_query
+    if str(update.effective_user.id) not in ADMIN_IDS:
+        await query.answer("❌ Vous n'êtes pas autorisé à accéder à cette fonction.")
+        return CHOOSING
+
+    button_id = query.data.replace("edit_button_", "")
+    context.user_data['editing_button_id'] = button_id
+
+    config = await load_config()
+
+    button = next((b for b in config.get('custom_buttons', []) if b['id'] == button_id), None)
+    if button:
+        keyboard = [
+            [InlineKeyboardButton("✏️ Modifier le nom", callback_data=f"edit_button_name_{button_id}")],
+            [InlineKeyboardButton("🔗 Modifier la valeur", callback_data=f"edit_button_value_{button_id}")],
+            [InlineKeyboardButton("🔙 Retour", callback_data="list_buttons_edit")]
+        ]
 
-    elif query.data.startswith("edit_button_value_"):
-        button_id = query.data.replace("edit_button_value_", "")
-        context.user_data['editing_button_id'] = button_id
-        context.user_data['editing_button_field'] = 'value'
-        
         await query.edit_message_text(
-            "✏️ Envoyez la nouvelle valeur du bouton :\n\n"
-            "• Pour un bouton URL : envoyez un lien commençant par http:// ou https://\n"
-            "• Pour un bouton texte : envoyez le texte à afficher",
+            f"Modification du bouton : {button['name']}\n"
+            f"Type actuel : {button['type']}\n"
+            f"Valeur actuelle : {button['value']}\n\n"
+            "Que souhaitez-vous modifier ?",
+            reply_markup=InlineKeyboardMarkup(keyboard)
+        )
+        return CHOOSING
+
+@callback_router.prefix("edit_button_name_")
+async def route_edit_button_name(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    query = update.callback_query
+    button_id = query.data.replace("edit_button_name_", "")
+    context.user_data['editing_button_id'] = button_id
+    context.user_data['editing_button_field'] = 'name'
+
+    await query.edit_message_text(
+        "✏️ Envoyez le nouveau nom du bouton :",
+        reply_markup=InlineKeyboardMarkup([[
+            InlineKeyboardButton("🔙 Annuler", callback_data=f"edit_button_{button_id}")
+        ]])
+    )
+    return WAITING_BUTTON_NAME
+
+@callback_router.prefix("edit_button_value_")
+async def route_edit_button_value(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    query = update.callback_query
+    button_id = query.data.replace("edit_button_value_", "")
+    context.user_data['editing_button_id'] = button_id
+    context.user_data['editing_button_field'] = 'value'
+
+    await query.edit_message_text(
+        "✏️ Envoyez la nouvelle valeur du bouton :\n\n"
+        "• Pour un bouton URL : envoyez un lien commençant par http:// ou https://\n"
+        "• Pour un bouton texte : envoyez le texte à afficher",
+        reply_markup=InlineKeyboardMarkup([[
+            InlineKeyboardButton("🔙 Annuler", callback_data=f"edit_button_{button_id}")
+        ]])
+    )
+    return WAITING_BUTTON_VALUE
+
+@callback_router.exact("edit_banner_image")
+async def route_edit_banner_image(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    query = update.callback_query
+    msg = await query.message.edit_text(
+        "📸 Veuillez envoyer la nouvelle image bannière :",
+        reply_markup=InlineKeyboardMarkup([[
+            InlineKeyboardButton("🔙 Annuler", callback_data="cancel_edit")
+        ]])
+    )
+    context.user_data['banner_msg'] = msg
+    return WAITING_BANNER_IMAGE
+
+@callback_router.exact("manage_users")
+async def route_manage_users(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    return await admin_features.handle_user_management(update, context)
+
+@callback_router.exact("start_broadcast")
+async def route_start_broadcast(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    return await admin_features.handle_broadcast(update, context)
+
+@callback_router.exact("add_category")
+async def route_add_category(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    query = update.callback_query
+    await query.message.edit_text(
+        "📝 Veuillez entrer le nom de la nouvelle catégorie:",
+        reply_markup=InlineKeyboardMarkup([[
+            InlineKeyboardButton("🔙 Annuler", callback_data="cancel_add_category")
+        ]])
+    )
+    return WAITING_CATEGORY_NAME
+
+@callback_router.exact("add_product")
+@packed_route(CB_ADD_PRODUCT_PAGE)
+async def route_add_product(update: Update, context: ContextTypes.DEFAULT_TYPE, payload=None):
+    query = update.callback_query
+    reply_markup, _, _ = add_product_menu.render(page=payload.page if payload else 0)
+
+    await query.message.edit_text(
+        "📝 Sélectionnez la catégorie pour le nouveau produit:",
+        reply_markup=reply_markup
+    )
+    return SELECTING_CATEGORY
+
+@packed_route(CB_SELECT_CATEGORY)
+async def route_select_category(update: Update, context: ContextTypes.DEFAULT_TYPE, payload):
+    query = update.callback_query
+    category = category_index.name_of(payload.id)
+    if category is None:
+        return await navigation_expired(query)
+    context.user_data['temp_product_category'] = category
+
+    await query.message.edit_text(
+        "📝 Veuillez entrer le nom du nouveau produit:",
+        reply_markup=InlineKeyboardMarkup([[
+            InlineKeyboardButton("🔙 Annuler", callback_data="cancel_add_product")
+        ]])
+    )
+    return WAITING_PRODUCT_NAME
+
+@callback_router.exact("delete_product")
+@packed_route(CB_DELETE_PRODUCT_PAGE)
+async def route_delete_product(update: Update, context: ContextTypes.DEFAULT_TYPE, payload=None):
+    query = update.callback_query
+    try:
+        reply_markup, _, _ = delete_product_menu.render(page=payload.page if payload else 0)
+
+        await query.message.edit_text(
+            "⚠️ Sélectionnez la catégorie du produit à supprimer:",
+            reply_markup=reply_markup
+        )
+        return SELECTING_CATEGORY_TO_DELETE
+    except Exception as e:
+        logger.error(f"Erreur dans delete_product: {e}")
+        await query.message.edit_text(
+            "Une erreur s'est produite. Veuillez réessayer.",
             reply_markup=InlineKeyboardMarkup([[
-                InlineKeyboardButton("🔙 Annuler", callback_data=f"edit_button_{button_id}")
+                InlineKeyboardButton("🔙 Retour au menu", callback_data="admin")
             ]])
         )
-        return WAITING_BUTTON_VALUE
+        return CHOOSING
 
+@packed_route(CB_DELETE_PRODUCT_CATEGORY)
+async def route_delete_product_category(update: Update, context: ContextTypes.DEFAULT_TYPE, payload):
+    query = update.callback_query
+    try:
+        category = category_index.name_of(payload.id)
+        if category is None:
+            return await navigation_expired(query)
 
+        reply_markup, _, _ = delete_product_products_menu.render(category, payload.page)
 
-    elif query.data == "edit_banner_image":
-            msg = await query.message.edit_text(
-                "📸 Veuillez envoyer la nouvelle image bannière :",
-                reply_markup=InlineKeyboardMarkup([[
-                    InlineKeyboardButton("🔙 Annuler", callback_data="cancel_edit")
-                ]])
+        await query.message.edit_text(
+            f"⚠️ Sélectionnez le produit à supprimer de *{category}* :",
+            reply_markup=reply_markup,
+            parse_mode='Markdown'
+        )
+        return SELECTING_PRODUCT_TO_DELETE
+    except Exception as e:
+        logger.error(f"Erreur dans delete_product_category: {e}")
+        await query.message.edit_text(
+            "Une erreur s'est produite. Veuillez réessayer.",
+            reply_markup=InlineKeyboardMarkup([[
+                InlineKeyboardButton("🔙 Retour au menu", callback_data="admin")
+            ]])
+        )
+        return CHOOSING
+
+@packed_route(CB_CONFIRM_DELETE_PRODUCT)
+async def route_confirm_delete_product(update: Update, context: ContextTypes.DEFAULT_TYPE, payload):
+    query = update.callback_query
+    try:
+        product = product_index.get_product(payload.id)
+        if product is None:
+            return await navigation_expired(query)
+
+        keyboard = [[
+            InlineKeyboardButton(
+                "✅ Oui, supprimer",
+                callback_data=product_callback(CB_REALLY_DELETE_PRODUCT, product['id'])
+            ),
+            InlineKeyboardButton(
+                "❌ Non, annuler",
+                callback_data="cancel_delete_product"
             )
-            context.user_data['banner_msg'] = msg
-            return WAITING_BANNER_IMAGE
+        ]]
+
+        await query.message.edit_text(
+            f"⚠️ *Êtes-vous sûr de vouloir supprimer le produit* `{product['name']}` *?*\n\n"
+            f"Cette action est irréversible !",
+            reply_markup=InlineKeyboardMarkup(keyboard),
+            parse_mode='Markdown'
+        )
+        return SELECTING_PRODUCT_TO_DELETE
+    except Exception as e:
+        logger.error(f"Erreur lors de la confirmation de suppression: {e}")
+        await query.message.edit_text(
+            "Une erreur s'est produite. Veuillez réessayer.",
+            reply_markup=InlineKeyboardMarkup([[
+                InlineKeyboardButton("🔙 Retour au menu", callback_data="admin")
+            ]])
+        )
+        return CHOOSING
 
-    elif query.data == "manage_users":
-        return await admin_features.handle_user_management(update, context)
+@packed_route(CB_REALLY_DELETE_PRODUCT)
+async def route_really_delete_product(update: Update, context: ContextTypes.DEFAULT_TYPE, payload):
+    query = update.callback_query
+    try:
+        entry = product_index.get(payload.id)
+        if entry is None:
+            return await navigation_expired(query)
 
-    elif query.data == "start_broadcast":
-        return await admin_features.handle_broadcast(update, context)
+        category, _, product = entry
+        CATALOG[category] = [p for p in CATALOG[category] if p.get('id') != product['id']]
+        await save_catalog(CATALOG, category)
+        catalog_changed(category)
 
-    elif query.data == "add_category":
         await query.message.edit_text(
-            "📝 Veuillez entrer le nom de la nouvelle catégorie:",
+            f"✅ Le produit *{product['name']}* a été supprimé avec succès !",
+            parse_mode='Markdown',
             reply_markup=InlineKeyboardMarkup([[
-                InlineKeyboardButton("🔙 Annuler", callback_data="cancel_add_category")
+                InlineKeyboardButton("🔙 Retour au menu", callback_data="admin")
             ]])
         )
-        return WAITING_CATEGORY_NAME
+        return CHOOSING
+    except Exception as e:
+        logger.error(f"Erreur lors de la suppression du produit: {e}")
+        await query.message.edit_text(
+            "Une erreur s'est produite lors de la suppression. Veuillez réessayer.",
+            reply_markup=InlineKeyboardMarkup([[
+                InlineKeyboardButton("🔙 Retour au menu", callback_data="admin")
+            ]])
+        )
+        return CHOOSING
+
+@callback_router.exact("delete_category")
+@packed_route(CB_DELETE_CATEGORY_PAGE)
+async def route_delete_category(update: Update, context: ContextTypes.DEFAULT_TYPE, payload=None):
+    query = update.callback_query
+    try:
+        reply_markup, _, _ = delete_category_menu.render(page=payload.page if payload else 0)
 
-    elif query.data == "add_product":
-        keyboard = []
-        for category in CATALOG.keys():
-            if category != 'stats':
-                keyboard.append([InlineKeyboardButton(category, callback_data=f"select_category_{category}")])
-        keyboard.append([InlineKeyboardButton("🔙 Annuler", callback_data="cancel_add_product")])
-        
         await query.message.edit_text(
-            "📝 Sélectionnez la catégorie pour le nouveau produit:",
-            reply_markup=InlineKeyboardMarkup(keyboard)
+            "⚠️ Sélectionnez la catégorie à supprimer:",
+            reply_markup=reply_markup
         )
-        return SELECTING_CATEGORY
+        return SELECTING_CATEGORY_TO_DELETE
 
-    elif query.data.startswith("select_category_"):
-        if not query.data.startswith("select_category_to_delete_"):
-            category = query.data.replace("select_category_", "")
-            context.user_data['temp_product_category'] = category
-            
-            await query.message.edit_text(
-                "📝 Veuillez entrer le nom du nouveau produit:",
-                reply_markup=InlineKeyboardMarkup([[
-                    InlineKeyboardButton("🔙 Annuler", callback_data="cancel_add_product")
-                ]])
-            )
-            return WAITING_PRODUCT_NAME
+    except Exception as e:
+        logger.error(f"Erreur dans delete_category: {e}")
+        await query.message.edit_text(
+            "Une erreur s'est produite. Veuillez réessayer.",
+            reply_markup=InlineKeyboardMarkup([[
+                InlineKeyboardButton("🔙 Retour au menu", callback_data="admin")
+            ]])
+        )
+        return CHOOSING
 
-    elif query.data == "delete_product":
-        try:
-            keyboard = []
-            for category in CATALOG.keys():
-                if category != 'stats':
-                    safe_callback = create_safe_callback_data(
-                        "del_prod_cat",
-                        category
-                    )
-                    store_callback_mapping(safe_callback, category)
-                    
-                    keyboard.append([
-                        InlineKeyboardButton(
-                            category[:50],  
-                            callback_data=safe_callback
-                        )
-                    ])
-            keyboard.append([
-                InlineKeyboardButton("🔙 Annuler", callback_data="cancel_delete_product")
-            ])
-            
-            await query.message.edit_text(
-                "⚠️ Sélectionnez la catégorie du produit à supprimer:",
-                reply_markup=InlineKeyboardMarkup(keyboard)
-            )
-            return SELECTING_CATEGORY_TO_DELETE
-        except Exception as e:
-            print(f"Erreur dans delete_product: {e}")
-            await query.message.edit_text(
-                "Une erreur s'est produite. Veuillez réessayer.",
-                reply_markup=InlineKeyboardMarkup([[
-                    InlineKeyboardButton("🔙 Retour au menu", callback_data="admin")
-                ]])
+@packed_route(CB_DELETE_CATEGORY)
+async def route_delete_category_selected(update: Update, context: ContextTypes.DEFAULT_TYPE, payload):
+    query = update.callback_query
+    try:
+        category = category_index.name_of(payload.id)
+        if category is None:
+            return await navigation_expired(query)
+
+        keyboard = [[
+            InlineKeyboardButton(
+                "✅ Oui, supprimer",
+                callback_data=category_callback(CB_CONFIRM_DELETE_CATEGORY, category)
+            ),
+            InlineKeyboardButton(
+                "❌ Non, annuler",
+                callback_data="cancel_delete_category"
             )
-            return CHOOSING
+        ]]
 
-    elif query.data.startswith("del_prod_cat_"):
-        try:
-            category = get_original_data(query.data)
-            if not category:
-                raise ValueError("Catégorie non trouvée")
-                
-            products = CATALOG.get(category, [])
-            keyboard = []
-            
-            for product in products:
-                if isinstance(product, dict):
-                    product_data = f"{category}|||{product['name']}"
-                    safe_callback = create_safe_callback_data(
-                        "confirm_del_prod",
-                        product_data
-                    )
-                    store_callback_mapping(safe_callback, product_data)
-                    
-                    keyboard.append([
-                        InlineKeyboardButton(
-                            product['name'][:50],  
-                            callback_data=safe_callback
-                        )
-                    ])
-                    
-            keyboard.append([
-                InlineKeyboardButton("🔙 Annuler", callback_data="cancel_delete_product")
-            ])
+        await query.message.edit_text(
+            f"⚠️ *Êtes-vous sûr de vouloir supprimer la catégorie* `{category}` *?*\n\n"
+            f"Cette action supprimera également tous les produits de cette catégorie.\n"
+            f"Cette action est irréversible !",
+            reply_markup=InlineKeyboardMarkup(keyboard),
+            parse_mode='Markdown'
+        )
+        return SELECTING_CATEGORY_TO_DELETE
 
-            await query.message.edit_text(
-                f"⚠️ Sélectionnez le produit à supprimer de *{category}* :",
-                reply_markup=InlineKeyboardMarkup(keyboard),
-                parse_mode='Markdown'
-            )
-            return SELECTING_PRODUCT_TO_DELETE
-        except Exception as e:
-            print(f"Erreur dans delete_product_category: {e}")
-            await query.message.edit_text(
-                "Une erreur s'est produite. Veuillez réessayer.",
-                reply_markup=InlineKeyboardMarkup([[
-                    InlineKeyboardButton("🔙 Retour au menu", callback_data="admin")
-                ]])
-            )
-            return CHOOSING
+    except Exception as e:
+        logger.error(f"Erreur dans la confirmation de suppression: {e}")
+        await query.message.edit_text(
+            "Une erreur s'est produite. Veuillez réessayer.",
+            reply_markup=InlineKeyboardMarkup([[
+                InlineKeyboardButton("🔙 Retour au menu", callback_data="admin")
+            ]])
+        )
+        return CHOOSING
+
+@packed_route(CB_CONFIRM_DELETE_CATEGORY)
+async def route_confirm_delete_category(update: Update, context: ContextTypes.DEFAULT_TYPE, payload):
+    query = update.callback_query
+    try:
+        category = category_index.name_of(payload.id)
+        if category is None:
+            return await navigation_expired(query)
+
+        del CATALOG[category]
+        await save_catalog(CATALOG, category)
+        catalog_changed(category)
+
+        await query.message.edit_text(
+            f"✅ La catégorie a été supprimée avec succès !",
+            reply_markup=InlineKeyboardMarkup([[
+                InlineKeyboardButton("🔙 Retour au menu", callback_data="admin")
+            ]])
+        )
+        return CHOOSING
+
+    except Exception as e:
+        logger.error(f"Erreur lors de la suppression: {e}")
+        await query.message.edit_text(
+            "Une erreur s'est produite lors de la suppression. Veuillez réessayer.",
+            reply_markup=InlineKeyboardMarkup([[
+                InlineKeyboardButton("🔙 Retour au menu", callback_data="admin")
+            ]])
+        )
+        return CHOOSING
+
+@callback_router.exact("edit_category")
+@packed_route(CB_EDIT_CATEGORY_PAGE)
+async def route_edit_category(update: Update, context: ContextTypes.DEFAULT_TYPE, payload=None):
+    query = update.callback_query
+    if str(query.from_user.id) in ADMIN_IDS:
+        reply_markup, _, _ = edit_category_menu.render(page=payload.page if payload else 0)
+        await query.message.edit_text(
+            "Choisissez une catégorie à modifier:",
+            reply_markup=reply_markup
+        )
+        return CHOOSING
+
+@packed_route(CB_EDIT_CATEGORY)
+async def route_edit_cat(update: Update, context: ContextTypes.DEFAULT_TYPE, payload):
+    query = update.callback_query
+    if str(query.from_user.id) in ADMIN_IDS:
+        category = category_index.name_of(payload.id)
+        if category is None:
+            return await navigation_expired(query)
+        keyboard = [
+            [InlineKeyboardButton("✏️ Modifier le nom", callback_data=category_callback(CB_EDIT_CATEGORY_NAME, category))],
+            [InlineKeyboardButton("➕ Ajouter SOLD OUT", callback_data=category_callback(CB_ADD_SOLDOUT, category))],
+            [InlineKeyboardButton("🔙 Retour", callback_data="edit_category")]
+        ]
+        await query.message.edit_text(
+            f"Que voulez-vous modifier pour la catégorie *{category}* ?",
+            reply_markup=InlineKeyboardMarkup(keyboard),
+            parse_mode='Markdown'
+        )
+        return CHOOSING
+
+@packed_route(CB_EDIT_CATEGORY_NAME)
+async def route_edit_cat_name(update: Update, context: ContextTypes.DEFAULT_TYPE, payload):
+    query = update.callback_query
+    if str(query.from_user.id) in ADMIN_IDS:
+        category = category_index.name_of(payload.id)
+        if category is None:
+            return await navigation_expired(query)
+        context.user_data['category_to_edit'] = category
+        await query.message.edit_text(
+            f"📝 *Modification du nom de catégorie*\n\n"
+            f"Catégorie actuelle : *{category}*\n\n"
+            f"✍️ Envoyez le nouveau nom pour cette catégorie :",
+            reply_markup=InlineKeyboardMarkup([[
+                InlineKeyboardButton("🔙 Retour", callback_data=category_callback(CB_EDIT_CATEGORY, category))
+            ]]),
+            parse_mode='Markdown'
+        )
+        return WAITING_NEW_CATEGORY_NAME
+
+@packed_route(CB_ADD_SOLDOUT)
+async def route_add_soldout(update: Update, context: ContextTypes.DEFAULT_TYPE, payload):
+    query = update.callback_query
+    if str(query.from_user.id) in ADMIN_IDS:
+        category = category_index.name_of(payload.id)
+        if category is None:
+            return await navigation_expired(query)
+
+        keyboard = [
+            [
+                InlineKeyboardButton("✅ Oui, mettre en SOLD OUT", callback_data=category_callback(CB_CONFIRM_SOLDOUT, category)),
+                InlineKeyboardButton("❌ Non, annuler", callback_data=category_callback(CB_EDIT_CATEGORY, category))
+            ]
+        ]
+        await query.message.edit_text(
+            f"⚠️ *Attention!*\n\n"
+            f"Vous êtes sur le point de mettre la catégorie *{category}* en SOLD OUT.\n\n"
+            f"❗ *Cela supprimera tous les produits existants* dans cette catégorie.\n\n"
+            f"Êtes-vous sûr de vouloir continuer?",
+            reply_markup=InlineKeyboardMarkup(keyboard),
+            parse_mode='Markdown'
+        )
+        return EDITING_CATEGORY
+
+@packed_route(CB_CONFIRM_SOLDOUT)
+async def route_confirm_soldout(update: Update, context: ContextTypes.DEFAULT_TYPE, payload):
+    query = update.callback_query
+    if str(query.from_user.id) in ADMIN_IDS:
+        category = category_index.name_of(payload.id)
+        if category is None:
+            return await navigation_expired(query)
+
+        CATALOG[category] = [{
+            'name': 'SOLD OUT ! ❌',
+            'price': 'Non disponible',
+            'description': 'Cette catégorie est temporairement en rupture de stock.',
+            'media': []
+        }]
+        await save_catalog(CATALOG, category)
+        catalog_changed(category)
+        await query.answer("✅ SOLD OUT ajouté avec succès!")
+
+        reply_markup, _, _ = edit_category_menu.render(
+            page=edit_category_menu.page_of(category_names().index(category))
+        )
+        await query.message.edit_text(
+            "Choisissez une catégorie à modifier:",
+            reply_markup=reply_markup
+        )
+        return EDITING_CATEGORY
+
+@callback_router.exact("toggle_access_code")
+async def route_toggle_access_code(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    query = update.callback_query
+    if str(update.effective_user.id) not in ADMIN_IDS:
+        await query.answer("❌ Vous n'êtes pas autorisé à modifier ce paramètre.")
+        return CHOOSING
+
+    is_enabled = await access_manager.toggle_access_code()
+    status = "activé ✅" if is_enabled else "désactivé ❌"
+
+    await query.answer(f"Le système de code d'accès a été {status}")
+
+    return await show_admin_menu(update, context)
+
+@callback_router.exact("edit_order_button")
+async def route_edit_order_button(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    query = update.callback_query
+    if CONFIG.get('order_url'):
+        current_config = CONFIG['order_url']
+        config_type = "URL"
+    elif CONFIG.get('order_text'):
+        current_config = CONFIG['order_text']
+        config_type = "Texte"
+    else:
+        current_config = 'Non configuré'
+        config_type = "Aucune"
+
+    message = await query.message.edit_text(
+        "🛒 Configuration du bouton Commander 🛒\n\n"
+        f"<b>Configuration actuelle</b> ({config_type}):\n"
+        f"{current_config}\n\n"
+        "Vous pouvez :\n"
+        "• Envoyer un pseudo Telegram (avec ou sans @)\n\n"
+        "• Envoyer un message avec formatage HTML (<b>gras</b>, <i>italique</i>, etc)\n\n"
+        "• Envoyer une URL (commençant par http:// ou https://) pour rediriger vers un site",
+        reply_markup=InlineKeyboardMarkup([[
+            InlineKeyboardButton("🔙 Annuler", callback_data="cancel_edit_order")
+        ]]),
+        parse_mode='HTML'  
+    )
+    context.user_data['edit_order_button_message_id'] = message.message_id
+    return WAITING_ORDER_BUTTON_CONFIG
+
+@callback_router.exact("show_order_text")
+async def route_show_order_text(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    query = update.callback_query
+    try:
+        order_text = CONFIG.get('order_text', "Aucun message configuré")
+
+        # Le bouton de retour à la catégorie du produit (avec sa page) est réutilisé tel quel
+        back_callback = None
+        for markup_row in query.message.reply_markup.inline_keyboard:
+            for button in markup_row:
+                payload = callback_codec.decode(button.callback_data) if button.callback_data else None
+                if payload is not None and payload.route == CB_VIEW_CATEGORY:
+                    back_callback = button.callback_data
+                    break
+            if back_callback:
+                break
+
+        keyboard = [[
+            InlineKeyboardButton("🔙 Retour aux produits", callback_data=back_callback or "show_categories")
+        ]]
+
+        await query.message.edit_text(
+            text=order_text,
+            reply_markup=InlineKeyboardMarkup(keyboard),
+            parse_mode='HTML'
+        )
+        return CHOOSING
+
+    except Exception as e:
+        logger.error(f"Erreur lors de l'affichage du message: {e}")
+        await query.answer("Une erreur est survenue lors de l'affichage du message", show_alert=True)
+        return CHOOSING
+
+@callback_router.exact("edit_welcome")
+async def route_edit_welcome(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    query = update.callback_query
+    current_message = CONFIG.get('welcome_message', "Message non configuré")
+
+    message = await query.message.edit_text(
+        "✏️ Configuration du message d'accueil\n\n"
+        f"Message actuel :\n{current_message}\n\n"
+        "Envoyez le nouveau message d'accueil.\n"
+        "Vous pouvez utiliser le formatage HTML :\n"
+        "• <b>texte</b> pour le gras\n"
+        "• <i>texte</i> pour l'italique\n"
+        "• <u>texte</u> pour le souligné",
+        reply_markup=InlineKeyboardMarkup([[
+            InlineKeyboardButton("🔙 Annuler", callback_data="cancel_edit_welcome")
+        ]]),
+        parse_mode='HTML'
+    )
+    context.user_data['edit_welcome_message_id'] = message.message_id
+    return WAITING_WELCOME_MESSAGE
 
-    elif query.data.startswith("confirm_del_prod_"):
-        try:
-            data = get_original_data(query.data)
-            if not data:
-                raise ValueError("Données non trouvées")
-                
-            category, product_name = data.split("|||")
-            
-            safe_callback = create_safe_callback_data(
-                "really_del_prod",
-                f"{category}|||{product_name}"
-            )
-            store_callback_mapping(safe_callback, data)
-            
-            keyboard = [[
-                InlineKeyboardButton(
-                    "✅ Oui, supprimer",
-                    callback_data=safe_callback
-                ),
-                InlineKeyboardButton(
-                    "❌ Non, annuler",
-                    callback_data="cancel_delete_product"
-                )
-            ]]
-            
-            await query.message.edit_text(
-                f"⚠️ *Êtes-vous sûr de vouloir supprimer le produit* `{product_name}` *?*\n\n"
-                f"Cette action est irréversible !",
-                reply_markup=InlineKeyboardMarkup(keyboard),
-                parse_mode='Markdown'
-            )
-            return SELECTING_PRODUCT_TO_DELETE
-        except Exception as e:
-            print(f"Erreur lors de la confirmation de suppression: {e}")
-            await query.message.edit_text(
-                "Une erreur s'est produite. Veuillez réessayer.",
-                reply_markup=InlineKeyboardMarkup([[
-                    InlineKeyboardButton("🔙 Retour au menu", callback_data="admin")
-                ]])
-            )
-            return CHOOSING
+@callback_router.exact("show_stats")
+async def route_show_stats(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    query = update.callback_query
+    paris_tz = pytz.timezone('Europe/Paris')
+    utc_now = datetime.utcnow()
+    paris_now = utc_now.replace(tzinfo=pytz.UTC).astimezone(paris_tz)
 
-    elif query.data.startswith("really_del_prod_"):
-        try:
-            data = get_original_data(query.data)
-            if not data:
-                raise ValueError("Données non trouvées")
-                
-            category, product_name = data.split("|||")
-            
-            if category in CATALOG:
-                CATALOG[category] = [p for p in CATALOG[category] if p['name'] != product_name]
-                save_catalog(CATALOG)
-                
-                CALLBACK_DATA_MAPPING.pop(query.data, None)
-                
-                await query.message.edit_text(
-                    f"✅ Le produit *{product_name}* a été supprimé avec succès !",
-                    parse_mode='Markdown',
-                    reply_markup=InlineKeyboardMarkup([[
-                        InlineKeyboardButton("🔙 Retour au menu", callback_data="admin")
-                    ]])
-                )
-            else:
-                raise ValueError("Catégorie non trouvée")
-                
-            return CHOOSING
-        except Exception as e:
-            print(f"Erreur lors de la suppression du produit: {e}")
-            await query.message.edit_text(
-                "Une erreur s'est produite lors de la suppression. Veuillez réessayer.",
-                reply_markup=InlineKeyboardMarkup([[
-                    InlineKeyboardButton("🔙 Retour au menu", callback_data="admin")
-                ]])
-            )
-            return CHOOSING
+    stats = stats_aggregator.stats
+    text = "📊 *Statistiques du catalogue*\n\n"
+    text += f"👥 Vues totales: {stats.get('total_views', 0)}\n"
 
-    elif query.data == "delete_category":
+    last_updated = stats.get('last_updated', 'Jamais')
+    if last_updated != 'Jamais':
         try:
-            keyboard = []
-            for category in CATALOG.keys():
-                if category != 'stats':
-                    safe_callback = create_safe_callback_data(
-                        "del_cat",
-                        category
-                    )
-                    store_callback_mapping(safe_callback, category)
-                    
-                    keyboard.append([
-                        InlineKeyboardButton(
-                            category[:50],  
-                            callback_data=safe_callback
-                        )
-                    ])
-            
-            keyboard.append([
-                InlineKeyboardButton("🔙 Annuler", callback_data="cancel_delete_category")
-            ])
-            
-            await query.message.edit_text(
-                "⚠️ Sélectionnez la catégorie à supprimer:",
-                reply_markup=InlineKeyboardMarkup(keyboard)
-            )
-            return SELECTING_CATEGORY_TO_DELETE
-            
+            if len(last_updated) > 8:  
+                dt = datetime.strptime(last_updated, "%Y-%m-%d %H:%M:%S")
+            else: 
+                today = paris_now.strftime("%Y-%m-%d")
+                dt = datetime.strptime(f"{today} {last_updated}", "%Y-%m-%d %H:%M:%S")
+
+            dt = dt.replace(tzinfo=pytz.UTC).astimezone(paris_tz)
+            last_updated = dt.strftime("%H:%M:%S")
         except Exception as e:
-            print(f"Erreur dans delete_category: {e}")
-            await query.message.edit_text(
-                "Une erreur s'est produite. Veuillez réessayer.",
-                reply_markup=InlineKeyboardMarkup([[
-                    InlineKeyboardButton("🔙 Retour au menu", callback_data="admin")
-                ]])
-            )
-            return CHOOSING
+            logger.error(f"Erreur conversion heure: {e}")
+
+    text += f"🕒 Dernière mise à jour: {last_updated}\n"
+
+    if 'last_reset' in stats:
+        text += f"🔄 Dernière réinitialisation: {stats.get('last_reset', 'Jamais')}\n"
+    text += "\n"
+
+    text += "📈 *Vues par catégorie:*\n"
+    top_categories = stats_aggregator.top_categories(STATS_TOP_CATEGORIES)
+    if top_categories:
+        for category, views in top_categories:
+            text += f"- {category}: {views} vues\n"
+        others = stats_aggregator.category_count - len(top_categories)
+        if others > 0:
+            text += f"… et {others} autres catégories\n"
+    else:
+        text += "Aucune vue enregistrée.\n"
 
-    elif query.data.startswith("del_cat_"):
-        try:
-            original_category = get_original_data(query.data)
-            if not original_category:
-                raise ValueError("Catégorie non trouvée")
-                
-            confirm_callback = create_safe_callback_data(
-                "confirm_del",
-                original_category
-            )
-            store_callback_mapping(confirm_callback, original_category)
-            
-            keyboard = [[
-                InlineKeyboardButton(
-                    "✅ Oui, supprimer",
-                    callback_data=confirm_callback
-                ),
-                InlineKeyboardButton(
-                    "❌ Non, annuler",
-                    callback_data="cancel_delete_category"
-                )
-            ]]
-            
-            await query.message.edit_text(
-                f"⚠️ *Êtes-vous sûr de vouloir supprimer la catégorie* `{original_category}` *?*\n\n"
-                f"Cette action supprimera également tous les produits de cette catégorie.\n"
-                f"Cette action est irréversible !",
-                reply_markup=InlineKeyboardMarkup(keyboard),
-                parse_mode='Markdown'
-            )
-            return SELECTING_CATEGORY_TO_DELETE
-            
-        except Exception as e:
-            print(f"Erreur dans la confirmation de suppression: {e}")
-            await query.message.edit_text(
-                "Une erreur s'est produite. Veuillez réessayer.",
-                reply_markup=InlineKeyboardMarkup([[
-                    InlineKeyboardButton("🔙 Retour au menu", callback_data="admin")
-                ]])
-            )
-            return CHOOSING
+    text += "\n━━━━━━━━━━━━━━━\n\n"
 
-    elif query.data.startswith("confirm_del_"):
-        try:
-            original_category = get_original_data(query.data)
-            if not original_category or original_category not in CATALOG:
-                raise ValueError("Catégorie invalide ou non trouvée")
+    text += "🔥 *Produits les plus populaires:*\n"
+    top_products = stats_aggregator.top_products()
+    if top_products:
+        for category, product_name, views in top_products:
+            text += f"- {product_name} ({category}): {views} vues\n"
+    else:
+        text += "Aucune vue enregistrée sur les produits.\n"
 
-            del CATALOG[original_category]
-            save_catalog(CATALOG)
-            
-            CALLBACK_DATA_MAPPING.pop(query.data, None)
-            
-            await query.message.edit_text(
-                f"✅ La catégorie a été supprimée avec succès !",
-                reply_markup=InlineKeyboardMarkup([[
-                    InlineKeyboardButton("🔙 Retour au menu", callback_data="admin")
-                ]])
-            )
-            return CHOOSING
-            
-        except Exception as e:
-            print(f"Erreur lors de la suppression: {e}")
-            await query.message.edit_text(
-                "Une erreur s'est produite lors de la suppression. Veuillez réessayer.",
-                reply_markup=InlineKeyboardMarkup([[
-                    InlineKeyboardButton("🔙 Retour au menu", callback_data="admin")
-                ]])
-            )
-            return CHOOSING
+    keyboard = [
+        [InlineKeyboardButton("🔄 Réinitialiser les statistiques", callback_data="confirm_reset_stats")],
+        [InlineKeyboardButton("🔙 Retour", callback_data="admin")]
+    ]
 
+    await query.message.edit_text(
+        text,
+        reply_markup=InlineKeyboardMarkup(keyboard),
+        parse_mode='Markdown'
+    )
 
-        try:
-            encoded_data = query.data.replace("really_delete_product_", "")
-            category, product_name = decode_callback_data(encoded_data)
-        
-            if category and product_name and category in CATALOG:
-                CATALOG[category] = [p for p in CATALOG[category] if p['name'] != product_name]
-                save_catalog(CATALOG)
-                await query.message.edit_text(
-                    f"✅ Le produit *{html.escape(product_name)}* a été supprimé avec succès !",
-                    parse_mode='Markdown',
-                    reply_markup=InlineKeyboardMarkup([[
-                        InlineKeyboardButton("🔙 Retour au menu", callback_data="admin")
-                    ]])
-                )
-            return CHOOSING
-        except Exception as e:
-            print(f"Erreur lors de la suppression du produit: {e}")
-            return await show_admin_menu(update, context)
+@callback_router.exact("edit_contact")
+async def route_edit_contact(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    query = update.callback_query
 
-    elif query.data == "edit_category":
-        if str(query.from_user.id) in ADMIN_IDS:
-            keyboard = []
-            for category in CATALOG.keys():
-                keyboard.append([InlineKeyboardButton(
-                    f"{category} {'(SOLD OUT ❌)' if not CATALOG[category] else ''}",
-                    callback_data=f"edit_cat_{category}"
-                )])
-            keyboard.append([InlineKeyboardButton("🔙 Retour", callback_data="admin")])
-            await query.message.edit_text(
-                "Choisissez une catégorie à modifier:",
-                reply_markup=InlineKeyboardMarkup(keyboard)
-            )
-            return CHOOSING
+    if CONFIG.get('contact_username'):
+        current_config = f"@{CONFIG['contact_username']}"
+        config_type = "Pseudo Telegram"
+    elif CONFIG.get('contact_url'):
+        current_config = CONFIG['contact_url']
+        config_type = "URL"
+    else:
+        current_config = 'Non configuré'
+        config_type = "Aucune"
+
+    await query.message.edit_text(
+        "📱 Configuration du contact\n\n"
+        f"Configuration actuelle ({config_type}):\n"
+        f"{current_config}\n\n"
+        "Vous pouvez :\n"
+        "• Envoyer un pseudo Telegram (avec ou sans @)\n"
+        "• Envoyer une URL (commençant par http:// ou https://) pour rediriger vers un site",
+        reply_markup=InlineKeyboardMarkup([[
+            InlineKeyboardButton("🔙 Annuler", callback_data="cancel_edit_contact")
+        ]]),
+        parse_mode='HTML'
+    )
+    context.user_data['edit_contact_message_id'] = query.message.message_id
+    return WAITING_CONTACT_USERNAME
 
-    elif query.data.startswith("edit_cat_"):
-        if str(query.from_user.id) in ADMIN_IDS:
-            if query.data.startswith("edit_cat_name_"):
-                category = query.data.replace("edit_cat_name_", "")
-                context.user_data['category_to_edit'] = category
-                await query.message.edit_text(
-                    f"📝 *Modification du nom de catégorie*\n\n"
-                    f"Catégorie actuelle : *{category}*\n\n"
-                    f"✍️ Envoyez le nouveau nom pour cette catégorie :",
-                    reply_markup=InlineKeyboardMarkup([[
-                        InlineKeyboardButton("🔙 Retour", callback_data=f"edit_cat_{category}")
-                    ]]),
-                    parse_mode='Markdown'
-                )
-                return WAITING_NEW_CATEGORY_NAME
-            else:
-                category = query.data.replace("edit_cat_", "")
-                keyboard = [
-                    [InlineKeyboardButton("✏️ Modifier le nom", callback_data=f"edit_cat_name_{category}")],
-                    [InlineKeyboardButton("➕ Ajouter SOLD OUT", callback_data=f"add_soldout_{category}")],
-                    [InlineKeyboardButton("🔙 Retour", callback_data="edit_category")]
-                ]
-                await query.message.edit_text(
-                    f"Que voulez-vous modifier pour la catégorie *{category}* ?",
-                    reply_markup=InlineKeyboardMarkup(keyboard),
-                    parse_mode='Markdown'
-                )
-                return CHOOSING
+@callback_router.exact("cancel_add_category", "cancel_add_product", "cancel_delete_category", "cancel_delete_product",
+                       "cancel_edit_contact", "cancel_edit_order", "cancel_edit_welcome")
+async def route_cancel_to_admin(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    return await show_admin_menu(update, context)
 
-    elif query.data.startswith("edit_cat_name_"):
-        if str(query.from_user.id) in ADMIN_IDS:
-            category = query.data.replace("edit_cat_name_", "")
-            context.user_data['category_to_edit'] = category
-            await query.message.edit_text(
-                f"📝 *Modification du nom de catégorie*\n\n"
-                f"Catégorie actuelle : *{category}*\n\n"
-                f"✍️ Envoyez le nouveau nom pour cette catégorie :",
-                reply_markup=InlineKeyboardMarkup([[
-                    InlineKeyboardButton("🔙 Retour", callback_data=f"edit_cat_{category}")
-                ]]),
+@callback_router.exact(PAGE_INDICATOR)
+async def route_page_indicator(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """Bouton "page x/y" : simple repère, le callback est déjà acquitté"""
+    return None
+
+@callback_router.exact("back_to_categories")
+async def route_back_to_categories(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    query = update.callback_query
+    if context.user_data.get('category_message_category') in CATALOG and 'category_message_id' in context.user_data:
+        text, reply_markup, _ = get_category_listing(
+            context.user_data['category_message_category'],
+            context.user_data.get('category_message_page', 0)
+        )
+        try:
+            await context.bot.edit_message_text(
+                chat_id=query.message.chat_id,
+                message_id=context.user_data['category_message_id'],
+                text=text,
+                reply_markup=reply_markup,
                 parse_mode='Markdown'
             )
-            return WAITING_NEW_CATEGORY_NAME
+        except Exception as e:
+            logger.error(f"Erreur lors de la mise à jour du message des catégories: {e}")
+    else:
+        reply_markup, _, _ = categories_menu.render()
+
+        await query.edit_message_text(
+            "📋 *Menu*\n\n"
+            "Choisissez une catégorie pour voir les produits :",
+            reply_markup=reply_markup,
+            parse_mode='Markdown'
+        )
 
-    elif query.data.startswith("add_soldout_"):
-        if str(query.from_user.id) in ADMIN_IDS:
-            category = query.data.replace("add_soldout_", "")
+@callback_router.exact("skip_media")
+async def route_skip_media(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    category = context.user_data.get('temp_product_category')
+    if category:
+        new_product = {
+            'name': context.user_data.get('temp_product_name'),
+            'price': context.user_data.get('temp_product_price'),
+            'description': context.user_data.get('temp_product_description')
+        }
 
-            keyboard = [
-                [
-                    InlineKeyboardButton("✅ Oui, mettre en SOLD OUT", callback_data=f"confirm_soldout_{category}"),
-                    InlineKeyboardButton("❌ Non, annuler", callback_data=f"edit_cat_{category}")
-                ]
-            ]
-            await query.message.edit_text(
-                f"⚠️ *Attention!*\n\n"
-                f"Vous êtes sur le point de mettre la catégorie *{category}* en SOLD OUT.\n\n"
-                f"❗ *Cela supprimera tous les produits existants* dans cette catégorie.\n\n"
-                f"Êtes-vous sûr de vouloir continuer?",
-                reply_markup=InlineKeyboardMarkup(keyboard),
-                parse_mode='Markdown'
-            )
-            return EDITING_CATEGORY
+        if category not in CATALOG:
+            CATALOG[category] = []
+        CATALOG[category].append(new_product)
+        await save_catalog(CATALOG, category)
+        catalog_changed(category)
 
-    elif query.data.startswith("confirm_soldout_"):
-        if str(query.from_user.id) in ADMIN_IDS:
-            category = query.data.replace("confirm_soldout_", "")
-
-            CATALOG[category] = [{
-                'name': 'SOLD OUT ! ❌',
-                'price': 'Non disponible',
-                'description': 'Cette catégorie est temporairement en rupture de stock.',
-                'media': []
-            }]
-            save_catalog(CATALOG)
-            await query.answer("✅ SOLD OUT ajouté avec succès!")
-                
-            keyboard = []
-            for cat in CATALOG.keys():
-                keyboard.append([InlineKeyboardButton(
-                    f"{cat} {'(SOLD OUT ❌)' if not CATALOG[cat] or (len(CATALOG[cat]) == 1 and CATALOG[cat][0].get('name') == 'SOLD OUT ! ❌') else ''}",
-                    callback_data=f"edit_cat_{cat}"
-                )])
-            keyboard.append([InlineKeyboardButton("🔙 Retour", callback_data="admin")])
-            await query.message.edit_text(
-                "Choisissez une catégorie à modifier:",
-                reply_markup=InlineKeyboardMarkup(keyboard)
-            )
-            return EDITING_CATEGORY
+        context.user_data.clear()
+        return await show_admin_menu(update, context)
 
-    elif query.data == "toggle_access_code":
-            if str(update.effective_user.id) not in ADMIN_IDS:
-                await query.answer("❌ Vous n'êtes pas autorisé à modifier ce paramètre.")
-                return CHOOSING
-            
-            is_enabled = access_manager.toggle_access_code()
-            status = "activé ✅" if is_enabled else "désactivé ❌"
-        
-            await query.answer(f"Le système de code d'accès a été {status}")
-        
-            return await show_admin_menu(update, context)
+# 'single' : un média à la fois, remplacé en place par les boutons ⬅️/➡️
+# 'album' : tous les médias envoyés en une fois (send_media_group), suivis de la fiche du produit
+PRODUCT_MEDIA_MODE = CONFIG.get('product_media_mode', 'single')
 
-    elif query.data == "edit_order_button":
-            if CONFIG.get('order_url'):
-                current_config = CONFIG['order_url']
-                config_type = "URL"
-            elif CONFIG.get('order_text'):
-                current_config = CONFIG['order_text']
-                config_type = "Texte"
-            else:
-                current_config = 'Non configuré'
-                config_type = "Aucune"
+def input_media(media, **kwargs):
+    if media['media_type'] == 'photo':
+        return InputMediaPhoto(media['media_id'], **kwargs)
+    return InputMediaVideo(media['media_id'], **kwargs)
 
-            message = await query.message.edit_text(
-                "🛒 Configuration du bouton Commander 🛒\n\n"
-                f"<b>Configuration actuelle</b> ({config_type}):\n"
-                f"{current_config}\n\n"
-                "Vous pouvez :\n"
-                "• Envoyer un pseudo Telegram (avec ou sans @)\n\n"
-                "• Envoyer un message avec formatage HTML (<b>gras</b>, <i>italique</i>, etc)\n\n"
-                "• Envoyer une URL (commençant par http:// ou https://) pour rediriger vers un site",
-                reply_markup=InlineKeyboardMarkup([[
-                    InlineKeyboardButton("🔙 Annuler", callback_data="cancel_edit_order")
-                ]]),
-                parse_mode='HTML'  
-            )
-            context.user_data['edit_order_button_message_id'] = message.message_id
-            return WAITING_ORDER_BUTTON_CONFIG
+async def send_product_media(query, context, media, caption, reply_markup):
+    """Affiche un média du produit avec sa légende et son clavier
 
-    elif query.data == "show_order_text":
+    Si le message du bouton contient déjà un média, il est modifié en place : un seul
+    appel, sans supprimer puis renvoyer le message. Sinon il est remplacé.
+    """
+    message = query.message
+    if message.photo or message.video:
         try:
-            order_text = CONFIG.get('order_text', "Aucun message configuré")
-        
-            category = None
-            for markup_row in query.message.reply_markup.inline_keyboard:
-                for button in markup_row:
-                    if button.callback_data and button.callback_data.startswith("view_"):
-                        category = button.callback_data.replace("view_", "")
-                        break
-                if category:
-                    break
-        
-            keyboard = [[
-                InlineKeyboardButton("🔙 Retour aux produits", callback_data=f"view_{category}")
-            ]]
-        
-            await query.message.edit_text(
-                text=order_text,
-                reply_markup=InlineKeyboardMarkup(keyboard),
-                parse_mode='HTML'
+            await query.edit_message_media(
+                input_media(media, caption=caption, parse_mode='HTML'),
+                reply_markup=reply_markup
             )
-            return CHOOSING
-        
-        except Exception as e:
-            print(f"Erreur lors de l'affichage du message: {e}")
-            await query.answer("Une erreur est survenue lors de l'affichage du message", show_alert=True)
-            return CHOOSING
+            context.user_data['last_product_message_id'] = message.message_id
+            return
+        except BadRequest as e:
+            if 'not modified' in str(e).lower():
+                return
+            logger.warning(f"Modification du média impossible, renvoi du message: {e}")
 
+    try:
+        await message.delete()
+    except Exception as e:
+        logger.warning(f"Erreur lors de la suppression du message: {e}")
 
-    elif query.data == "edit_welcome":
-            current_message = CONFIG.get('welcome_message', "Message non configuré")
-        
-            message = await query.message.edit_text(
-                "✏️ Configuration du message d'accueil\n\n"
-                f"Message actuel :\n{current_message}\n\n"
-                "Envoyez le nouveau message d'accueil.\n"
-                "Vous pouvez utiliser le formatage HTML :\n"
-                "• <b>texte</b> pour le gras\n"
-                "• <i>texte</i> pour l'italique\n"
-                "• <u>texte</u> pour le souligné",
-                reply_markup=InlineKeyboardMarkup([[
-                    InlineKeyboardButton("🔙 Annuler", callback_data="cancel_edit_welcome")
-                ]]),
+    try:
+        if media['media_type'] == 'photo':
+            sent = await context.bot.send_photo(
+                chat_id=message.chat_id,
+                photo=media['media_id'],
+                caption=caption,
+                reply_markup=reply_markup,
                 parse_mode='HTML'
             )
-            context.user_data['edit_welcome_message_id'] = message.message_id
-            return WAITING_WELCOME_MESSAGE
-
-    elif query.data == "show_stats":
-        paris_tz = pytz.timezone('Europe/Paris')
-        utc_now = datetime.utcnow()
-        paris_now = utc_now.replace(tzinfo=pytz.UTC).astimezone(paris_tz)
-
-        if 'stats' not in CATALOG:
-            CATALOG['stats'] = {
-                "total_views": 0,
-                "category_views": {},
-                "product_views": {},
-                "last_updated": paris_now.strftime("%H:%M:%S"),
-                "last_reset": paris_now.strftime("%Y-%m-%d")
-            }
-    
-        clean_stats()
-    
-        stats = CATALOG['stats']
-        text = "📊 *Statistiques du catalogue*\n\n"
-        text += f"👥 Vues totales: {stats.get('total_views', 0)}\n"
-    
-        last_updated = stats.get('last_updated', 'Jamais')
-        if last_updated != 'Jamais':
-            try:
-                if len(last_updated) > 8:  
-                    dt = datetime.strptime(last_updated, "%Y-%m-%d %H:%M:%S")
-                else: 
-                    today = paris_now.strftime("%Y-%m-%d")
-                    dt = datetime.strptime(f"{today} {last_updated}", "%Y-%m-%d %H:%M:%S")
-            
-                dt = dt.replace(tzinfo=pytz.UTC).astimezone(paris_tz)
-                last_updated = dt.strftime("%H:%M:%S")
-            except Exception as e:
-                print(f"Erreur conversion heure: {e}")
-            
-        text += f"🕒 Dernière mise à jour: {last_updated}\n"
-    
-        if 'last_reset' in stats:
-            text += f"🔄 Dernière réinitialisation: {stats.get('last_reset', 'Jamais')}\n"
-        text += "\n"
-    
-        text += "📈 *Vues par catégorie:*\n"
-        category_views = stats.get('category_views', {})
-        if category_views:
-            sorted_categories = sorted(category_views.items(), key=lambda x: x[1], reverse=True)
-            for category, views in sorted_categories:
-                if category in CATALOG:
-                    text += f"- {category}: {views} vues\n"
-        else:
-            text += "Aucune vue enregistrée.\n"
-
-        text += "\n━━━━━━━━━━━━━━━\n\n"
-    
-        text += "🔥 *Produits les plus populaires:*\n"
-        product_views = stats.get('product_views', {})
-        if product_views:
-            all_products = []
-            for category, products in product_views.items():
-                if category in CATALOG:
-                    existing_products = [p['name'] for p in CATALOG[category]]
-                    for product_name, views in products.items():
-                        if product_name in existing_products:
-                            all_products.append((category, product_name, views))
-        
-            sorted_products = sorted(all_products, key=lambda x: x[2], reverse=True)[:5]
-            for category, product_name, views in sorted_products:
-                text += f"- {product_name} ({category}): {views} vues\n"
         else:
-            text += "Aucune vue enregistrée sur les produits.\n"
-    
-        keyboard = [
-            [InlineKeyboardButton("🔄 Réinitialiser les statistiques", callback_data="confirm_reset_stats")],
-            [InlineKeyboardButton("🔙 Retour", callback_data="admin")]
-        ]
-    
-        await query.message.edit_text(
-            text,
-            reply_markup=InlineKeyboardMarkup(keyboard),
-            parse_mode='Markdown'
+            sent = await context.bot.send_video(
+                chat_id=message.chat_id,
+                video=media['media_id'],
+                caption=caption,
+                reply_markup=reply_markup,
+                parse_mode='HTML'
+            )
+    except Exception as e:
+        logger.error(f"Erreur lors de l'envoi du média: {e}")
+        # Une erreur de légende (HTML, longueur) ne dit rien du média : seul un file_id refusé l'écarte
+        if is_file_id_error(e):
+            media_health.mark_bad(media['media_id'])
+        sent = await context.bot.send_message(
+            chat_id=message.chat_id,
+            text=f"{caption}\n\n⚠️ Le média n'a pas pu être chargé",
+            reply_markup=reply_markup,
+            parse_mode='HTML'
         )
+    context.user_data['last_product_message_id'] = sent.message_id
 
-    elif query.data == "edit_contact":
+async def send_product_album(query, context, media_list, caption, reply_markup):
+    """Mode album : les médias partent en un seul envoi, la fiche et son clavier dans un message à part"""
+    chat_id = query.message.chat_id
+    try:
+        # Un album contient au plus 10 médias
+        messages = await context.bot.send_media_group(
+            chat_id=chat_id,
+            media=[input_media(media) for media in media_list[:10]]
+        )
+    except BadRequest as e:
+        logger.error(f"Erreur lors de l'envoi de l'album: {e}")
+        return await send_product_media(query, context, media_list[0], caption, reply_markup)
 
-            if CONFIG.get('contact_username'):
-                current_config = f"@{CONFIG['contact_username']}"
-                config_type = "Pseudo Telegram"
-            elif CONFIG.get('contact_url'):
-                current_config = CONFIG['contact_url']
-                config_type = "URL"
-            else:
-                current_config = 'Non configuré'
-                config_type = "Aucune"
+    context.user_data['last_product_album_ids'] = [message.message_id for message in messages]
+    try:
+        await query.message.delete()
+    except Exception as e:
+        logger.warning(f"Erreur lors de la suppression du message: {e}")
 
-            message = await query.message.edit_text(
-                "📱 Configuration du contact\n\n"
-                f"Configuration actuelle ({config_type}):\n"
-                f"{current_config}\n\n"
-                "Vous pouvez :\n"
-                "• Envoyer un pseudo Telegram (avec ou sans @)\n"
-                "• Envoyer une URL (commençant par http:// ou https://) pour rediriger vers un site",
-                reply_markup=InlineKeyboardMarkup([[
-                    InlineKeyboardButton("🔙 Annuler", callback_data="cancel_edit_contact")
-                ]]),
-                parse_mode='HTML'
-            )
-            context.user_data['edit_contact_message_id'] = query.message.message_id
-            return WAITING_CONTACT_USERNAME
+    sent = await context.bot.send_message(
+        chat_id=chat_id,
+        text=caption,
+        reply_markup=reply_markup,
+        parse_mode='HTML'
+    )
+    context.user_data['last_product_message_id'] = sent.message_id
 
-    elif query.data in ["cancel_add_category", "cancel_add_product", "cancel_delete_category", 
-                        "cancel_delete_product", "cancel_edit_contact", "cancel_edit_order", "cancel_edit_welcome"]:
-        return await show_admin_menu(update, context)
+async def delete_product_album(context, chat_id):
+    """Supprime l'album du produit affiché précédemment (mode album)"""
+    for message_id in context.user_data.pop('last_product_album_ids', []):
+        try:
+            await context.bot.delete_message(chat_id=chat_id, message_id=message_id)
+        except Exception as e:
+            logger.warning(f"Erreur lors de la suppression de l'album: {e}")
 
-    elif query.data == "back_to_categories":
-        if 'category_message_id' in context.user_data:
-            try:
-                await context.bot.edit_message_text(
-                    chat_id=query.message.chat_id,
-                    message_id=context.user_data['category_message_id'],
-                    text=context.user_data['category_message_text'],
-                    reply_markup=InlineKeyboardMarkup(context.user_data['category_message_reply_markup']),
-                    parse_mode='Markdown'
-                )
-            except Exception as e:
-                print(f"Erreur lors de la mise à jour du message des catégories: {e}")
-        else:
-            keyboard = []
-            for category in CATALOG.keys():
-                if category != 'stats':
-                    keyboard.append([InlineKeyboardButton(category, callback_data=f"view_{category}")])
+@callback_router.prefix("product_", "next_", "prev_")
+async def route_legacy_product(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """Anciens boutons produit : leur identifiant aléatoire à 4 chiffres peut désigner un autre produit"""
+    query = update.callback_query
+    if query.message.text is not None:
+        return await navigation_expired(query, "show_categories")
 
-            keyboard.append([InlineKeyboardButton("🔙 Retour à l'accueil", callback_data="back_to_home")])
+    # Fiche produit avec média : pas de texte à éditer, le message est remplacé
+    try:
+        await query.message.delete()
+    except Exception as e:
+        logger.warning(f"Erreur lors de la suppression de l'ancien message: {e}")
+    await context.bot.send_message(
+        chat_id=query.message.chat_id,
+        text="⌛ Ce menu a expiré. Veuillez choisir à nouveau une catégorie.",
+        reply_markup=InlineKeyboardMarkup([[
+            InlineKeyboardButton("📋 Voir les catégories", callback_data="show_categories")
+        ]])
+    )
+    return CHOOSING
 
-            await query.edit_message_text(
-                "📋 *Menu*\n\n"
-                "Choisissez une catégorie pour voir les produits :",
-                reply_markup=InlineKeyboardMarkup(keyboard),
-                parse_mode='Markdown'
-            )
+@packed_route(CB_PRODUCT)
+async def route_product(update: Update, context: ContextTypes.DEFAULT_TYPE, payload):
+    query = update.callback_query
+    try:
+        product_id = payload.id
+        entry = product_index.get(product_id)
 
-    elif query.data == "skip_media":
-        category = context.user_data.get('temp_product_category')
-        if category:
-            new_product = {
-                'name': context.user_data.get('temp_product_name'),
-                'price': context.user_data.get('temp_product_price'),
-                'description': context.user_data.get('temp_product_description')
-            }
-            
-            if category not in CATALOG:
-                CATALOG[category] = []
-            CATALOG[category].append(new_product)
-            save_catalog(CATALOG)
-            
-            context.user_data.clear()
-            return await show_admin_menu(update, context)
-            
-    elif query.data.startswith("product_"):
-        try:
-            _, nav_id = query.data.split("_", 1)
-            print(f"nav_id reçu: {nav_id}")
-            product_info = context.user_data.get(f'nav_product_{nav_id}')
-            print(f"product_info trouvé: {product_info}")
+        if not entry:
+            await query.answer("Produit non trouvé")
+            return
 
-            if not product_info:
-                await query.answer("Produit non trouvé")
-                return
+        category, position, product = entry
+        prev_product, next_product = get_sibling_products(product_id, query.from_user.id)
+        logger.debug("Produit %s (%s), précédent: %s, suivant: %s", product_id, category,
+                     prev_product and prev_product['id'], next_product and next_product['id'])
+
+        if product:
+            caption = f"📱 <b>{product['name']}</b>\n\n"
+            caption += f"💰 <b>Prix:</b>\n{product['price']}\n\n"
+            caption += f"📝 <b>Description:</b>\n{product['description']}"
 
-            category = product_info['category']
-            product_name = product_info['name']
-            print(f"Catégorie: {category}, Nom du produit: {product_name}")
+            keyboard = []
 
-            prev_product, next_product = get_sibling_products(category, product_name, query.from_user.id)
-            print(f"Produit précédent: {prev_product['name'] if prev_product else None}")
-            print(f"Produit suivant: {next_product['name'] if next_product else None}")
+            # Médias triés à l'enregistrement ; ceux dont le file_id est invalide sont ignorés
+            media_list = media_health.usable(product.get('media'))
+            album = PRODUCT_MEDIA_MODE == 'album' and len(media_list) > 1
+            if media_list:
+                total_media = len(media_list)
+                context.user_data['current_media_index'] = 0
+                current_media = media_list[0]
 
-            product = next((p for p in CATALOG[category] if p['name'] == product_name), None)
+                if total_media > 1 and not album:
+                    keyboard.append([
+                        InlineKeyboardButton("⬅️ Média précédent", callback_data=product_callback(CB_MEDIA, product['id'], total_media - 1)),
+                        InlineKeyboardButton("Média suivant ➡️", callback_data=product_callback(CB_MEDIA, product['id'], 1))
+                    ])
 
-            if product:
-                caption = f"📱 <b>{product['name']}</b>\n\n"
-                caption += f"💰 <b>Prix:</b>\n{product['price']}\n\n"
-                caption += f"📝 <b>Description:</b>\n{product['description']}"
+            if prev_product or next_product:
+                product_nav = []
+                if prev_product:
+                    product_nav.append(InlineKeyboardButton("◀️ Produit précédent", callback_data=product_callback(CB_PRODUCT, prev_product['id'])))
+                if next_product:
+                    product_nav.append(InlineKeyboardButton("Produit suivant ▶️", callback_data=product_callback(CB_PRODUCT, next_product['id'])))
+                keyboard.append(product_nav)
 
-                keyboard = []
-        
-                if 'media' in product and product['media']:
-                    media_list = product['media']
-                    media_list = sorted(media_list, key=lambda x: x.get('order_index', 0))
-                    total_media = len(media_list)
-                    context.user_data['current_media_index'] = 0
-                    current_media = media_list[0]
-
-                    if total_media > 1:
-                        keyboard.append([
-                            InlineKeyboardButton("⬅️ Média précédent", callback_data=f"prev_{nav_id}"),
-                            InlineKeyboardButton("Média suivant ➡️", callback_data=f"next_{nav_id}")
-                        ])
-
-                if prev_product or next_product:
-                    product_nav = []
-                    if prev_product:
-                        new_nav_id = str(abs(hash(prev_product['name'])) % 10000)
-                        context.user_data[f'nav_product_{new_nav_id}'] = {
-                            'category': category,
-                            'name': prev_product['name']
-                        }
-                        product_nav.append(InlineKeyboardButton("◀️ Produit précédent", callback_data=f"product_{new_nav_id}"))
-                    if next_product:
-                        new_nav_id = str(abs(hash(next_product['name'])) % 10000)
-                        context.user_data[f'nav_product_{new_nav_id}'] = {
-                            'category': category,
-                            'name': next_product['name']
-                        }
-                        product_nav.append(InlineKeyboardButton("Produit suivant ▶️", callback_data=f"product_{new_nav_id}"))
-                    keyboard.append(product_nav)
+            keyboard.append([
+                InlineKeyboardButton(
+                    "🛒 Commander",
+                    **({'url': CONFIG['order_url']} if CONFIG.get('order_url') 
+                       else {'callback_data': "show_order_text"})
+                )
+            ])
+            keyboard.append([
+                InlineKeyboardButton("🔙 Retour à la catégorie", callback_data=category_callback(CB_VIEW_CATEGORY, category, listing_menu.page_of(position)))
+            ])
 
-                keyboard.append([
-                    InlineKeyboardButton(
-                        "🛒 Commander",
-                        **({'url': CONFIG['order_url']} if CONFIG.get('order_url') 
-                           else {'callback_data': "show_order_text"})
+            await delete_product_album(context, query.message.chat_id)
+            if album:
+                await send_product_album(query, context, media_list, caption, InlineKeyboardMarkup(keyboard))
+            elif media_list:
+                await send_product_media(query, context, current_media, caption, InlineKeyboardMarkup(keyboard))
+            else:
+                try:
+                    await query.message.edit_text(
+                        text=caption,
+                        reply_markup=InlineKeyboardMarkup(keyboard),
+                        parse_mode='HTML'
                     )
-                ])
-                keyboard.append([
-                    InlineKeyboardButton("🔙 Retour à la catégorie", callback_data=f"view_{category}")
-                ])
-
-                if 'media' in product and product['media']:
+                except Exception as e:
+                    logger.error(f"Erreur lors de l'édition du message: {e}")
 
                     try:
                         await query.message.delete()
                     except Exception as e:
-                        print(f"Erreur lors de la suppression du message: {e}")
-
-                    try:
-                        if current_media['media_type'] == 'photo':
-                            message = await context.bot.send_photo(
-                                chat_id=query.message.chat_id,
-                                photo=current_media['media_id'],
-                                caption=caption,
-                                reply_markup=InlineKeyboardMarkup(keyboard),
-                                parse_mode='HTML'
-                            )
-                        else:  
-                            message = await context.bot.send_video(
-                                chat_id=query.message.chat_id,
-                                video=current_media['media_id'],
-                                caption=caption,
-                                reply_markup=InlineKeyboardMarkup(keyboard),
-                                parse_mode='HTML'
-                            )
-                        context.user_data['last_product_message_id'] = message.message_id
-                    except Exception as e:
-                        print(f"Erreur lors de l'envoi du média: {e}")
-                        message = await context.bot.send_message(
-                            chat_id=query.message.chat_id,
-                            text=f"{caption}\n\n⚠️ Le média n'a pas pu être chargé",
-                            reply_markup=InlineKeyboardMarkup(keyboard),
-                            parse_mode='HTML'
-                        )
-                        context.user_data['last_product_message_id'] = message.message_id
-                else:
-                    try:
-                        await query.message.edit_text(
-                            text=caption,
-                            reply_markup=InlineKeyboardMarkup(keyboard),
-                            parse_mode='HTML'
-                        )
-                    except Exception as e:
-                        print(f"Erreur lors de l'édition du message: {e}")
-
-                        try:
-                            await query.message.delete()
-                        except Exception as e:
-                            print(f"Erreur lors de la suppression de l'ancien message: {e}")
-                        
-                        message = await context.bot.send_message(
-                            chat_id=query.message.chat_id,
-                            text=caption,
-                            reply_markup=InlineKeyboardMarkup(keyboard),
-                            parse_mode='HTML'
-                        )
-                        context.user_data['last_product_message_id'] = message.message_id
-
-                await query.answer()
-
-                if 'stats' not in CATALOG:
-                    CATALOG['stats'] = {
-                        "total_views": 0,
-                        "category_views": {},
-                        "product_views": {},
-                        "last_updated": datetime.now(paris_tz).strftime("%H:%M:%S")
-                    }
-
-                if 'product_views' not in CATALOG['stats']:
-                    CATALOG['stats']['product_views'] = {}
-                if category not in CATALOG['stats']['product_views']:
-                    CATALOG['stats']['product_views'][category] = {}
-                if product['name'] not in CATALOG['stats']['product_views'][category]:
-                    CATALOG['stats']['product_views'][category][product['name']] = 0
-
-                CATALOG['stats']['product_views'][category][product['name']] += 1
-                CATALOG['stats']['total_views'] += 1
-                CATALOG['stats']['last_updated'] = datetime.now(paris_tz).strftime("%H:%M:%S")
-                save_catalog(CATALOG)
-
-        except Exception as e:
-            print(f"Erreur lors de l'affichage du produit: {e}")
-            await query.answer("Une erreur est survenue")
-            
-    elif query.data.startswith("view_"):
-        category = query.data.replace("view_", "")
-        if category in CATALOG:
-            if 'stats' not in CATALOG:
-                CATALOG['stats'] = {
-                    "total_views": 0,
-                    "category_views": {},
-                    "product_views": {},
-                    "last_updated": datetime.now(paris_tz).strftime("%H:%M:%S")
-                }
+                        logger.warning(f"Erreur lors de la suppression de l'ancien message: {e}")
 
-            if 'category_views' not in CATALOG['stats']:
-                CATALOG['stats']['category_views'] = {}
+                    message = await context.bot.send_message(
+                        chat_id=query.message.chat_id,
+                        text=caption,
+                        reply_markup=InlineKeyboardMarkup(keyboard),
+                        parse_mode='HTML'
+                    )
+                    context.user_data['last_product_message_id'] = message.message_id
 
-            if category not in CATALOG['stats']['category_views']:
-                CATALOG['stats']['category_views'][category] = 0
+            stats_aggregator.record_product_view(category, product['name'])
 
-            CATALOG['stats']['category_views'][category] += 1
-            CATALOG['stats']['total_views'] += 1
-            CATALOG['stats']['last_updated'] = datetime.now(paris_tz).strftime("%H:%M:%S")
-            save_catalog(CATALOG)
+    except Exception as e:
+        logger.error(f"Erreur lors de l'affichage du produit: {e}")
+        await query.answer("Une erreur est survenue")
 
-            products = CATALOG[category]
+@callback_router.prefix("view_")
+@packed_route(CB_VIEW_CATEGORY)
+async def route_view_category(update: Update, context: ContextTypes.DEFAULT_TYPE, payload=None):
+    query = update.callback_query
+    if payload is not None:
+        category = category_index.name_of(payload.id)
+        if category is None:
+            return await navigation_expired(query, "show_categories")
+    else:
+        category = query.data.replace("view_", "")
+    if category in CATALOG:
+        stats_aggregator.record_category_view(category)
 
-            text = f"*{category}*\n\n"
-            keyboard = []
-            for product in products:
+        text, reply_markup, page = get_category_listing(category, payload.page if payload else 0)
+        logger.debug("Catégorie %s, page %s", category, page)
 
-                nav_id = str(random.randint(1000, 9999))
-                context.user_data[f'nav_product_{nav_id}'] = {
-                    'category': category,
-                    'name': product['name']
-                }
-                keyboard.append([InlineKeyboardButton(
-                    product['name'],
-                    callback_data=f"product_{nav_id}" 
-                )])
+        try:
+            await delete_product_album(context, query.message.chat_id)
+            if 'last_product_message_id' in context.user_data:
+                try:
+                    await context.bot.delete_message(
+                        chat_id=query.message.chat_id,
+                        message_id=context.user_data['last_product_message_id']
+                    )
+                    del context.user_data['last_product_message_id']
+                except:
+                    pass
 
-            keyboard.append([InlineKeyboardButton("🔙 Retour au menu", callback_data="show_categories")])
+            await query.message.edit_text(
+                text=text,
+                reply_markup=reply_markup,
+                parse_mode='Markdown'
+            )
 
-            try:
-                if 'last_product_message_id' in context.user_data:
-                    try:
-                        await context.bot.delete_message(
-                            chat_id=query.message.chat_id,
-                            message_id=context.user_data['last_product_message_id']
-                        )
-                        del context.user_data['last_product_message_id']
-                    except:
-                        pass
+            context.user_data['category_message_id'] = query.message.message_id
+            context.user_data['category_message_category'] = category
+            context.user_data['category_message_page'] = page
 
-                print(f"Texte du message : {text}")
-                print(f"Clavier : {keyboard}")
+        except Exception as e:
+            logger.error(f"Erreur lors de la mise à jour du message des produits: {e}")
+            message = await context.bot.send_message(
+                chat_id=query.message.chat_id,
+                text=text,
+                reply_markup=reply_markup,
+                parse_mode='Markdown'
+            )
+            context.user_data['category_message_id'] = message.message_id
 
-                await query.message.edit_text(
-                    text=text,
-                    reply_markup=InlineKeyboardMarkup(keyboard),
-                    parse_mode='Markdown'
-                )
-        
-                context.user_data['category_message_id'] = query.message.message_id
-                context.user_data['category_message_text'] = text
-                context.user_data['category_message_reply_markup'] = keyboard
+        # Seuls les produits de la page affichée sont comptés
+        start = page * MENU_PAGE_SIZE
+        products = CATALOG[category][start:start + MENU_PAGE_SIZE]
+        if products:
+            stats_aggregator.record_listing(category, (product['name'] for product in products))
 
-            except Exception as e:
-                print(f"Erreur lors de la mise à jour du message des produits: {e}")
-                message = await context.bot.send_message(
-                    chat_id=query.message.chat_id,
-                    text=text,
-                    reply_markup=InlineKeyboardMarkup(keyboard),
-                    parse_mode='Markdown'
-                )
-                context.user_data['category_message_id'] = message.message_id
-
-            if products:
-                if 'stats' not in CATALOG:
-                    CATALOG['stats'] = {
-                        "total_views": 0,
-                        "category_views": {},
-                        "product_views": {},
-                        "last_updated": datetime.now(paris_tz).strftime("%H:%M:%S"),
-                        "last_reset": datetime.now(paris_tz).strftime("%Y-%m-%d")
-                    }
-
-                if 'product_views' not in CATALOG['stats']:
-                    CATALOG['stats']['product_views'] = {}
-                if category not in CATALOG['stats']['product_views']:
-                    CATALOG['stats']['product_views'][category] = {}
-
-                for product in products:
-                    if product['name'] not in CATALOG['stats']['product_views'][category]:
-                        CATALOG['stats']['product_views'][category][product['name']] = 0
-                    CATALOG['stats']['product_views'][category][product['name']] += 1
-
-                save_catalog(CATALOG)
-                
-    elif query.data.startswith(("next_", "prev_")):
-        try:
-            direction, nav_id = query.data.split("_")
+@packed_route(CB_MEDIA)
+async def route_media_navigation(update: Update, context: ContextTypes.DEFAULT_TYPE, payload):
+    query = update.callback_query
+    try:
+        # L'index du média à afficher est porté par le bouton
+        product_id = payload.id
 
-            product_info = context.user_data.get(f'nav_product_{nav_id}')
-            if not product_info:
-                await query.answer("Navigation expirée")
-                return
-        
-            category = product_info['category']
-            product_name = product_info['name']
-        
-            product = next((p for p in CATALOG[category] if p['name'] == product_name), None)
+        entry = product_index.get(product_id)
+        if not entry:
+            await query.answer("Navigation expirée")
+            return
 
-            if product and 'media' in product:
-                media_list = sorted(product['media'], key=lambda x: x.get('order_index', 0))
-                total_media = len(media_list)
-                current_index = context.user_data.get('current_media_index', 0)
+        category, position, product = entry
 
-                if direction == "next":
-                    current_index = current_index + 1
-                    if current_index >= total_media:
-                        current_index = 0
-                else:  
-                    current_index = current_index - 1
-                    if current_index < 0:
-                        current_index = total_media - 1
+        media_list = media_health.usable(product.get('media')) if product else []
+        if media_list:
+            total_media = len(media_list)
+            current_index = payload.media % total_media
 
-                context.user_data['current_media_index'] = current_index
-                current_media = media_list[current_index]
+            context.user_data['current_media_index'] = current_index
+            current_media = media_list[current_index]
 
-                caption = f"📱 <b>{product['name']}</b>\n\n"
-                caption += f"💰 <b>Prix:</b>\n{product['price']}\n\n"
-                caption += f"📝 <b>Description:</b>\n{product['description']}"
+            caption = f"📱 <b>{product['name']}</b>\n\n"
+            caption += f"💰 <b>Prix:</b>\n{product['price']}\n\n"
+            caption += f"📝 <b>Description:</b>\n{product['description']}"
 
-                keyboard = []
-            
-                if total_media > 1:
-                    keyboard.append([
-                        InlineKeyboardButton("⬅️ Média précédent", callback_data=f"prev_{nav_id}"),
-                        InlineKeyboardButton("Média suivant ➡️", callback_data=f"next_{nav_id}")
-                    ])
-            
-                prev_product, next_product = get_sibling_products(category, product['name'])
-                if prev_product or next_product:
-                    product_nav = []
-                    if prev_product:
-
-                        prev_nav_id = str(abs(hash(prev_product['name'])) % 10000)
-                        context.user_data[f'nav_product_{prev_nav_id}'] = {
-                            'category': category,
-                            'name': prev_product['name']
-                        }
-                        product_nav.append(InlineKeyboardButton("◀️ Produit précédent", callback_data=f"product_{prev_nav_id}"))
-    
-                    if next_product:
-
-                        next_nav_id = str(abs(hash(next_product['name'])) % 10000)
-                        context.user_data[f'nav_product_{next_nav_id}'] = {
-                            'category': category,
-                            'name': next_product['name']
-                        }
-                        product_nav.append(InlineKeyboardButton("Produit suivant ▶️", callback_data=f"product_{next_nav_id}"))
-                    keyboard.append(product_nav)
+            keyboard = []
 
+            if total_media > 1:
                 keyboard.append([
-                    InlineKeyboardButton(
-                        "🛒 Commander",
-                        **({'url': CONFIG.get('order_url')} if CONFIG.get('order_url') else {'callback_data': "show_order_text"})
-                    )
-                ])
-                keyboard.append([
-                    InlineKeyboardButton("🔙 Retour à la catégorie", callback_data=f"view_{category}")
+                    InlineKeyboardButton("⬅️ Média précédent", callback_data=product_callback(CB_MEDIA, product['id'], (current_index - 1) % total_media)),
+                    InlineKeyboardButton("Média suivant ➡️", callback_data=product_callback(CB_MEDIA, product['id'], (current_index + 1) % total_media))
                 ])
 
-                try:
-                    await query.message.delete()
-                except Exception as e:
-                    print(f"Erreur lors de la suppression du message: {e}")
+            prev_product, next_product = get_sibling_products(product_id, query.from_user.id)
+            if prev_product or next_product:
+                product_nav = []
+                if prev_product:
+                    product_nav.append(InlineKeyboardButton("◀️ Produit précédent", callback_data=product_callback(CB_PRODUCT, prev_product['id'])))
 
-                try:
-                    if current_media['media_type'] == 'photo':
-                        try:
-                            message = await context.bot.send_photo(
-                                chat_id=query.message.chat_id,
-                                photo=current_media['media_id'],
-                                caption=caption,
-                                reply_markup=InlineKeyboardMarkup(keyboard),
-                                parse_mode='HTML'
-                            )
-                        except Exception as e:
-                            print(f"Erreur d'envoi de photo: {e}")
-                            message = await context.bot.send_message(
-                                chat_id=query.message.chat_id,
-                                text=f"{caption}\n\n⚠️ L'image n'a pas pu être chargée",
-                                reply_markup=InlineKeyboardMarkup(keyboard),
-                                parse_mode='HTML'
-                            )
-                    else: 
-                        try:
-                            message = await context.bot.send_video(
-                                chat_id=query.message.chat_id,
-                                video=current_media['media_id'],
-                                caption=caption,
-                                reply_markup=InlineKeyboardMarkup(keyboard),
-                                parse_mode='HTML'
-                            )
-                        except Exception as e:
-                            print(f"Erreur d'envoi de vidéo: {e}")
-                            message = await context.bot.send_message(
-                                chat_id=query.message.chat_id,
-                                text=f"{caption}\n\n⚠️ La vidéo n'a pas pu être chargée",
-                                reply_markup=InlineKeyboardMarkup(keyboard),
-                                parse_mode='HTML'
-                            )
-                    context.user_data['last_product_message_id'] = message.message_id
-                except Exception as e:
-                    print(f"Erreur lors de l'envoi du média: {e}")
-                    await query.answer("Une erreur est survenue lors de l'affichage du média")
+                if next_product:
+                    product_nav.append(InlineKeyboardButton("Produit suivant ▶️", callback_data=product_callback(CB_PRODUCT, next_product['id'])))
+                keyboard.append(product_nav)
 
-        except Exception as e:
-            print(f"Erreur lors de la navigation des médias: {e}")
-            await query.answer("Une erreur est survenue")
-            
-    elif query.data == "edit_product":
-        keyboard = []
-        for category in CATALOG.keys():
-            if category != 'stats':
-                keyboard.append([
-                    InlineKeyboardButton(
-                        category, 
-                        callback_data=f"editcat_{category}" 
-                    )
-                ])
-        keyboard.append([InlineKeyboardButton("🔙 Annuler", callback_data="cancel_edit")])
-        
-        await query.message.edit_text(
-            "✏️ Sélectionnez la catégorie du produit à modifier:",
-            reply_markup=InlineKeyboardMarkup(keyboard)
-        )
-        return SELECTING_CATEGORY
+            keyboard.append([
+                InlineKeyboardButton(
+                    "🛒 Commander",
+                    **({'url': CONFIG.get('order_url')} if CONFIG.get('order_url') else {'callback_data': "show_order_text"})
+                )
+            ])
+            keyboard.append([
+                InlineKeyboardButton("🔙 Retour à la catégorie", callback_data=category_callback(CB_VIEW_CATEGORY, category, listing_menu.page_of(position)))
+            ])
 
-    elif query.data.startswith("editcat_"): 
-        category = query.data.replace("editcat_", "")
-        products = CATALOG.get(category, [])
-        
-        keyboard = []
-        for product in products:
-            if isinstance(product, dict):
+            await send_product_media(query, context, current_media, caption, InlineKeyboardMarkup(keyboard))
 
-                callback_data = f"editp_{category[:10]}_{product['name'][:20]}"
-                keyboard.append([
-                    InlineKeyboardButton(product['name'], callback_data=callback_data)
-                ])
-        keyboard.append([InlineKeyboardButton("🔙 Annuler", callback_data="cancel_edit")])
-        
-        await query.message.edit_text(
-            f"✏️ Sélectionnez le produit à modifier dans {category}:",
-            reply_markup=InlineKeyboardMarkup(keyboard)
-        )
-        return SELECTING_PRODUCT_TO_EDIT
+    except Exception as e:
+        logger.error(f"Erreur lors de la navigation des médias: {e}")
+        await query.answer("Une erreur est survenue")
 
-    elif query.data.startswith("editp_"):
-        try:
-            _, short_category, short_product = query.data.split("_", 2)
-            
-            category = next((cat for cat in CATALOG.keys() if cat.startswith(short_category) or short_category.startswith(cat)), None)
-            if category:
-                product_name = next((p['name'] for p in CATALOG[category] if p['name'].startswith(short_product) or short_product.startswith(p['name'])), None)
-                if product_name:
-                    context.user_data['editing_category'] = category
-                    context.user_data['editing_product'] = product_name
-
-                    keyboard = [
-                        [InlineKeyboardButton("📝 Nom", callback_data="edit_name")],
-                        [InlineKeyboardButton("💰 Prix", callback_data="edit_price")],
-                        [InlineKeyboardButton("📝 Description", callback_data="edit_desc")],
-                        [InlineKeyboardButton("📸 Médias", callback_data="edit_media")],
-                        [InlineKeyboardButton("🔙 Annuler", callback_data="cancel_edit")]
-                    ]
+@callback_router.exact("edit_product")
+@packed_route(CB_EDIT_PRODUCT_PAGE)
+async def route_edit_product(update: Update, context: ContextTypes.DEFAULT_TYPE, payload=None):
+    query = update.callback_query
+    reply_markup, _, _ = edit_product_menu.render(page=payload.page if payload else 0)
 
-                    await query.message.edit_text(
-                        f"✏️ Que souhaitez-vous modifier pour *{product_name}* ?\n"
-                        "Sélectionnez un champ à modifier:",
-                        reply_markup=InlineKeyboardMarkup(keyboard),
-                        parse_mode='Markdown'
-                    )
-                    return EDITING_PRODUCT_FIELD
-            
-            return await show_admin_menu(update, context)
-        except Exception as e:
-            print(f"Erreur dans editp_: {e}")
-            return await show_admin_menu(update, context)
+    await query.message.edit_text(
+        "✏️ Sélectionnez la catégorie du produit à modifier:",
+        reply_markup=reply_markup
+    )
+    return SELECTING_CATEGORY
+
+@packed_route(CB_EDIT_PRODUCT_CATEGORY)
+async def route_edit_product_category(update: Update, context: ContextTypes.DEFAULT_TYPE, payload):
+    query = update.callback_query
+    category = category_index.name_of(payload.id)
+    if category is None:
+        return await navigation_expired(query)
+    reply_markup, _, _ = edit_product_products_menu.render(category, payload.page)
+
+    await query.message.edit_text(
+        f"✏️ Sélectionnez le produit à modifier dans {category}:",
+        reply_markup=reply_markup
+    )
+    return SELECTING_PRODUCT_TO_EDIT
+
+@packed_route(CB_EDIT_PRODUCT)
+async def route_edit_product_select(update: Update, context: ContextTypes.DEFAULT_TYPE, payload):
+    query = update.callback_query
+    try:
+        entry = product_index.get(payload.id)
+        if entry:
+            category, _, product = entry
+            product_name = product['name']
+            if product_name:
+                context.user_data['editing_category'] = category
+                context.user_data['editing_product'] = product_name
+                context.user_data['editing_product_id'] = product['id']
+
+                keyboard = [
+                    [InlineKeyboardButton("📝 Nom", callback_data="edit_name")],
+                    [InlineKeyboardButton("💰 Prix", callback_data="edit_price")],
+                    [InlineKeyboardButton("📝 Description", callback_data="edit_desc")],
+                    [InlineKeyboardButton("📸 Médias", callback_data="edit_media")],
+                    [InlineKeyboardButton("🔙 Annuler", callback_data="cancel_edit")]
+                ]
 
-    elif query.data in ["edit_name", "edit_price", "edit_desc", "edit_media"]:
-        field_mapping = {
-            "edit_name": "name",
-            "edit_price": "price",
-            "edit_desc": "description",
-            "edit_media": "media"
-        }
-        field = field_mapping[query.data]
-        context.user_data['editing_field'] = field
-    
-        category = context.user_data.get('editing_category')
-        product_name = context.user_data.get('editing_product')
-    
-        product = next((p for p in CATALOG[category] if p['name'] == product_name), None)
-    
-        if product:
-            if field == 'media':
-                context.user_data['temp_product_category'] = category
-                context.user_data['temp_product_name'] = product_name
-                context.user_data['temp_product_price'] = product.get('price')
-                context.user_data['temp_product_description'] = product.get('description')
-                context.user_data['temp_product_media'] = []
-                context.user_data['media_count'] = 0
-            
-                message = await query.message.edit_text(
-                    "📸 Envoyez les photos ou vidéos du produit (plusieurs possibles)\n\n"
-                    "*Si vous ne voulez pas en envoyer, cliquez sur ignorer* \n\n"
-                    "*📌ATTENTION : Modifier les images écrase celles déjà existantes*",
-                    reply_markup=InlineKeyboardMarkup([
-                        [InlineKeyboardButton("🔙 Annuler", callback_data="cancel_edit")]
-                    ]),
-                    parse_mode='Markdown'
-                )
-                context.user_data['media_invitation_message_id'] = message.message_id
-                return WAITING_PRODUCT_MEDIA
-            else:
-                current_value = product.get(field, "Non défini")
-                field_names = {
-                    'name': 'nom',
-                    'price': 'prix',
-                    'description': 'description'
-                }
                 await query.message.edit_text(
-                    f"✏️ Modification du {field_names.get(field, field)}\n"
-                    f"Valeur actuelle : {current_value}\n\n"
-                    "Envoyez la nouvelle valeur :",
-                    reply_markup=InlineKeyboardMarkup([[
-                        InlineKeyboardButton("🔙 Annuler", callback_data="cancel_edit")
-                    ]])
+                    f"✏️ Que souhaitez-vous modifier pour *{product_name}* ?\n"
+                    "Sélectionnez un champ à modifier:",
+                    reply_markup=InlineKeyboardMarkup(keyboard),
+                    parse_mode='Markdown'
                 )
-                return WAITING_NEW_VALUE
+                return EDITING_PRODUCT_FIELD
 
-    elif query.data == "cancel_edit":
+        return await show_admin_menu(update, context)
+    except Exception as e:
+        logger.error(f"Erreur dans editp_: {e}")
         return await show_admin_menu(update, context)
 
-    elif query.data == "confirm_reset_stats":
-        now = datetime.utcnow().strftime("%Y-%m-%d %H:%M:%S")
-        CATALOG['stats'] = {
-            "total_views": 0,
-            "category_views": {},
-            "product_views": {},
-            "last_updated": now.split(" ")[1],  
-            "last_reset": now.split(" ")[0]  
-        }
-        save_catalog(CATALOG)
-        
-        keyboard = [[InlineKeyboardButton("🔙 Retour au menu", callback_data="admin")]]
-        await query.message.edit_text(
-            "✅ *Les statistiques ont été réinitialisées avec succès!*\n\n"
-            f"Date de réinitialisation : {CATALOG['stats']['last_reset']}\n\n"
-            "Toutes les statistiques sont maintenant à zéro.",
-            reply_markup=InlineKeyboardMarkup(keyboard),
-            parse_mode='Markdown'
-        )
-               
-    elif query.data == "show_categories":
-        keyboard = []
+@callback_router.exact("edit_name", "edit_price", "edit_desc", "edit_media")
+async def route_edit_product_field(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    query = update.callback_query
+    field_mapping = {
+        "edit_name": "name",
+        "edit_price": "price",
+        "edit_desc": "description",
+        "edit_media": "media"
+    }
+    field = field_mapping[query.data]
+    context.user_data['editing_field'] = field
 
-        for category in CATALOG.keys():
-            if category != 'stats':
-                keyboard.append([InlineKeyboardButton(category, callback_data=f"view_{category}")])
+    category = context.user_data.get('editing_category')
+    product_name = context.user_data.get('editing_product')
 
-        keyboard.append([InlineKeyboardButton("🔙 Retour à l'accueil", callback_data="back_to_home")])
+    product = product_index.get_product(context.user_data.get('editing_product_id'))
 
-        try:
-            message = await query.edit_message_text(
-                "📋 *Menu*\n\n"
-                "Choisissez une catégorie pour voir les produits :",
-                reply_markup=InlineKeyboardMarkup(keyboard),
-                parse_mode='Markdown'
-            )
-            context.user_data['menu_message_id'] = message.message_id
-        except Exception as e:
-            print(f"Erreur lors de la mise à jour du message des catégories: {e}")
+    if product:
+        if field == 'media':
+            context.user_data['temp_product_category'] = category
+            context.user_data['temp_product_name'] = product_name
+            context.user_data['temp_product_price'] = product.get('price')
+            context.user_data['temp_product_description'] = product.get('description')
+            context.user_data['temp_product_media'] = []
+            context.user_data['media_count'] = 0
 
-            message = await context.bot.send_message(
-                chat_id=query.message.chat_id,
-                text="📋 *Menu*\n\n"
-                     "Choisissez une catégorie pour voir les produits :",
-                reply_markup=InlineKeyboardMarkup(keyboard),
+            message = await query.message.edit_text(
+                "📸 Envoyez les photos ou vidéos du produit (plusieurs possibles)\n\n"
+                "*Si vous ne voulez pas en envoyer, cliquez sur ignorer* \n\n"
+                "*📌ATTENTION : Modifier les images écrase celles déjà existantes*",
+                reply_markup=InlineKeyboardMarkup([
+                    [InlineKeyboardButton("🔙 Annuler", callback_data="cancel_edit")]
+                ]),
                 parse_mode='Markdown'
             )
-            context.user_data['menu_message_id'] = message.message_id
+            context.user_data['media_invitation_message_id'] = message.message_id
+            return WAITING_PRODUCT_MEDIA
+        else:
+            current_value = product.get(field, "Non défini")
+            field_names = {
+                'name': 'nom',
+                'price': 'prix',
+                'description': 'description'
+            }
+            await query.message.edit_text(
+                f"✏️ Modification du {field_names.get(field, field)}\n"
+                f"Valeur actuelle : {current_value}\n\n"
+                "Envoyez la nouvelle valeur :",
+                reply_markup=InlineKeyboardMarkup([[
+                    InlineKeyboardButton("🔙 Annuler", callback_data="cancel_edit")
+                ]])
+            )
+            return WAITING_NEW_VALUE
 
-    elif query.data == "back_to_home":  
-            chat_id = update.effective_chat.id
+@callback_router.exact("cancel_edit")
+async def route_cancel_edit(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    return await show_admin_menu(update, context)
 
-            welcome_text = CONFIG.get('welcome_message', 
-                "🌿 <b>Bienvenue sur votre bot !</b> 🌿\n\n"
-                "<b>Pour changer ce message d accueil, rendez vous dans l onglet admin.</b>\n"
-                "📋 Cliquez sur MENU pour voir les catégories"
-            )
+@callback_router.exact("confirm_reset_stats")
+async def route_confirm_reset_stats(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    query = update.callback_query
+    stats = stats_aggregator.reset()
 
-            keyboard = [
-                [InlineKeyboardButton("📋 MENU", callback_data="show_categories")]
-            ]
+    keyboard = [[InlineKeyboardButton("🔙 Retour au menu", callback_data="admin")]]
+    await query.message.edit_text(
+        "✅ *Les statistiques ont été réinitialisées avec succès!*\n\n"
+        f"Date de réinitialisation : {stats['last_reset']}\n\n"
+        "Toutes les statistiques sont maintenant à zéro.",
+        reply_markup=InlineKeyboardMarkup(keyboard),
+        parse_mode='Markdown'
+    )
+
+@callback_router.exact("show_categories")
+@packed_route(CB_CATEGORIES_PAGE)
+async def route_show_categories(update: Update, context: ContextTypes.DEFAULT_TYPE, payload=None):
+    query = update.callback_query
+    reply_markup, _, _ = categories_menu.render(page=payload.page if payload else 0)
+
+    try:
+        message = await query.edit_message_text(
+            "📋 *Menu*\n\n"
+            "Choisissez une catégorie pour voir les produits :",
+            reply_markup=reply_markup,
+            parse_mode='Markdown'
+        )
+        context.user_data['menu_message_id'] = message.message_id
+    except Exception as e:
+        logger.error(f"Erreur lors de la mise à jour du message des catégories: {e}")
 
-            with open('config/config.json', 'r') as f:
-                config = json.load(f)
+        message = await context.bot.send_message(
+            chat_id=query.message.chat_id,
+            text="📋 *Menu*\n\n"
+                 "Choisissez une catégorie pour voir les produits :",
+            reply_markup=reply_markup,
+            parse_mode='Markdown'
+        )
+        context.user_data['menu_message_id'] = message.message_id
 
-            for button in config.get('custom_buttons', []):
-                if button['type'] == 'url':
-                    keyboard.append([InlineKeyboardButton(button['name'], url=button['value'])])
-                elif button['type'] == 'text':
-                    keyboard.append([InlineKeyboardButton(button['name'], callback_data=f"custom_text_{button['id']}")])
+@callback_router.exact("back_to_home")
+async def route_back_to_home(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    query = update.callback_query
 
-            keyboard.append([InlineKeyboardButton("📱 Réseaux", callback_data="show_networks")])
+    welcome_text, reply_markup, _ = get_home_screen(update.effective_user.id)
 
-            if str(update.effective_user.id) in ADMIN_IDS:
-                keyboard.append([InlineKeyboardButton("🔧 Menu Admin", callback_data="admin")])
+    await query.message.edit_text(
+        text=welcome_text,
+        reply_markup=reply_markup,
+        parse_mode='HTML'  
+    )
+    return CHOOSING
 
-            await query.message.edit_text(
-                text=welcome_text,
-                reply_markup=InlineKeyboardMarkup(keyboard),
-                parse_mode='HTML'  
+async def handle_normal_buttons(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """Gestion des boutons normaux"""
+    query = update.callback_query
+    await query.answer()
+    await admin_features.register_user(update.effective_user)
+
+    handler = callback_router.resolve(query.data)
+    if handler is not None:
+        started = time.perf_counter()
+        try:
+            return await handler(update, context)
+        finally:
+            metrics.observe(
+                "bot_callback_duration_seconds", time.perf_counter() - started,
+                route=callback_route_name(handler, query.data)
             )
-            return CHOOSING
+
+def callback_route_name(handler, data):
+    """Nom de la route pour les métriques (handler réel pour les callback_data compacts)"""
+    if handler is route_packed:
+        payload = callback_codec.decode(data)
+        handler = PACKED_ROUTES.get(payload.route) if payload is not None else None
+        if handler is None:
+            return "expired"
+    return handler.__name__
 
 async def get_file_id(update: Update, context: ContextTypes.DEFAULT_TYPE):
     """Handler temporaire pour obtenir le file_id de l'image banner"""
@@ -3051,6 +3109,7 @@ async def get_file_id(update: Update, context: ContextTypes.DEFAULT_TYPE):
 
         with open('config.json', 'w', encoding='utf-8') as f:
             json.dump(CONFIG, f, indent=4)
+        refresh_home_screen()
         await update.message.reply_text(
             f"✅ Image banner enregistrée!\nFile ID: {file_id}"
         )
@@ -3121,7 +3180,7 @@ async def get_file_id(update: Update, context: ContextTypes.DEFAULT_TYPE):
             context.user_data['menu_message_id'] = menu_message.message_id
 
     except Exception as e:
-        print(f"Erreur lors du retour à l'accueil: {e}")
+        logger.error(f"Erreur lors du retour à l'accueil: {e}")
         try:
             menu_message = await context.bot.send_message(
                 chat_id=chat_id,
@@ -3131,204 +3190,338 @@ async def get_file_id(update: Update, context: ContextTypes.DEFAULT_TYPE):
             )
             context.user_data['menu_message_id'] = menu_message.message_id
         except Exception as e:
-            print(f"Erreur critique lors du retour à l'accueil: {e}")
+            logger.error(f"Erreur critique lors du retour à l'accueil: {e}")
 
     return CHOOSING
 
+metrics_server = None
+
+async def post_init(application: Application) -> None:
+    """Démarre les tâches d'arrière-plan une fois la boucle d'événements lancée"""
+    await save_catalog_meta()
+    await admin_features.user_registry.start()
+    await stats_aggregator.start()
+    await media_health.start(application.bot, catalog_media_ids)
+    if CONFIG.get('metrics_port'):
+        global metrics_server
+        metrics_server = await serve_metrics(
+            metrics, CONFIG.get('metrics_host', '127.0.0.1'), int(CONFIG['metrics_port'])
+        )
+
+async def post_shutdown(application: Application) -> None:
+    """Écrit les données en attente avant l'arrêt du bot"""
+    await admin_features.user_registry.stop()
+    await stats_aggregator.stop()
+    await media_health.stop()
+    if metrics_server is not None:
+        metrics_server.close()
+        await metrics_server.wait_closed()
+    catalog_store.compact(CATALOG)
+    io_executor.shutdown()
+    if storage_backend is not None:
+        storage_backend.close()
+
 async def error_handler(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
     try:
         if isinstance(context.error, NetworkError):
-            print(f"Erreur réseau: {context.error}")
+            logger.warning("Erreur réseau: %s", context.error)
             if update and update.callback_query:
                 await update.callback_query.answer("Erreur de connexion, veuillez réessayer.")
             await asyncio.sleep(1)  
         elif isinstance(context.error, TimedOut):
-            print(f"Timeout: {context.error}")
+            logger.warning("Timeout: %s", context.error)
             if update and update.callback_query:
                 await update.callback_query.answer("La requête a pris trop de temps, veuillez réessayer.")
             await asyncio.sleep(1)
         else:
-            print(f"Une erreur s'est produite: {context.error}")
+            logger.error("Une erreur s'est produite: %s", context.error, exc_info=context.error)
     except Exception as e:
-        print(f"Erreur dans le gestionnaire d'erreurs: {e}")
-        
-def main():
-    """Fonction principale du bot"""
-    try:
-        global admin_features
-        application = (
-            Application.builder()
-            .token(TOKEN)
-            .connect_timeout(30.0)
-            .read_timeout(30.0)
-            .write_timeout(30.0)
-            .get_updates_read_timeout(30.0)
-            .get_updates_write_timeout(30.0)
-            .get_updates_connect_timeout(30.0)
-            .build()
-        )
-        admin_features = AdminFeatures()
+        logger.error(f"Erreur dans le gestionnaire d'erreurs: {e}")
+        
+def webhook_config_error(webhook: dict):
+    """Raison pour laquelle le mode webhook ne peut pas démarrer, ou None"""
+    if not webhook.get('url'):
+        return "la clé webhook.url (URL publique HTTPS du bot) est absente de config.json"
+    if importlib.util.find_spec('tornado') is None:
+        return 'le serveur webhook nécessite pip install "python-telegram-bot[webhooks]"'
+    return None
+
+def run_polling(application: Application) -> None:
+    logger.info("Bot démarré...")
+    application.run_polling(
+        drop_pending_updates=True,
+        allowed_updates=[Update.MESSAGE, Update.CALLBACK_QUERY],
+        pool_timeout=30.0,
+        read_timeout=30.0,
+        write_timeout=30.0,
+        connect_timeout=30.0
+    )
 
-        global access_manager
-        access_manager = AccessManager()
+def run_webhook(application: Application) -> None:
+    """Démarre le bot en mode webhook (section "webhook" de config.json)
 
-        application.add_error_handler(error_handler)
+    Telegram pousse les updates vers le serveur HTTP intégré au lieu d'attendre getUpdates.
+    Les requêtes sans le bon en-tête X-Telegram-Bot-Api-Secret-Token sont rejetées.
 
-        conv_handler = ConversationHandler(
-            entry_points=[
-                CommandHandler('start', start),
-                CommandHandler('admin', admin),
-                CallbackQueryHandler(handle_normal_buttons, pattern='^(show_categories|back_to_home|admin)$'),
-                CallbackQueryHandler(show_custom_buttons_menu, pattern="^show_custom_buttons$"),
-            ],
-            states={
-                CHOOSING: [
-                    CallbackQueryHandler(admin_features.handle_user_management, pattern="^user_page_[0-9]+$"),
-                    CallbackQueryHandler(list_buttons_for_editing, pattern="^list_buttons_edit$"),
-                    CallbackQueryHandler(handle_button_editing, pattern="^edit_button_[^_]+$"),
-                    CallbackQueryHandler(start_edit_button_name, pattern="^edit_button_name_"),
-                    CallbackQueryHandler(start_edit_button_value, pattern="^edit_button_value_"),
-                    CallbackQueryHandler(start_add_custom_button, pattern="^add_custom_button$"),
-                    CallbackQueryHandler(list_buttons_for_deletion, pattern="^list_buttons_delete$"),
-                    CallbackQueryHandler(handle_button_deletion, pattern="^delete_button_"),
-                    CallbackQueryHandler(admin_features.manage_broadcasts, pattern="^manage_broadcasts$"),
-                    CallbackQueryHandler(admin_features.edit_broadcast_content, pattern="^edit_broadcast_content_"),
-                    CallbackQueryHandler(admin_features.edit_broadcast, pattern="^edit_broadcast_"),
-                    CallbackQueryHandler(admin_features.resend_broadcast, pattern="^resend_broadcast_"),
-                    CallbackQueryHandler(admin_features.delete_broadcast, pattern="^delete_broadcast_"),
-                    CallbackQueryHandler(admin_features.handle_user_management, pattern="^manage_users$"),
-                    CallbackQueryHandler(handle_normal_buttons),
-                ],
-                WAITING_CATEGORY_NAME: [
-                    MessageHandler(filters.TEXT & ~filters.COMMAND, handle_category_name),
-                    CallbackQueryHandler(handle_normal_buttons),
-                ],
-                WAITING_PRODUCT_NAME: [
-                    MessageHandler(filters.TEXT & ~filters.COMMAND, handle_product_name),
-                    CallbackQueryHandler(handle_normal_buttons),
-                ],
-                WAITING_PRODUCT_PRICE: [
-                    MessageHandler(filters.TEXT & ~filters.COMMAND, handle_product_price),
-                    CallbackQueryHandler(handle_normal_buttons),
-                ],
-                WAITING_PRODUCT_DESCRIPTION: [
-                    MessageHandler(filters.TEXT & ~filters.COMMAND, handle_product_description),
-                    CallbackQueryHandler(handle_normal_buttons),
-                ],
-                WAITING_PRODUCT_MEDIA: [
-                    MessageHandler(filters.PHOTO | filters.VIDEO, handle_product_media),
-                    CallbackQueryHandler(handle_normal_buttons),
-                ],
-                SELECTING_CATEGORY: [
-                    CallbackQueryHandler(handle_normal_buttons),
-                ],
-                WAITING_BUTTON_NAME: [
-                    MessageHandler(filters.TEXT & ~filters.COMMAND, handle_button_name),
-                    CallbackQueryHandler(handle_normal_buttons)
-                ],
-                WAITING_BUTTON_VALUE: [
-                    MessageHandler(filters.TEXT & ~filters.COMMAND, handle_button_value),
-                    CallbackQueryHandler(handle_normal_buttons)
-                ],
-                SELECTING_CATEGORY_TO_DELETE: [
-                    CallbackQueryHandler(handle_normal_buttons),
-                ],
-                SELECTING_PRODUCT_TO_DELETE: [
-                    CallbackQueryHandler(handle_normal_buttons),
-                ],
-                WAITING_CONTACT_USERNAME: [
-                    MessageHandler(filters.TEXT & ~filters.COMMAND, handle_contact_username),
-                    CallbackQueryHandler(handle_normal_buttons),
-                ],
-                SELECTING_PRODUCT_TO_EDIT: [
-                    CallbackQueryHandler(handle_normal_buttons),
-                ],
-                EDITING_PRODUCT_FIELD: [
-                    CallbackQueryHandler(handle_normal_buttons),
-                ],
-                WAITING_NEW_VALUE: [
-                    MessageHandler(filters.TEXT & ~filters.COMMAND, handle_new_value),
-                    CallbackQueryHandler(handle_normal_buttons),
-                ],
-                WAITING_BANNER_IMAGE: [
-                    MessageHandler(filters.PHOTO, handle_banner_image),
-                    CallbackQueryHandler(handle_normal_buttons),
-                ],
-                WAITING_WELCOME_MESSAGE: [
-                    MessageHandler(filters.TEXT & ~filters.COMMAND, handle_welcome_message),
-                    CallbackQueryHandler(handle_normal_buttons)
-                ],
-                WAITING_ORDER_BUTTON_CONFIG: [
-                    MessageHandler(filters.TEXT & ~filters.COMMAND, handle_order_button_config),
-                    CallbackQueryHandler(handle_normal_buttons),
-                ],
-                WAITING_PRODUCT_MEDIA: [
-                    MessageHandler(filters.PHOTO | filters.VIDEO, handle_product_media),
-                    CallbackQueryHandler(finish_product_media, pattern="^finish_media$"),
-                    CallbackQueryHandler(handle_normal_buttons),
-                ],
-                WAITING_NEW_CATEGORY_NAME: [
-                    MessageHandler(filters.TEXT & ~filters.COMMAND, handle_new_category_name),
-                    CallbackQueryHandler(handle_normal_buttons),
-                ],
-                EDITING_CATEGORY: [
-                    CallbackQueryHandler(handle_normal_buttons),
-                ],
-                WAITING_FOR_ACCESS_CODE: [
-                    MessageHandler(filters.TEXT & ~filters.COMMAND, handle_access_code),
-                    CallbackQueryHandler(start, pattern="^cancel_access$"),
-                ],
-                WAITING_BROADCAST_MESSAGE: [
-                    MessageHandler(
-                        (filters.TEXT | filters.PHOTO | filters.VIDEO) & ~filters.COMMAND,
-                        admin_features.send_broadcast_message
-                    ),
-                    CallbackQueryHandler(handle_normal_buttons)
-                ],
-                WAITING_BROADCAST_EDIT: [
-                    MessageHandler(
-                        (filters.TEXT | filters.PHOTO | filters.VIDEO) & ~filters.COMMAND,
-                        admin_features.handle_broadcast_edit
-                    ),
-                    CallbackQueryHandler(handle_normal_buttons)
-                ],
-            },
-            fallbacks=[
-                CommandHandler('start', start),
-                CommandHandler('admin', admin),
-            ],
-            name="main_conversation",
-            persistent=False,
-        )
+    Clés : url (obligatoire, URL publique en HTTPS), url_path, secret_token, listen,
+    port, max_connections, cert, key. Le serveur intégré de PTB demande la dépendance
+    optionnelle tornado : pip install "python-telegram-bot[webhooks]".
+    """
+    webhook = CONFIG.get('webhook', {})
+    url_path = webhook.get('url_path', 'telegram').strip('/')
+    secret_token = webhook.get('secret_token')
+    if not secret_token:
+        logger.warning("Attention : aucun secret_token configuré, le webhook accepte toutes les requêtes")
+
+    logger.info("Bot démarré en mode webhook sur %s:%s/%s", webhook.get('listen', '0.0.0.0'), webhook.get('port', 8443), url_path)
+    application.run_webhook(
+        listen=webhook.get('listen', '0.0.0.0'),
+        port=webhook.get('port', 8443),
+        url_path=url_path,
+        webhook_url=f"{webhook['url'].rstrip('/')}/{url_path}",
+        secret_token=secret_token,
+        max_connections=webhook.get('max_connections', 40),
+        cert=webhook.get('cert'),
+        key=webhook.get('key'),
+        drop_pending_updates=True,
+        allowed_updates=[Update.MESSAGE, Update.CALLBACK_QUERY]
+    )
 
-        application.add_handler(CommandHandler("ban", admin_features.handle_ban_command))
-        application.add_handler(CallbackQueryHandler(
-            admin_features.show_banned_users,
-            pattern="^show_banned$"
+def build_application(update_processor=None) -> Application:
+    """Construit l'Application du bot avec tous ses handlers, sans la démarrer
+
+    `update_processor` remplace le traitement des updates configuré par
+    `concurrent_updates` (utilisé par bench/ pour mesurer chaque update).
+    """
+    global admin_features
+    # Clients HTTP instrumentés : chaque appel à l'API est mesuré par méthode
+    builder = (
+        Application.builder()
+        .token(TOKEN)
+        .request(InstrumentedRequest(
+            metrics,
+            connection_pool_size=CONFIG.get('connection_pool_size', 256),
+            connect_timeout=30.0,
+            read_timeout=30.0,
+            write_timeout=30.0
         ))
-        application.add_handler(CallbackQueryHandler(
-            admin_features.handle_unban_callback,
-            pattern="^unban_"
+        .get_updates_request(InstrumentedRequest(
+            metrics,
+            connect_timeout=30.0,
+            read_timeout=30.0,
+            write_timeout=30.0
         ))
-        application.add_handler(CallbackQueryHandler(show_networks, pattern="^show_networks$"))
-        application.add_handler(CallbackQueryHandler(start, pattern="^start_cmd$"))
-        application.add_handler(CommandHandler("gencode", admin_generate_code))
-        application.add_handler(CommandHandler("listecodes", admin_list_codes))
-        application.add_handler(conv_handler)
+        .post_init(post_init)
+        .post_shutdown(post_shutdown)
+    )
+    if update_processor is not None:
+        builder = builder.concurrent_updates(update_processor)
+    elif CONFIG.get('concurrent_updates'):
+        # Chats différents en parallèle, updates d'un même chat toujours dans l'ordre
+        builder = builder.concurrent_updates(PerChatUpdateProcessor(int(CONFIG['concurrent_updates'])))
+    if CONFIG.get('bot_api_base_url'):
+        # Serveur d'API alternatif (ex : tools/fake_telegram.py pour les tests hors ligne)
+        api_url = CONFIG['bot_api_base_url'].rstrip('/')
+        builder = builder.base_url(f"{api_url}/bot").base_file_url(f"{api_url}/file/bot")
+    application = builder.build()
+    active_sessions.on_evict = lambda user_id, chat_id: drop_session(application, user_id, chat_id)
+    metrics.register_gauge("bot_user_data", lambda: len(application.user_data))
+    admin_features = AdminFeatures(
+        users_flush_interval=CONFIG.get('users_flush_interval', 30.0),
+        users_flush_threshold=CONFIG.get('users_flush_threshold', 50),
+        broadcast_rate=CONFIG.get('broadcast_rate', 25.0),
+        broadcast_concurrency=CONFIG.get('broadcast_concurrency', 20),
+        backend=storage_backend,
+        executor=io_executor
+    )
+
+    global stats_aggregator
+    legacy_stats = CATALOG.pop('stats', None)
+    stats_aggregator = StatsAggregator(
+        CONFIG.get('stats_file', 'data/stats.json'),
+        flush_interval=CONFIG.get('stats_flush_interval', 10.0),
+        legacy_stats=legacy_stats,
+        executor=io_executor,
+        top_k=STATS_TOP_PRODUCTS
+    )
+    if legacy_stats is not None:
+        # Migration : les statistiques quittent le catalogue pour leur propre fichier
+        stats_aggregator.flush_now()
+        catalog_store.save(CATALOG)
+    # Statistiques orphelines laissées par d'anciennes versions : nettoyées une fois au démarrage
+    stats_aggregator.prune(CATALOG)
+
+    global access_manager
+    access_manager = AccessManager(
+        cached=CONFIG.get('access_cache_enabled', True),
+        check_interval=CONFIG.get('access_cache_check_interval', 2.0),
+        backend=storage_backend,
+        executor=io_executor
+    )
+
+    application.add_error_handler(error_handler)
+
+    conv_handler = ConversationHandler(
+        entry_points=[
+            CommandHandler('start', start),
+            CommandHandler('admin', admin),
+            CallbackQueryHandler(handle_normal_buttons, pattern='^(show_categories|back_to_home|admin)$'),
+            CallbackQueryHandler(show_custom_buttons_menu, pattern="^show_custom_buttons$"),
+        ],
+        states={
+            CHOOSING: [
+                CallbackQueryHandler(admin_features.handle_user_management, pattern="^user_page_[0-9]+$"),
+                CallbackQueryHandler(list_buttons_for_editing, pattern="^list_buttons_edit$"),
+                CallbackQueryHandler(handle_button_editing, pattern="^edit_button_[^_]+$"),
+                CallbackQueryHandler(start_edit_button_name, pattern="^edit_button_name_"),
+                CallbackQueryHandler(start_edit_button_value, pattern="^edit_button_value_"),
+                CallbackQueryHandler(start_add_custom_button, pattern="^add_custom_button$"),
+                CallbackQueryHandler(list_buttons_for_deletion, pattern="^list_buttons_delete$"),
+                CallbackQueryHandler(handle_button_deletion, pattern="^delete_button_"),
+                CallbackQueryHandler(admin_features.manage_broadcasts, pattern="^manage_broadcasts$"),
+                CallbackQueryHandler(admin_features.edit_broadcast_content, pattern="^edit_broadcast_content_"),
+                CallbackQueryHandler(admin_features.edit_broadcast, pattern="^edit_broadcast_"),
+                CallbackQueryHandler(admin_features.resend_broadcast, pattern="^resend_broadcast_"),
+                CallbackQueryHandler(admin_features.delete_broadcast, pattern="^delete_broadcast_"),
+                CallbackQueryHandler(admin_features.handle_user_management, pattern="^manage_users$"),
+                CallbackQueryHandler(handle_normal_buttons),
+            ],
+            WAITING_CATEGORY_NAME: [
+                MessageHandler(filters.TEXT & ~filters.COMMAND, handle_category_name),
+                CallbackQueryHandler(handle_normal_buttons),
+            ],
+            WAITING_PRODUCT_NAME: [
+                MessageHandler(filters.TEXT & ~filters.COMMAND, handle_product_name),
+                CallbackQueryHandler(handle_normal_buttons),
+            ],
+            WAITING_PRODUCT_PRICE: [
+                MessageHandler(filters.TEXT & ~filters.COMMAND, handle_product_price),
+                CallbackQueryHandler(handle_normal_buttons),
+            ],
+            WAITING_PRODUCT_DESCRIPTION: [
+                MessageHandler(filters.TEXT & ~filters.COMMAND, handle_product_description),
+                CallbackQueryHandler(handle_normal_buttons),
+            ],
+            WAITING_PRODUCT_MEDIA: [
+                MessageHandler(filters.PHOTO | filters.VIDEO, handle_product_media),
+                CallbackQueryHandler(handle_normal_buttons),
+            ],
+            SELECTING_CATEGORY: [
+                CallbackQueryHandler(handle_normal_buttons),
+            ],
+            WAITING_BUTTON_NAME: [
+                MessageHandler(filters.TEXT & ~filters.COMMAND, handle_button_name),
+                CallbackQueryHandler(handle_normal_buttons)
+            ],
+            WAITING_BUTTON_VALUE: [
+                MessageHandler(filters.TEXT & ~filters.COMMAND, handle_button_value),
+                CallbackQueryHandler(handle_normal_buttons)
+            ],
+            SELECTING_CATEGORY_TO_DELETE: [
+                CallbackQueryHandler(handle_normal_buttons),
+            ],
+            SELECTING_PRODUCT_TO_DELETE: [
+                CallbackQueryHandler(handle_normal_buttons),
+            ],
+            WAITING_CONTACT_USERNAME: [
+                MessageHandler(filters.TEXT & ~filters.COMMAND, handle_contact_username),
+                CallbackQueryHandler(handle_normal_buttons),
+            ],
+            SELECTING_PRODUCT_TO_EDIT: [
+                CallbackQueryHandler(handle_normal_buttons),
+            ],
+            EDITING_PRODUCT_FIELD: [
+                CallbackQueryHandler(handle_normal_buttons),
+            ],
+            WAITING_NEW_VALUE: [
+                MessageHandler(filters.TEXT & ~filters.COMMAND, handle_new_value),
+                CallbackQueryHandler(handle_normal_buttons),
+            ],
+            WAITING_BANNER_IMAGE: [
+                MessageHandler(filters.PHOTO, handle_banner_image),
+                CallbackQueryHandler(handle_normal_buttons),
+            ],
+            WAITING_WELCOME_MESSAGE: [
+                MessageHandler(filters.TEXT & ~filters.COMMAND, handle_welcome_message),
+                CallbackQueryHandler(handle_normal_buttons)
+            ],
+            WAITING_ORDER_BUTTON_CONFIG: [
+                MessageHandler(filters.TEXT & ~filters.COMMAND, handle_order_button_config),
+                CallbackQueryHandler(handle_normal_buttons),
+            ],
+            WAITING_PRODUCT_MEDIA: [
+                MessageHandler(filters.PHOTO | filters.VIDEO, handle_product_media),
+                CallbackQueryHandler(finish_product_media, pattern="^finish_media$"),
+                CallbackQueryHandler(handle_normal_buttons),
+            ],
+            WAITING_NEW_CATEGORY_NAME: [
+                MessageHandler(filters.TEXT & ~filters.COMMAND, handle_new_category_name),
+                CallbackQueryHandler(handle_normal_buttons),
+            ],
+            EDITING_CATEGORY: [
+                CallbackQueryHandler(handle_normal_buttons),
+            ],
+            WAITING_FOR_ACCESS_CODE: [
+                MessageHandler(filters.TEXT & ~filters.COMMAND, handle_access_code),
+                CallbackQueryHandler(start, pattern="^cancel_access$"),
+            ],
+            WAITING_BROADCAST_MESSAGE: [
+                MessageHandler(
+                    (filters.TEXT | filters.PHOTO | filters.VIDEO) & ~filters.COMMAND,
+                    admin_features.send_broadcast_message
+                ),
+                CallbackQueryHandler(handle_normal_buttons)
+            ],
+            WAITING_BROADCAST_EDIT: [
+                MessageHandler(
+                    (filters.TEXT | filters.PHOTO | filters.VIDEO) & ~filters.COMMAND,
+                    admin_features.handle_broadcast_edit
+                ),
+                CallbackQueryHandler(handle_normal_buttons)
+            ],
+        },
+        fallbacks=[
+            CommandHandler('start', start),
+            CommandHandler('admin', admin),
+        ],
+        name="main_conversation",
+        persistent=False,
+    )
+
+    application.add_handler(TypeHandler(Update, track_session), group=-1)
+    application.add_handler(CommandHandler("ban", admin_features.handle_ban_command))
+    application.add_handler(CallbackQueryHandler(
+        admin_features.show_banned_users,
+        pattern="^show_banned$"
+    ))
+    application.add_handler(CallbackQueryHandler(
+        admin_features.handle_unban_callback,
+        pattern="^unban_"
+    ))
+    application.add_handler(CallbackQueryHandler(show_networks, pattern="^show_networks$"))
+    application.add_handler(CallbackQueryHandler(start, pattern="^start_cmd$"))
+    application.add_handler(CommandHandler("gencode", admin_generate_code))
+    application.add_handler(CommandHandler("listecodes", admin_list_codes))
+    application.add_handler(CommandHandler("metrics", admin_metrics))
+    application.add_handler(conv_handler)
+    return application
+
+def main():
+    """Fonction principale du bot"""
+    try:
+        application = build_application()
 
         # Démarrer le bot avec les paramètres optimisés
-        print("Bot démarré...")
-        application.run_polling(
-            drop_pending_updates=True,
-            allowed_updates=[Update.MESSAGE, Update.CALLBACK_QUERY],
-            pool_timeout=30.0,
-            read_timeout=30.0,
-            write_timeout=30.0,
-            connect_timeout=30.0
-        )
+        if CONFIG.get('mode', 'polling') == 'webhook':
+            error = webhook_config_error(CONFIG.get('webhook', {}))
+            if error is None:
+                run_webhook(application)
+                return
+            logger.error(f"Mode webhook impossible : {error}. Démarrage en mode polling.")
+        run_polling(application)
 
     except Exception as e:
-        print(f"Erreur lors du démarrage du bot: {e}")
+        logger.exception(f"Erreur lors du démarrage du bot: {e}")
 
 if __name__ == '__main__':
     main()
\ No newline at end of file
@@ -1,14 +1,31 @@
+import copy
 import json
 import random
 import string
+import time
 from datetime import datetime, timedelta
 import os
 
 class AccessManager:
-    def __init__(self):
+    def __init__(self, cached: bool = True, check_interval: float = 2.0, backend=None, executor=None):
         self.access_file = "data/access_codes.json"
-        self._ensure_file_exists()
-        
+        # Avec un backend SQLite, les codes sont lus et écrits dans la base et non plus dans le fichier
+        self.backend = backend
+        if backend is None:
+            self._ensure_file_exists()
+        # Exécuteur d'E/S optionnel : les accès disque se font alors hors de la boucle d'événements
+        self.executor = executor
+
+        # Mode cache : les données restent en mémoire et ne sont relues que si le fichier change
+        self.cached = cached
+        self.check_interval = check_interval
+        self._data = None
+        self._codes = {}
+        self._authorized = set()
+        self._enabled = True
+        self._file_signature = None
+        self._last_check = 0.0
+
     def _ensure_file_exists(self):
         """Crée le fichier d'accès s'il n'existe pas"""
         if not os.path.exists("data"):
@@ -21,94 +38,169 @@ class AccessManager:
                     "is_enabled": True  # Ajout de l'état par défaut
                 }, f, indent=4)
 
-    def toggle_access_code(self) -> bool:
-        """Active/désactive le système de code d'accès"""
+    def _get_file_signature(self):
+        """Retourne (mtime, taille) du fichier d'accès"""
+        if self.backend is not None:
+            return self.backend.access_codes_version()
+        try:
+            stat = os.stat(self.access_file)
+            return stat.st_mtime_ns, stat.st_size
+        except FileNotFoundError:
+            return None
+
+    def _index(self, data: dict):
+        """Reconstruit les index en mémoire à partir des données du fichier"""
+        data.setdefault("codes", [])
+        data.setdefault("authorized_users", [])
+        self._data = data
+        self._codes = {c["code"]: c for c in data["codes"]}
+        self._authorized = set(data["authorized_users"])
+        self._enabled = data.get("is_enabled", True)
+
+    async def _run(self, func, *args):
+        if self.executor is None:
+            return func(*args)
+        return await self.executor.run(func, *args)
+
+    def _read_file(self) -> dict:
+        if self.backend is not None:
+            return self.backend.load_access_codes()
         with open(self.access_file, 'r') as f:
-            data = json.load(f)
-        
+            return json.load(f)
+
+    def _write_file(self, data: str):
+        with open(self.access_file, 'w') as f:
+            f.write(data)
+
+    async def _refresh(self, force: bool = False):
+        """Recharge le fichier uniquement si sa date de modification ou sa taille a changé
+
+        `force` ignore l'intervalle entre deux vérifications : avant une écriture, le cache
+        doit inclure les modifications faites par ailleurs (bannissements d'AdminFeatures).
+        """
+        now = time.monotonic()
+        if not force and self._data is not None and now - self._last_check < self.check_interval:
+            return
+        self._last_check = now
+
+        signature = await self._run(self._get_file_signature)
+        if self._data is not None and signature == self._file_signature:
+            return
+
+        self._index(await self._run(self._read_file))
+        self._file_signature = signature
+
+    async def _load(self, fresh: bool = False) -> dict:
+        """Retourne les données d'accès (depuis le cache ou le fichier, relu s'il a changé quand `fresh`)"""
+        if self.cached:
+            await self._refresh(fresh)
+            return self._data
+        data = await self._run(self._read_file)
+        self._index(data)
+        return data
+
+    async def _save(self, data: dict):
+        """Sauvegarde les données puis met à jour le cache
+
+        Les appelants modifient les données du cache avant l'appel : si l'écriture échoue,
+        le cache est abandonné et relu au prochain accès, le fichier restant la référence.
+        """
+        try:
+            if self.backend is not None:
+                await self._run(self.backend.save_access_codes, copy.deepcopy(data))
+            else:
+                await self._run(self._write_file, json.dumps(data, indent=4))
+        except Exception:
+            self.invalidate()
+            raise
+        self._index(data)
+        self._file_signature = await self._run(self._get_file_signature)
+        self._last_check = time.monotonic()
+
+    def invalidate(self):
+        """Force la relecture du fichier au prochain accès"""
+        self._data = None
+
+    async def toggle_access_code(self) -> bool:
+        """Active/désactive le système de code d'accès"""
+        data = await self._load(fresh=True)
+
         # Inverser l'état
         data["is_enabled"] = not data.get("is_enabled", True)
-        
-        with open(self.access_file, 'w') as f:
-            json.dump(data, f, indent=4)
-        
+
+        await self._save(data)
+
         return data["is_enabled"]
 
-    def is_access_code_enabled(self) -> bool:
+    async def is_access_code_enabled(self) -> bool:
         """Vérifie si le système de code d'accès est activé"""
-        with open(self.access_file, 'r') as f:
-            data = json.load(f)
-        return data.get("is_enabled", True)  # True par défaut si non défini
+        await self._load()
+        return self._enabled  # True par défaut si non défini
 
-    def generate_code(self, admin_id: int) -> tuple[str, str]:
+    async def generate_code(self, admin_id: int) -> tuple[str, str]:
         """Génère un nouveau code d'accès"""
+        data = await self._load(fresh=True)
+
         code = ''.join(random.choices(string.ascii_uppercase + string.digits, k=8))
+        while code in self._codes:
+            code = ''.join(random.choices(string.ascii_uppercase + string.digits, k=8))
         expiration = (datetime.now() + timedelta(hours=72)).isoformat()
-        
-        with open(self.access_file, 'r') as f:
-            data = json.load(f)
-        
+
         data["codes"].append({
             "code": code,
             "expiration": expiration,
             "created_by": admin_id,
             "used": False
         })
-        
-        with open(self.access_file, 'w') as f:
-            json.dump(data, f, indent=4)
-            
+
+        await self._save(data)
+
         return code, expiration
 
-    def verify_code(self, code: str, user_id: int) -> tuple[bool, str]:
+    async def verify_code(self, code: str, user_id: int) -> tuple[bool, str]:
         """Vérifie un code d'accès"""
-        with open(self.access_file, 'r') as f:
-            data = json.load(f)
-        
+        data = await self._load(fresh=True)
+
         # Si le système est désactivé, autoriser l'accès
-        if not data.get("is_enabled", True):
-            if user_id not in data["authorized_users"]:
+        if not self._enabled:
+            if user_id not in self._authorized:
                 data["authorized_users"].append(user_id)
-                with open(self.access_file, 'w') as f:
-                    json.dump(data, f, indent=4)
+                await self._save(data)
             return True, "success"
 
-        if user_id in data["authorized_users"]:
+        if user_id in self._authorized:
             return True, "already_authorized"
 
+        entry = self._codes.get(code)
+        if entry is None or entry["used"]:
+            return False, "invalid"
+
         now = datetime.now()
-        
+        if datetime.fromisoformat(entry["expiration"]) <= now:
+            return False, "expired"
+
+        entry["used"] = True
+        data["authorized_users"].append(user_id)
+
         # Nettoyer les codes expirés
-        data["codes"] = [c for c in data["codes"] 
+        data["codes"] = [c for c in data["codes"]
                         if datetime.fromisoformat(c["expiration"]) > now]
-        
-        for c in data["codes"]:
-            if c["code"] == code and not c["used"]:
-                if datetime.fromisoformat(c["expiration"]) > now:
-                    c["used"] = True
-                    data["authorized_users"].append(user_id)
-                    with open(self.access_file, 'w') as f:
-                        json.dump(data, f, indent=4)
-                    return True, "success"
-                else:
-                    return False, "expired"
-        
-        return False, "invalid"
-    
-    def is_authorized(self, user_id: int) -> bool:
+
+        await self._save(data)
+        return True, "success"
+
+    async def is_authorized(self, user_id: int) -> bool:
         """Vérifie si un utilisateur est autorisé"""
-        with open(self.access_file, 'r') as f:
-            data = json.load(f)
+        await self._load()
         # Si le système est désactivé, tout le monde est autorisé
-        if not data.get("is_enabled", True):
+        if not self._enabled:
             return True
-        return user_id in data["authorized_users"]
-    
-    def list_active_codes(self) -> list:
+        return user_id in self._authorized
+
+    async def list_active_codes(self) -> list:
         """Liste tous les codes actifs"""
-        with open(self.access_file, 'r') as f:
-            data = json.load(f)
-        
+        data = await self._load()
+
         now = datetime.now()
-        return [c for c in data["codes"] 
-                if not c["used"] and datetime.fromisoformat(c["expiration"]) > now]
\ No newline at end of file
+        return [c for c in data["codes"]
+                if not c["used"] and datetime.fromisoformat(c["expiration"]) > now]
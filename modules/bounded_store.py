@@ -0,0 +1,89 @@
+import time
+from collections import OrderedDict
+
+
+class BoundedStore:
+    """Dictionnaire borné : au plus `max_entries` entrées, chacune expirant `ttl` secondes après son dernier accès
+
+    Les entrées sont rangées de la moins récemment utilisée à la plus récente : les
+    entrées expirées et les évictions LRU se font donc toujours en tête, sans parcours
+    complet. La mémoire occupée reste stable quelle que soit la durée de fonctionnement.
+
+    `on_evict(clé, valeur)` est appelé pour chaque entrée expirée ou évincée, afin de
+    libérer les données associées.
+    """
+
+    def __init__(self, max_entries: int = 10000, ttl: float = 3600.0, on_evict=None):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.on_evict = on_evict
+        self._entries = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.expired = 0
+        self.evicted = 0
+
+    def _evicted(self, key, value) -> None:
+        if self.on_evict is not None:
+            self.on_evict(key, value)
+
+    def _purge_expired(self, now: float) -> None:
+        while self._entries:
+            key, (value, expires_at) = next(iter(self._entries.items()))
+            if expires_at > now:
+                break
+            del self._entries[key]
+            self.expired += 1
+            self._evicted(key, value)
+
+    def __setitem__(self, key, value) -> None:
+        now = time.monotonic()
+        self._purge_expired(now)
+        self._entries[key] = (value, now + self.ttl)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            evicted_key, (evicted_value, _) = self._entries.popitem(last=False)
+            self.evicted += 1
+            self._evicted(evicted_key, evicted_value)
+
+    def get(self, key, default=None):
+        entry = self._entries.get(key)
+        if entry is None:
+            self.misses += 1
+            return default
+
+        now = time.monotonic()
+        value, expires_at = entry
+        if expires_at <= now:
+            del self._entries[key]
+            self.expired += 1
+            self.misses += 1
+            self._evicted(key, value)
+            return default
+
+        self._entries[key] = (value, now + self.ttl)
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return value
+
+    def pop(self, key, default=None):
+        entry = self._entries.pop(key, None)
+        return default if entry is None else entry[0]
+
+    def __contains__(self, key) -> bool:
+        entry = self._entries.get(key)
+        return entry is not None and entry[1] > time.monotonic()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def stats(self) -> dict:
+        """Taille et compteurs d'accès, pour le suivi de la mémoire"""
+        return {
+            "size": len(self._entries),
+            "max_entries": self.max_entries,
+            "hits": self.hits,
+            "misses": self.misses,
+            "expired": self.expired,
+            "evicted": self.evicted
+        }
@@ -0,0 +1,34 @@
+import base64
+import struct
+from collections import namedtuple
+
+VERSION = 1
+MARKER = "~"
+
+# version, route, identifiant (produit ou catégorie), page, index de média : 10 octets
+_FORMAT = struct.Struct('>BBIHH')
+ENCODED_LENGTH = len(MARKER) + 14  # base64 de 10 octets sans le remplissage "=="
+
+Payload = namedtuple('Payload', 'route id page media')
+
+
+def encode(route: int, obj_id: int = 0, page: int = 0, media: int = 0) -> str:
+    """Encode un callback_data de taille fixe (15 caractères), bien en dessous de la limite de 64 octets"""
+    try:
+        raw = _FORMAT.pack(VERSION, route, obj_id, page, media)
+    except struct.error as e:
+        raise ValueError(f"Valeur hors limites pour le callback_data : {e}") from None
+    return MARKER + base64.urlsafe_b64encode(raw)[:-2].decode('ascii')
+
+
+def decode(data: str):
+    """Décode un callback_data produit par encode(). Retourne None s'il est invalide ou d'une autre version"""
+    if len(data) != ENCODED_LENGTH or not data.startswith(MARKER):
+        return None
+    try:
+        version, route, obj_id, page, media = _FORMAT.unpack(base64.urlsafe_b64decode(data[1:] + '=='))
+    except (ValueError, struct.error):
+        return None
+    if version != VERSION:
+        return None
+    return Payload(route, obj_id, page, media)
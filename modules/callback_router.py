@@ -0,0 +1,57 @@
+_HANDLER = None  # clé réservée dans les nœuds du trie (les autres clés sont des caractères)
+
+
+class CallbackRouter:
+    """Aiguille les callback_data vers leur handler
+
+    Les correspondances exactes sont résolues par un dictionnaire, les préfixes par un
+    trie : le coût ne dépend que de la longueur du callback_data, pas du nombre de routes.
+    Si plusieurs préfixes correspondent, le plus long l'emporte.
+    """
+
+    def __init__(self):
+        self._exact = {}
+        self._trie = {}
+
+    def add_exact(self, key: str, handler) -> None:
+        if key in self._exact:
+            raise ValueError(f"Route déjà enregistrée : {key}")
+        self._exact[key] = handler
+
+    def add_prefix(self, prefix: str, handler) -> None:
+        node = self._trie
+        for char in prefix:
+            node = node.setdefault(char, {})
+        if _HANDLER in node:
+            raise ValueError(f"Préfixe déjà enregistré : {prefix}")
+        node[_HANDLER] = handler
+
+    def exact(self, *keys):
+        """Décorateur : enregistre le handler pour une ou plusieurs valeurs exactes"""
+        def decorator(handler):
+            for key in keys:
+                self.add_exact(key, handler)
+            return handler
+        return decorator
+
+    def prefix(self, *prefixes):
+        """Décorateur : enregistre le handler pour un ou plusieurs préfixes"""
+        def decorator(handler):
+            for prefix in prefixes:
+                self.add_prefix(prefix, handler)
+            return handler
+        return decorator
+
+    def resolve(self, data: str):
+        """Retourne le handler correspondant au callback_data, ou None"""
+        handler = self._exact.get(data)
+        if handler is not None:
+            return handler
+
+        node = self._trie
+        for char in data:
+            node = node.get(char)
+            if node is None:
+                break
+            handler = node.get(_HANDLER, handler)
+        return handler
@@ -0,0 +1,148 @@
+import logging
+import json
+import os
+
+logger = logging.getLogger(__name__)
+
+
+def _encode(data) -> str:
+    return json.dumps(data, ensure_ascii=False, separators=(',', ':'))
+
+
+class CatalogStore:
+    """Stockage du catalogue : instantané JSON compact + journal des modifications
+
+    L'instantané est toujours écrit dans un fichier temporaire puis renommé, il n'est
+    donc jamais à moitié écrit. Chaque modification ajoute une ligne au journal
+    (`<fichier>.journal`) ne contenant que les catégories modifiées. Le journal est
+    fusionné dans l'instantané (compaction) après `compact_every` entrées ou lorsqu'il
+    devient plus gros que l'instantané.
+
+    `prepare()` sérialise une modification et `write()` l'écrit sur disque : la
+    seconde étape peut être exécutée dans un autre thread.
+    """
+
+    def __init__(self, path: str, journal: bool = True, compact_every: int = 100):
+        self.path = path
+        self.journal_path = f"{path}.journal"
+        self.meta_path = f"{path}.meta"
+        self.journal = journal
+        self.compact_every = compact_every
+        self._journal_entries = 0
+        self._journal_size = 0
+        self._snapshot_size = 0
+
+    def _read_snapshot(self) -> dict:
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                data = f.read()
+        except FileNotFoundError:
+            return {}
+        self._snapshot_size = len(data)
+        return json.loads(data) if data.strip() else {}
+
+    def _replay_journal(self, catalog: dict) -> bool:
+        """Réapplique le journal sur le catalogue. Retourne False s'il n'y a pas de journal"""
+        try:
+            with open(self.journal_path, 'r', encoding='utf-8') as f:
+                lines = f.readlines()
+        except FileNotFoundError:
+            return False
+
+        for line in lines:
+            try:
+                entry = json.loads(line)
+            except json.JSONDecodeError:
+                # Dernière ligne tronquée par un arrêt brutal : les entrées suivantes n'existent pas
+                logger.warning(f"Entrée de journal illisible ignorée dans {self.journal_path}")
+                break
+            if entry.get('op') == 'put':
+                catalog[entry['category']] = entry['products']
+            elif entry.get('op') == 'del':
+                catalog.pop(entry['category'], None)
+        return True
+
+    def load(self) -> dict:
+        """Charge l'instantané puis rejoue le journal, qui est aussitôt compacté"""
+        catalog = self._read_snapshot()
+        if self._replay_journal(catalog):
+            self.save(catalog)
+        return catalog
+
+    def _write_atomic(self, path: str, data: str) -> None:
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            f.write(data)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, path)
+
+    def _prepare_snapshot(self, catalog: dict):
+        data = _encode(catalog)
+        self._snapshot_size = len(data)
+        self._journal_entries = 0
+        self._journal_size = 0
+        return 'snapshot', data
+
+    def prepare(self, catalog: dict, *categories):
+        """Sérialise la modification des catégories données (supprimées si absentes du catalogue)
+
+        Sans catégorie, ou lorsque le journal doit être compacté, un instantané complet est préparé.
+        """
+        if not self.journal or not categories:
+            return self._prepare_snapshot(catalog)
+
+        lines = []
+        for category in categories:
+            if category in catalog:
+                lines.append(_encode({'op': 'put', 'category': category, 'products': catalog[category]}))
+            else:
+                lines.append(_encode({'op': 'del', 'category': category}))
+        data = '\n'.join(lines) + '\n'
+
+        self._journal_entries += len(lines)
+        self._journal_size += len(data)
+        if self._journal_entries >= self.compact_every or self._journal_size > self._snapshot_size:
+            return self._prepare_snapshot(catalog)
+        return 'journal', data
+
+    def write(self, operation) -> None:
+        """Écrit sur disque une opération retournée par prepare()"""
+        kind, data = operation
+        if kind == 'snapshot':
+            self._write_atomic(self.path, data)
+            if os.path.exists(self.journal_path):
+                os.remove(self.journal_path)
+            return
+
+        with open(self.journal_path, 'a', encoding='utf-8') as f:
+            f.write(data)
+            f.flush()
+            os.fsync(f.fileno())
+
+    def save(self, catalog: dict) -> None:
+        """Écrit un instantané complet et vide le journal"""
+        self.write(self._prepare_snapshot(catalog))
+
+    def record(self, catalog: dict, *categories) -> None:
+        """Persiste immédiatement la modification des catégories données"""
+        self.write(self.prepare(catalog, *categories))
+
+    def load_meta(self) -> dict:
+        """Métadonnées du catalogue (identifiants des catégories, prochains identifiants)"""
+        try:
+            with open(self.meta_path, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return {}
+        except json.JSONDecodeError:
+            logger.warning(f"Métadonnées illisibles ignorées : {self.meta_path}")
+            return {}
+
+    def save_meta(self, meta: dict) -> None:
+        self._write_atomic(self.meta_path, _encode(meta))
+
+    def compact(self, catalog: dict) -> None:
+        """Fusionne le journal dans l'instantané"""
+        if self._journal_entries or os.path.exists(self.journal_path):
+            self.save(catalog)
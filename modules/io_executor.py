@@ -0,0 +1,28 @@
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+
+
+class IOExecutor:
+    """Exécute les lectures et écritures de fichiers hors de la boucle d'événements
+
+    Un seul thread par défaut : les écritures sont exécutées dans l'ordre où elles ont
+    été soumises, deux sauvegardes d'un même fichier ne peuvent donc pas s'inverser.
+    Les données doivent être sérialisées avant l'envoi (sur la boucle), pour que le
+    thread ne lise jamais un objet en cours de modification.
+    """
+
+    def __init__(self, max_workers: int = 1, metrics=None):
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="io")
+        self.metrics = metrics
+
+    async def run(self, func, *args):
+        """Exécute `func(*args)` dans le thread d'E/S et attend son résultat"""
+        if self.metrics is not None:
+            # Durée mesurée dans le thread : l'attente dans la file n'est pas comptée
+            func = self.metrics.timed("storage_io_duration_seconds", func, operation=getattr(func, '__qualname__', str(func)))
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._executor, func, *args)
+
+    def shutdown(self, wait: bool = True) -> None:
+        """Attend la fin des écritures en cours puis arrête le thread"""
+        self._executor.shutdown(wait=wait)
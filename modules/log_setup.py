@@ -0,0 +1,55 @@
+import atexit
+import logging
+import queue
+from logging.handlers import QueueHandler, QueueListener, RotatingFileHandler
+
+LOG_FORMAT = '%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+
+# Niveaux appliqués si config.json n'en précise pas d'autres (section "log_levels")
+DEFAULT_LEVELS = {
+    "httpx": "WARNING",
+    "telegram": "INFO",
+}
+
+
+def setup_logging(config: dict) -> QueueListener:
+    """Configure la journalisation du bot et retourne le QueueListener démarré
+
+    Les handlers de la boucle d'événements ne font que déposer les enregistrements
+    dans une file (QueueHandler) : un thread d'écriture (QueueListener) les formate et
+    les écrit sur la console et dans un fichier tournant. Clés de config.json :
+    - `log_level` : niveau global (INFO par défaut, DEBUG pour le détail de chaque bouton)
+    - `log_levels` : niveaux par module, par exemple {"__main__": "DEBUG", "httpx": "WARNING"}
+    - `log_file`, `log_max_bytes`, `log_backup_count` : fichier et rotation par taille
+    """
+    formatter = logging.Formatter(LOG_FORMAT)
+
+    file_handler = RotatingFileHandler(
+        config.get('log_file', 'bot.log'),
+        maxBytes=int(config.get('log_max_bytes', 5 * 1024 * 1024)),
+        backupCount=int(config.get('log_backup_count', 5)),
+        encoding='utf-8'
+    )
+    console_handler = logging.StreamHandler()
+    for handler in (file_handler, console_handler):
+        handler.setFormatter(formatter)
+
+    log_queue = queue.SimpleQueue()
+    listener = QueueListener(log_queue, file_handler, console_handler, respect_handler_level=True)
+
+    root = logging.getLogger()
+    for handler in root.handlers[:]:
+        root.removeHandler(handler)
+        handler.close()
+    root.addHandler(QueueHandler(log_queue))
+    root.setLevel(str(config.get('log_level', 'INFO')).upper())
+
+    levels = dict(DEFAULT_LEVELS)
+    levels.update(config.get('log_levels') or {})
+    for name, level in levels.items():
+        logging.getLogger(name).setLevel(str(level).upper())
+
+    listener.start()
+    # Vide la file à la sortie, après les derniers messages de l'arrêt du bot
+    atexit.register(listener.stop)
+    return listener
@@ -0,0 +1,173 @@
+import logging
+import asyncio
+import time
+from collections import deque
+from telegram.error import BadRequest, RetryAfter, TelegramError
+
+logger = logging.getLogger(__name__)
+
+# Messages de BadRequest qui désignent le file_id lui-même (et non la légende, le chat, etc.)
+FILE_ID_ERRORS = (
+    'wrong file identifier',
+    'wrong remote file id',
+    'wrong file_id',
+    'invalid file_id',
+    'wrong padding',
+)
+
+
+def is_file_id_error(error) -> bool:
+    """Vrai si Telegram refuse le média à cause de son file_id (invalide, expiré, d'un autre bot)"""
+    if not isinstance(error, BadRequest):
+        return False
+    message = str(error).lower()
+    return any(pattern in message for pattern in FILE_ID_ERRORS)
+
+
+def sort_media(media_list) -> list:
+    """Médias d'un produit dans l'ordre d'affichage (order_index)"""
+    return sorted(media_list or [], key=lambda media: media.get('order_index', 0))
+
+
+def normalize_catalog_media(catalog: dict) -> list:
+    """Trie une fois pour toutes les médias de chaque produit. Retourne les catégories modifiées"""
+    changed = []
+    for category, products in catalog.items():
+        if not isinstance(products, list):
+            continue
+        for product in products:
+            media = product.get('media') if isinstance(product, dict) else None
+            if not media:
+                continue
+            if any(a.get('order_index', 0) > b.get('order_index', 0) for a, b in zip(media, media[1:])):
+                product['media'] = sort_media(media)
+                if category not in changed:
+                    changed.append(category)
+    return changed
+
+
+class MediaHealth:
+    """État de chaque file_id des médias : valide, invalide ou pas encore vérifié
+
+    Les file_id sont vérifiés en arrière-plan avec getFile, un appel toutes les
+    `validation_delay` secondes au plus, et tout le catalogue est revérifié toutes les
+    `revalidate_interval` secondes. Un envoi refusé par Telegram pour son file_id marque
+    aussi le média comme invalide : les vues de produits l'ignorent ensuite sans appel à l'API.
+    """
+
+    OK = 'ok'
+    BAD = 'bad'
+
+    def __init__(self, validation_delay: float = 0.5, revalidate_interval: float = 86400.0):
+        self.validation_delay = validation_delay
+        self.revalidate_interval = revalidate_interval
+        self._state = {}
+        self._bad = 0
+        self._queue = deque()
+        self._queued = set()
+        self._wakeup = None
+        self._task = None
+        self._bot = None
+        self._media_ids = None
+
+    def _set(self, file_id, state) -> None:
+        previous = self._state.get(file_id)
+        if previous == state:
+            return
+        self._state[file_id] = state
+        self._bad += (state == self.BAD) - (previous == self.BAD)
+
+    def mark_ok(self, file_id) -> None:
+        self._set(file_id, self.OK)
+
+    def mark_bad(self, file_id) -> None:
+        if self._state.get(file_id) != self.BAD:
+            logger.warning(f"Média invalide ignoré désormais : {file_id}")
+        self._set(file_id, self.BAD)
+
+    def is_bad(self, file_id) -> bool:
+        return self._state.get(file_id) == self.BAD
+
+    def usable(self, media_list) -> list:
+        """Médias (déjà triés) dont le file_id n'est pas connu comme invalide"""
+        if not media_list or not self._bad:
+            return media_list or []
+        return [media for media in media_list if self._state.get(media.get('media_id')) != self.BAD]
+
+    def schedule(self, *file_ids, force: bool = False) -> None:
+        """Met des file_id en file de vérification (seulement ceux jamais vérifiés, sauf avec force)"""
+        for file_id in file_ids:
+            if not file_id or file_id in self._queued or (not force and file_id in self._state):
+                continue
+            self._queue.append(file_id)
+            self._queued.add(file_id)
+        if self._queue and self._wakeup is not None:
+            self._wakeup.set()
+
+    async def _check(self, file_id) -> None:
+        try:
+            await self._bot.get_file(file_id)
+            self.mark_ok(file_id)
+        except RetryAfter as e:
+            self.schedule(file_id, force=True)
+            retry_after = e.retry_after.total_seconds() if hasattr(e.retry_after, 'total_seconds') else e.retry_after
+            await asyncio.sleep(retry_after)
+        except BadRequest as e:
+            # Les fichiers de plus de 20 Mo ne sont pas téléchargeables mais restent envoyables
+            if 'too big' in str(e).lower():
+                self.mark_ok(file_id)
+            elif is_file_id_error(e):
+                self.mark_bad(file_id)
+            else:
+                logger.warning(f"Vérification du média {file_id} impossible : {e}")
+        except TelegramError as e:
+            # Erreur réseau : le média sera revérifié au prochain passage
+            logger.warning(f"Vérification du média {file_id} impossible : {e}")
+        except Exception as e:
+            # Une erreur inattendue ne doit pas arrêter la boucle de vérification
+            logger.error(f"Erreur lors de la vérification du média {file_id} : {e}", exc_info=True)
+
+    async def _validation_loop(self):
+        next_full_check = time.monotonic()
+        while True:
+            if time.monotonic() >= next_full_check:
+                self.schedule(*self._media_ids(), force=True)
+                next_full_check = time.monotonic() + self.revalidate_interval
+
+            if not self._queue:
+                self._wakeup.clear()
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), timeout=max(0.0, next_full_check - time.monotonic()))
+                except asyncio.TimeoutError:
+                    pass
+                continue
+
+            file_id = self._queue.popleft()
+            self._queued.discard(file_id)
+            await self._check(file_id)
+            await asyncio.sleep(self.validation_delay)
+
+    async def start(self, bot, media_ids) -> None:
+        """Démarre la vérification en arrière-plan. `media_ids()` retourne tous les file_id du catalogue"""
+        if self._task is None:
+            self._bot = bot
+            self._media_ids = media_ids
+            self._wakeup = asyncio.Event()
+            self._task = asyncio.create_task(self._validation_loop())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+            self._wakeup = None
+
+    def stats(self) -> dict:
+        return {
+            "known": len(self._state),
+            "bad": self._bad,
+            "queued": len(self._queue)
+        }
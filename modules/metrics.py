@@ -0,0 +1,226 @@
+import logging
+import asyncio
+import threading
+import time
+from bisect import bisect_left
+from telegram.request import HTTPXRequest
+
+logger = logging.getLogger(__name__)
+
+# Bornes supérieures des intervalles des histogrammes, en secondes
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+HELP = {
+    "bot_callback_duration_seconds": "Durée de traitement des boutons, par route",
+    "telegram_api_duration_seconds": "Durée des appels à l'API Telegram, par méthode",
+    "telegram_api_requests_total": "Appels à l'API Telegram, par méthode et code HTTP",
+    "storage_io_duration_seconds": "Durée des lectures et écritures sur disque (thread d'E/S), par opération",
+}
+
+
+class Histogram:
+    __slots__ = ('buckets', 'counts', 'count', 'sum')
+
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)  # dernier intervalle : au-delà de la plus grande borne
+        self.count = 0
+        self.sum = 0.0
+
+    def observe(self, value: float) -> None:
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.count += 1
+        self.sum += value
+
+    def quantile(self, q: float) -> float:
+        """Estimation : borne supérieure de l'intervalle contenant le quantile"""
+        if not self.count:
+            return 0.0
+        rank = q * self.count
+        seen = 0
+        for bound, count in zip(self.buckets, self.counts):
+            seen += count
+            if seen >= rank:
+                return bound
+        return float('inf')
+
+
+def _labels(labels: dict) -> tuple:
+    return tuple(sorted(labels.items()))
+
+
+def _format_labels(labels: tuple, extra: str = "") -> str:
+    parts = [f'{key}="{str(value)}"' for key, value in labels]
+    if extra:
+        parts.append(extra)
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+
+class Metrics:
+    """Métriques du bot en mémoire : histogrammes de latence, compteurs et jauges
+
+    Les mesures peuvent venir du thread d'E/S comme de la boucle d'événements : un
+    verrou protège les séries. Le texte exporté suit le format Prometheus.
+    """
+
+    def __init__(self, buckets=DEFAULT_BUCKETS):
+        self.buckets = tuple(buckets)
+        self.started_at = time.time()
+        self._histograms = {}
+        self._counters = {}
+        self._gauges = {}
+        self._lock = threading.Lock()
+
+    def observe(self, name: str, seconds: float, **labels) -> None:
+        key = (name, _labels(labels))
+        with self._lock:
+            histogram = self._histograms.get(key)
+            if histogram is None:
+                histogram = self._histograms[key] = Histogram(self.buckets)
+            histogram.observe(seconds)
+
+    def increment(self, name: str, value: int = 1, **labels) -> None:
+        key = (name, _labels(labels))
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + value
+
+    def register_gauge(self, name: str, read) -> None:
+        """`read()` retourne un nombre, ou un dictionnaire {libellé: nombre} exporté avec le label `key`"""
+        self._gauges[name] = read
+
+    def timed(self, name: str, func, **labels):
+        """Enveloppe une fonction synchrone pour mesurer sa durée"""
+        def wrapper(*args, **kwargs):
+            started = time.perf_counter()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                self.observe(name, time.perf_counter() - started, **labels)
+        return wrapper
+
+    def histograms(self, name: str) -> list:
+        """[(labels, histogramme)] d'une métrique"""
+        with self._lock:
+            return [(dict(labels), histogram) for (metric, labels), histogram in self._histograms.items() if metric == name]
+
+    def counters(self, name: str) -> list:
+        with self._lock:
+            return [(dict(labels), value) for (metric, labels), value in self._counters.items() if metric == name]
+
+    def render_prometheus(self) -> str:
+        """Toutes les métriques au format texte de Prometheus"""
+        lines = []
+        with self._lock:
+            histograms = sorted(self._histograms.items())
+            counters = sorted(self._counters.items())
+
+        declared = set()
+        for (name, labels), histogram in histograms:
+            if name not in declared:
+                declared.add(name)
+                lines.append(f"# HELP {name} {HELP.get(name, name)}")
+                lines.append(f"# TYPE {name} histogram")
+            cumulative = 0
+            for bound, count in zip(self.buckets, histogram.counts):
+                cumulative += count
+                bucket_labels = _format_labels(labels, 'le="%s"' % bound)
+                lines.append(f"{name}_bucket{bucket_labels} {cumulative}")
+            bucket_labels = _format_labels(labels, 'le="+Inf"')
+            lines.append(f"{name}_bucket{bucket_labels} {histogram.count}")
+            lines.append(f"{name}_sum{_format_labels(labels)} {histogram.sum:.6f}")
+            lines.append(f"{name}_count{_format_labels(labels)} {histogram.count}")
+
+        for (name, labels), value in counters:
+            if name not in declared:
+                declared.add(name)
+                lines.append(f"# HELP {name} {HELP.get(name, name)}")
+                lines.append(f"# TYPE {name} counter")
+            lines.append(f"{name}{_format_labels(labels)} {value}")
+
+        for name, read in sorted(self._gauges.items()):
+            try:
+                value = read()
+            except Exception as e:
+                logger.warning(f"Erreur lors de la lecture de la métrique {name} : {e}")
+                continue
+            lines.append(f"# TYPE {name} gauge")
+            if isinstance(value, dict):
+                for key, item in sorted(value.items()):
+                    lines.append(f'{name}{{key="{key}"}} {item}')
+            else:
+                lines.append(f"{name} {value}")
+
+        return "\n".join(lines) + "\n"
+
+    def summary(self, limit: int = 10) -> str:
+        """Résumé lisible pour la commande admin : routes et méthodes les plus lentes (p99)"""
+        def section(title, name):
+            rows = sorted(self.histograms(name), key=lambda item: item[1].quantile(0.99), reverse=True)[:limit]
+            if not rows:
+                return [title, "  (aucune mesure)"]
+            result = [title]
+            for labels, histogram in rows:
+                label = ",".join(str(value) for value in labels.values())
+                result.append(
+                    f"  {label} : {histogram.count} × moy {histogram.sum / histogram.count * 1000:.1f} ms, "
+                    f"p50 ≤ {histogram.quantile(0.5) * 1000:.0f} ms, p99 ≤ {histogram.quantile(0.99) * 1000:.0f} ms"
+                )
+            return result
+
+        uptime = int(time.time() - self.started_at)
+        lines = [f"Depuis {uptime // 3600} h {uptime % 3600 // 60} min"]
+        lines += section("Boutons :", "bot_callback_duration_seconds")
+        lines += section("API Telegram :", "telegram_api_duration_seconds")
+        lines += section("Stockage :", "storage_io_duration_seconds")
+
+        errors = sum(value for labels, value in self.counters("telegram_api_requests_total")
+                     if labels.get("status") != "200")
+        lines.append(f"Appels API en erreur : {errors}")
+        return "\n".join(lines)
+
+
+class InstrumentedRequest(HTTPXRequest):
+    """Client HTTP de python-telegram-bot qui mesure chaque appel à l'API (durée, code HTTP)"""
+
+    def __init__(self, metrics: Metrics, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._metrics = metrics
+
+    async def do_request(self, url, *args, **kwargs):
+        api_method = url.rsplit('/', 1)[-1]
+        status = "error"
+        started = time.perf_counter()
+        try:
+            code, payload = await super().do_request(url, *args, **kwargs)
+            status = str(code)
+            return code, payload
+        finally:
+            self._metrics.observe("telegram_api_duration_seconds", time.perf_counter() - started, method=api_method)
+            self._metrics.increment("telegram_api_requests_total", method=api_method, status=status)
+
+
+async def serve_metrics(metrics: Metrics, host: str = '127.0.0.1', port: int = 9100):
+    """Point d'accès HTTP local exposant les métriques (GET /metrics). Retourne le serveur asyncio"""
+    async def handle(reader, writer):
+        try:
+            request_line = await reader.readline()
+            while (await reader.readline()) not in (b'\r\n', b'\n', b''):
+                pass
+            parts = request_line.decode('latin-1').split()
+            if len(parts) >= 2 and parts[1].split('?')[0] == '/metrics':
+                body, status = metrics.render_prometheus().encode(), "200 OK"
+            else:
+                body, status = b"not found\n", "404 Not Found"
+            writer.write(
+                f"HTTP/1.1 {status}\r\n"
+                f"Content-Type: text/plain; version=0.0.4; charset=utf-8\r\n"
+                f"Content-Length: {len(body)}\r\n"
+                f"Connection: close\r\n\r\n".encode() + body
+            )
+            await writer.drain()
+        except (ConnectionResetError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            writer.close()
+
+    return await asyncio.start_server(handle, host, port)
@@ -0,0 +1,68 @@
+from telegram import InlineKeyboardButton, InlineKeyboardMarkup
+
+# callback_data du bouton "page x/y", qui n'a pas d'action
+PAGE_INDICATOR = "current_page"
+
+
+class PagedMenu:
+    """Menu d'un bouton par élément, découpé en pages dont le clavier est mis en cache
+
+    - `items(key)` retourne la liste des éléments du menu `key` (une catégorie par
+      exemple) ; une page n'en lit que la tranche correspondante.
+    - `button(key, item)` construit le bouton d'un élément.
+    - `page_callback(key, page)` retourne le callback_data menant à une page.
+    - `footer` contient les lignes de boutons ajoutées sous chaque page.
+
+    Les claviers restent en cache jusqu'à `invalidate()`, comme la pagination des
+    utilisateurs dans AdminFeatures.handle_user_management.
+    """
+
+    def __init__(self, items, button, page_callback, footer=(), page_size: int = 10):
+        self.items = items
+        self.button = button
+        self.page_callback = page_callback
+        self.footer = [list(row) for row in footer]
+        self.page_size = max(1, page_size)
+        self._pages = {}
+
+    def page_of(self, position: int) -> int:
+        """Page contenant l'élément à la position donnée"""
+        return position // self.page_size
+
+    def _build(self, key, items, page: int, total_pages: int):
+        start = page * self.page_size
+        keyboard = [[self.button(key, item)] for item in items[start:start + self.page_size]]
+
+        if total_pages > 1:
+            nav_buttons = []
+            if page > 0:
+                nav_buttons.append(InlineKeyboardButton("◀️", callback_data=self.page_callback(key, page - 1)))
+            nav_buttons.append(InlineKeyboardButton(f"{page + 1}/{total_pages}", callback_data=PAGE_INDICATOR))
+            if page < total_pages - 1:
+                nav_buttons.append(InlineKeyboardButton("▶️", callback_data=self.page_callback(key, page + 1)))
+            keyboard.append(nav_buttons)
+
+        keyboard.extend(self.footer)
+        return InlineKeyboardMarkup(keyboard)
+
+    def render(self, key=None, page: int = 0):
+        """Retourne (clavier, page, nombre de pages). Une page hors limites est ramenée à la plus proche"""
+        pages = self._pages.setdefault(key, {})
+        entry = pages.get(page)
+        if entry is not None:
+            return entry
+
+        items = self.items(key)
+        total_pages = max(1, (len(items) + self.page_size - 1) // self.page_size)
+        page = min(max(page, 0), total_pages - 1)
+        entry = pages.get(page)
+        if entry is None:
+            entry = pages[page] = (self._build(key, items, page, total_pages), page, total_pages)
+        return entry
+
+    def invalidate(self, key=None) -> None:
+        """Oublie les pages d'un menu (de tous si `key` est None)"""
+        if key is None:
+            self._pages.clear()
+        else:
+            self._pages.pop(key, None)
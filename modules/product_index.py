@@ -0,0 +1,147 @@
+class ProductIndex:
+    """Index des produits du catalogue par identifiant
+
+    Chaque produit reçoit un identifiant entier persistant (clé 'id' du produit),
+    jamais réutilisé. L'index associe cet identifiant à (catégorie, position, produit),
+    ce qui rend la recherche d'un produit et de ses voisins indépendante de la taille
+    du catalogue.
+    """
+
+    def __init__(self, catalog: dict, next_id: int = 1):
+        self.catalog = catalog
+        self._by_id = {}
+        self._category_ids = {}
+        self._next_id = next_id
+
+    @property
+    def next_id(self) -> int:
+        """Prochain identifiant attribué, à persister pour ne pas réutiliser ceux des produits supprimés"""
+        return self._next_id
+
+    def assign_ids(self) -> bool:
+        """Attribue un identifiant aux produits qui n'en ont pas. Retourne True si le catalogue a changé"""
+        missing = []
+        for products in self.catalog.values():
+            if not isinstance(products, list):
+                continue
+            for product in products:
+                if not isinstance(product, dict):
+                    continue
+                if isinstance(product.get('id'), int):
+                    self._next_id = max(self._next_id, product['id'] + 1)
+                else:
+                    missing.append(product)
+
+        for product in missing:
+            product['id'] = self._next_id
+            self._next_id += 1
+        return bool(missing)
+
+    def rebuild(self, *categories) -> None:
+        """Réindexe les catégories données (tout le catalogue si aucune n'est précisée)"""
+        if not categories:
+            self._by_id.clear()
+            self._category_ids.clear()
+            categories = [c for c, products in self.catalog.items() if isinstance(products, list)]
+
+        for category in categories:
+            for product_id in self._category_ids.pop(category, ()):
+                self._by_id.pop(product_id, None)
+
+            if not isinstance(self.catalog.get(category), list):
+                continue
+            ids = []
+            for position, product in enumerate(self.catalog[category]):
+                if not isinstance(product, dict) or 'id' not in product:
+                    continue
+                self._by_id[product['id']] = (category, position, product)
+                ids.append(product['id'])
+            self._category_ids[category] = ids
+
+    def get(self, product_id):
+        """Retourne (catégorie, position, produit) ou None"""
+        try:
+            return self._by_id.get(int(product_id))
+        except (TypeError, ValueError):
+            return None
+
+    def get_product(self, product_id):
+        entry = self.get(product_id)
+        return entry[2] if entry else None
+
+    def products(self):
+        """Tous les produits indexés"""
+        return (entry[2] for entry in self._by_id.values())
+
+    def category_ids(self, category) -> list:
+        """Identifiants des produits d'une catégorie, dans l'ordre du catalogue"""
+        return self._category_ids.get(category, [])
+
+    def __contains__(self, product_id) -> bool:
+        return self.get(product_id) is not None
+
+    def __len__(self) -> int:
+        return len(self._by_id)
+
+
+class CategoryIndex:
+    """Identifiants entiers persistants des catégories
+
+    Un nom de catégorie ne tient pas toujours dans un callback_data : les boutons
+    transportent l'identifiant, qui suit la catégorie lorsqu'elle est renommée et
+    n'est jamais réutilisé après une suppression.
+    """
+
+    def __init__(self, catalog: dict, ids: dict = None, next_id: int = 1):
+        self.catalog = catalog
+        self._ids = {}
+        self._names = {}
+        self._next_id = next_id
+        for name, category_id in (ids or {}).items():
+            self._set(name, int(category_id))
+
+    def _set(self, name, category_id: int) -> None:
+        self._ids[name] = category_id
+        self._names[category_id] = name
+        self._next_id = max(self._next_id, category_id + 1)
+
+    def assign_ids(self) -> bool:
+        """Attribue un identifiant aux nouvelles catégories et oublie les catégories supprimées
+
+        Retourne True si les identifiants ont changé.
+        """
+        removed = [name for name in self._ids if not isinstance(self.catalog.get(name), list)]
+        for name in removed:
+            del self._names[self._ids.pop(name)]
+
+        added = [name for name, products in self.catalog.items()
+                 if isinstance(products, list) and name not in self._ids]
+        for name in added:
+            self._set(name, self._next_id)
+        return bool(removed or added)
+
+    def rename(self, old_name, new_name) -> None:
+        """Conserve l'identifiant d'une catégorie renommée"""
+        category_id = self._ids.pop(old_name, None)
+        if category_id is not None:
+            self._set(new_name, category_id)
+
+    def id_of(self, name) -> int:
+        category_id = self._ids.get(name)
+        if category_id is None:
+            # Catégorie pas encore enregistrée : l'identifiant sera persisté à la prochaine sauvegarde
+            category_id = self._next_id
+            self._set(name, category_id)
+        return category_id
+
+    def name_of(self, category_id):
+        """Nom de la catégorie, ou None si elle n'existe plus"""
+        name = self._names.get(category_id)
+        return name if isinstance(self.catalog.get(name), list) else None
+
+    @property
+    def next_id(self) -> int:
+        return self._next_id
+
+    def to_dict(self) -> dict:
+        return dict(self._ids)
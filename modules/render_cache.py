@@ -0,0 +1,28 @@
+class RenderCache:
+    """Cache de rendus (texte, clavier...) reconstruits uniquement après une invalidation
+
+    `version` est incrémentée à chaque invalidation, ce qui permet de savoir si un
+    rendu conservé ailleurs est encore à jour.
+    """
+
+    def __init__(self):
+        self._entries = {}
+        self.version = 0
+
+    def get(self, key, build, *args):
+        """Retourne le rendu associé à `key`, en appelant `build(*args)` s'il est absent"""
+        entry = self._entries.get(key)
+        if entry is None:
+            entry = self._entries[key] = build(*args)
+        return entry
+
+    def invalidate(self, key=None) -> None:
+        """Supprime un rendu (ou tous si `key` est None)"""
+        if key is None:
+            self._entries.clear()
+        else:
+            self._entries.pop(key, None)
+        self.version += 1
+
+    def __len__(self) -> int:
+        return len(self._entries)
@@ -0,0 +1,404 @@
+import logging
+import json
+import os
+import sqlite3
+import threading
+
+logger = logging.getLogger(__name__)
+
+
+def _encode(data) -> str:
+    return json.dumps(data, ensure_ascii=False, separators=(',', ':'))
+
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS categories (
+    name TEXT PRIMARY KEY,
+    position INTEGER NOT NULL
+);
+CREATE TABLE IF NOT EXISTS products (
+    id INTEGER PRIMARY KEY,
+    category TEXT NOT NULL,
+    position INTEGER NOT NULL,
+    data TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_products_category ON products (category, position);
+CREATE TABLE IF NOT EXISTS users (
+    user_id TEXT PRIMARY KEY,
+    data TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS access_codes (
+    code TEXT PRIMARY KEY,
+    expiration TEXT,
+    used INTEGER NOT NULL DEFAULT 0,
+    data TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_access_codes_expiration ON access_codes (expiration);
+CREATE TABLE IF NOT EXISTS authorized_users (
+    user_id INTEGER PRIMARY KEY
+);
+CREATE TABLE IF NOT EXISTS banned_users (
+    user_id INTEGER PRIMARY KEY
+);
+CREATE TABLE IF NOT EXISTS broadcasts (
+    id TEXT PRIMARY KEY,
+    data TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS broadcast_deliveries (
+    broadcast_id TEXT NOT NULL,
+    user_id TEXT NOT NULL,
+    message_id INTEGER NOT NULL,
+    PRIMARY KEY (broadcast_id, user_id)
+);
+CREATE TABLE IF NOT EXISTS settings (
+    key TEXT PRIMARY KEY,
+    value TEXT NOT NULL
+);
+"""
+
+
+class SQLiteStore:
+    """Stockage SQLite (mode WAL) du catalogue, des utilisateurs, des codes d'accès et des diffusions
+
+    Chaque méthode `save_*` compare les données reçues avec le dernier état écrit et
+    n'envoie à la base que les lignes qui ont changé : modifier un produit ou un
+    utilisateur coûte une seule écriture, quelle que soit la taille des données.
+    La connexion est partagée entre threads et protégée par un verrou.
+    """
+
+    def __init__(self, path: str = 'data/bot.db'):
+        self.path = path
+        directory = os.path.dirname(path)
+        if directory and not os.path.exists(directory):
+            os.makedirs(directory)
+
+        self.created = not os.path.exists(path)
+        self._lock = threading.RLock()
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.executescript(SCHEMA)
+
+        self._access_state = None
+        self._broadcast_state = {}
+
+    def close(self) -> None:
+        with self._lock:
+            self.conn.close()
+
+    def is_empty(self) -> bool:
+        with self._lock:
+            for table in ('categories', 'users', 'access_codes', 'authorized_users', 'broadcasts'):
+                if self.conn.execute(f"SELECT 1 FROM {table} LIMIT 1").fetchone():
+                    return False
+            return True
+
+    def _get_setting(self, key, default=None):
+        row = self.conn.execute("SELECT value FROM settings WHERE key = ?", (key,)).fetchone()
+        return json.loads(row[0]) if row else default
+
+    def _set_setting(self, key, value) -> None:
+        self.conn.execute("INSERT OR REPLACE INTO settings (key, value) VALUES (?, ?)", (key, _encode(value)))
+
+    # Catalogue : même interface que CatalogStore (load / save / record / compact)
+
+    def load(self) -> dict:
+        with self._lock:
+            catalog = {}
+            for (name,) in self.conn.execute("SELECT name FROM categories ORDER BY position"):
+                catalog[name] = []
+            for category, data in self.conn.execute("SELECT category, data FROM products ORDER BY category, position"):
+                catalog.setdefault(category, []).append(json.loads(data))
+            # Entrées du catalogue qui ne sont pas des catégories (ex : anciennes statistiques)
+            for key, value in self.conn.execute("SELECT key, value FROM settings WHERE key LIKE 'catalog:%'"):
+                catalog[key[len('catalog:'):]] = json.loads(value)
+            return catalog
+
+    def _encode_category(self, catalog: dict, category, position: int):
+        """Sérialise une catégorie : ('products', position, [(id, position, données)]), ('extra', valeur) ou ('deleted',)"""
+        products = catalog.get(category)
+        if category not in catalog:
+            return category, ('deleted',)
+        if not isinstance(products, list):
+            return category, ('extra', _encode(products))
+        rows = [
+            (product['id'], product_position, _encode(product))
+            for product_position, product in enumerate(products)
+            if isinstance(product, dict) and 'id' in product
+        ]
+        return category, ('products', position, rows)
+
+    def _write_category(self, category, entry) -> None:
+        if entry[0] != 'products':
+            self.conn.execute("DELETE FROM categories WHERE name = ?", (category,))
+            self.conn.execute("DELETE FROM products WHERE category = ?", (category,))
+            if entry[0] == 'extra':
+                self.conn.execute("INSERT OR REPLACE INTO settings (key, value) VALUES (?, ?)", (f"catalog:{category}", entry[1]))
+            else:
+                self.conn.execute("DELETE FROM settings WHERE key = ?", (f"catalog:{category}",))
+            return
+
+        _, position, rows = entry
+
+        self.conn.execute("INSERT OR REPLACE INTO categories (name, position) VALUES (?, ?)", (category, position))
+        existing = {
+            product_id: (product_position, data)
+            for product_id, product_position, data in self.conn.execute(
+                "SELECT id, position, data FROM products WHERE category = ?", (category,)
+            )
+        }
+
+        changed = []
+        for product_id, product_position, data in rows:
+            if existing.pop(product_id, None) != (product_position, data):
+                changed.append((product_id, category, product_position, data))
+
+        if changed:
+            self.conn.executemany(
+                "INSERT OR REPLACE INTO products (id, category, position, data) VALUES (?, ?, ?, ?)", changed
+            )
+        if existing:
+            self.conn.executemany("DELETE FROM products WHERE id = ?", [(product_id,) for product_id in existing])
+
+    def prepare(self, catalog: dict, *categories):
+        """Sérialise les catégories données (tout le catalogue si aucune n'est précisée)"""
+        names = list(catalog)
+        if not categories:
+            return True, names, [self._encode_category(catalog, c, p) for p, c in enumerate(names)]
+        return False, names, [
+            self._encode_category(catalog, c, names.index(c) if c in catalog else 0)
+            for c in categories
+        ]
+
+    def write(self, operation) -> None:
+        """Applique une opération retournée par prepare(), en une transaction"""
+        full, names, entries = operation
+        with self._lock, self.conn:
+            for category, entry in entries:
+                self._write_category(category, entry)
+
+            if full:
+                stored = [name for (name,) in self.conn.execute("SELECT name FROM categories")]
+                stored += [key[len('catalog:'):] for (key,) in self.conn.execute("SELECT key FROM settings WHERE key LIKE 'catalog:%'")]
+                for category in set(stored) - set(names):
+                    self._write_category(category, ('deleted',))
+
+            # Une catégorie ajoutée ou supprimée décale les suivantes : positions recalculées pour toutes
+            positions = {name: position for position, name in enumerate(names)}
+            moved = [
+                (positions[name], name)
+                for name, position in self.conn.execute("SELECT name, position FROM categories")
+                if name in positions and positions[name] != position
+            ]
+            if moved:
+                self.conn.executemany("UPDATE categories SET position = ? WHERE name = ?", moved)
+
+    def save(self, catalog: dict) -> None:
+        self.write(self.prepare(catalog))
+
+    def record(self, catalog: dict, *categories) -> None:
+        self.write(self.prepare(catalog, *categories))
+
+    def load_meta(self) -> dict:
+        with self._lock:
+            return self._get_setting('catalog_meta', {})
+
+    def save_meta(self, meta: dict) -> None:
+        with self._lock, self.conn:
+            self._set_setting('catalog_meta', meta)
+
+    def compact(self, catalog: dict) -> None:
+        """Pas de journal à fusionner : SQLite gère son propre WAL"""
+        with self._lock:
+            self.conn.execute("PRAGMA wal_checkpoint(PASSIVE)")
+
+    # Utilisateurs
+
+    def load_users(self) -> dict:
+        with self._lock:
+            return {user_id: json.loads(data) for user_id, data in self.conn.execute("SELECT user_id, data FROM users")}
+
+    def save_users(self, users: dict) -> None:
+        """Écrit les utilisateurs donnés ({user_id: données}), une ligne par utilisateur"""
+        with self._lock, self.conn:
+            self.conn.executemany(
+                "INSERT OR REPLACE INTO users (user_id, data) VALUES (?, ?)",
+                [(str(user_id), _encode(data)) for user_id, data in users.items()]
+            )
+
+    # Codes d'accès
+
+    def access_codes_version(self) -> int:
+        with self._lock:
+            return self._get_setting('access_version', 0)
+
+    def load_access_codes(self) -> dict:
+        with self._lock:
+            codes = [json.loads(data) for (data,) in self.conn.execute("SELECT data FROM access_codes ORDER BY rowid")]
+            data = {
+                "codes": codes,
+                "authorized_users": [user_id for (user_id,) in self.conn.execute("SELECT user_id FROM authorized_users ORDER BY rowid")],
+                "banned_users": [user_id for (user_id,) in self.conn.execute("SELECT user_id FROM banned_users ORDER BY rowid")],
+                "is_enabled": self._get_setting('access_enabled', True)
+            }
+            groups = self._get_setting('access_groups')
+            if groups is not None:
+                data["groups"] = groups
+
+            self._access_state = self._access_snapshot(data)
+            return data
+
+    def _access_snapshot(self, data: dict):
+        return (
+            {c["code"]: _encode(c) for c in data.get("codes", [])},
+            set(data.get("authorized_users", [])),
+            set(data.get("banned_users", [])),
+            data.get("is_enabled", True),
+            _encode(data["groups"]) if "groups" in data else None
+        )
+
+    def save_access_codes(self, data: dict) -> None:
+        """Applique uniquement les différences avec le dernier état connu de la base"""
+        with self._lock:
+            if self._access_state is None:
+                self.load_access_codes()
+            old_codes, old_authorized, old_banned, old_enabled, old_groups = self._access_state
+            codes, authorized, banned, enabled, groups = self._access_snapshot(data)
+
+            with self.conn:
+                changed = [code for code, encoded in codes.items() if old_codes.get(code) != encoded]
+                if changed:
+                    entries = {c["code"]: c for c in data["codes"]}
+                    self.conn.executemany(
+                        "INSERT OR REPLACE INTO access_codes (code, expiration, used, data) VALUES (?, ?, ?, ?)",
+                        [(code, entries[code].get("expiration"), int(bool(entries[code].get("used"))), codes[code])
+                         for code in changed]
+                    )
+                removed = old_codes.keys() - codes.keys()
+                if removed:
+                    self.conn.executemany("DELETE FROM access_codes WHERE code = ?", [(code,) for code in removed])
+
+                for table, old, new in (("authorized_users", old_authorized, authorized), ("banned_users", old_banned, banned)):
+                    if new - old:
+                        self.conn.executemany(f"INSERT OR IGNORE INTO {table} (user_id) VALUES (?)", [(u,) for u in new - old])
+                    if old - new:
+                        self.conn.executemany(f"DELETE FROM {table} WHERE user_id = ?", [(u,) for u in old - new])
+
+                if enabled != old_enabled:
+                    self._set_setting('access_enabled', enabled)
+                if groups != old_groups:
+                    if groups is None:
+                        self.conn.execute("DELETE FROM settings WHERE key = 'access_groups'")
+                    else:
+                        self._set_setting('access_groups', data["groups"])
+                self._set_setting('access_version', self._get_setting('access_version', 0) + 1)
+
+            self._access_state = (codes, authorized, banned, enabled, groups)
+
+    # Diffusions
+
+    def load_broadcasts(self) -> dict:
+        with self._lock:
+            broadcasts = {}
+            for broadcast_id, data in self.conn.execute("SELECT id, data FROM broadcasts ORDER BY rowid"):
+                broadcast = json.loads(data)
+                broadcast['message_ids'] = {}
+                broadcasts[broadcast_id] = broadcast
+            for broadcast_id, user_id, message_id in self.conn.execute(
+                "SELECT broadcast_id, user_id, message_id FROM broadcast_deliveries"
+            ):
+                if broadcast_id in broadcasts:
+                    broadcasts[broadcast_id]['message_ids'][user_id] = message_id
+
+            self._broadcast_state = {
+                broadcast_id: self._broadcast_snapshot(broadcast)
+                for broadcast_id, broadcast in broadcasts.items()
+            }
+            return broadcasts
+
+    def _broadcast_snapshot(self, broadcast: dict):
+        meta = {key: value for key, value in broadcast.items() if key != 'message_ids'}
+        return _encode(meta), dict(broadcast.get('message_ids', {}))
+
+    def save_broadcasts(self, broadcasts: dict) -> None:
+        """Écrit les diffusions modifiées et uniquement les accusés d'envoi nouveaux ou changés"""
+        with self._lock, self.conn:
+            state = {}
+            for broadcast_id, broadcast in broadcasts.items():
+                meta, message_ids = self._broadcast_snapshot(broadcast)
+                old_meta, old_message_ids = self._broadcast_state.get(broadcast_id, (None, {}))
+
+                if meta != old_meta:
+                    self.conn.execute("INSERT OR REPLACE INTO broadcasts (id, data) VALUES (?, ?)", (broadcast_id, meta))
+                changed = [
+                    (broadcast_id, str(user_id), message_id)
+                    for user_id, message_id in message_ids.items()
+                    if old_message_ids.get(user_id) != message_id
+                ]
+                if changed:
+                    self.conn.executemany(
+                        "INSERT OR REPLACE INTO broadcast_deliveries (broadcast_id, user_id, message_id) VALUES (?, ?, ?)",
+                        changed
+                    )
+                removed = old_message_ids.keys() - message_ids.keys()
+                if removed:
+                    self.conn.executemany(
+                        "DELETE FROM broadcast_deliveries WHERE broadcast_id = ? AND user_id = ?",
+                        [(broadcast_id, str(user_id)) for user_id in removed]
+                    )
+                state[broadcast_id] = (meta, message_ids)
+
+            for broadcast_id in self._broadcast_state.keys() - broadcasts.keys():
+                self.conn.execute("DELETE FROM broadcasts WHERE id = ?", (broadcast_id,))
+                self.conn.execute("DELETE FROM broadcast_deliveries WHERE broadcast_id = ?", (broadcast_id,))
+
+            self._broadcast_state = state
+
+
+def _read_json(path: str, default):
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return default
+    except json.JSONDecodeError as e:
+        logger.warning(f"Fichier {path} illisible, ignoré pour la migration : {e}")
+        return default
+
+
+def migrate_from_json(store: SQLiteStore, catalog_file: str, users_file: str = 'data/users.json',
+                      access_codes_file: str = 'data/access_codes.json',
+                      broadcasts_file: str = 'data/broadcasts.json') -> dict:
+    """Importe les fichiers JSON existants dans la base. Retourne le nombre d'éléments importés"""
+    from modules.catalog_store import CatalogStore
+    from modules.product_index import ProductIndex
+
+    # Le journal éventuel du catalogue est rejoué et les produits reçoivent leur identifiant
+    json_store = CatalogStore(catalog_file)
+    meta = json_store.load_meta()
+    catalog = json_store.load()
+    ProductIndex(catalog, meta.get('next_product_id', 1)).assign_ids()
+    store.save(catalog)
+    # Les identifiants des catégories restent ceux des boutons déjà envoyés
+    if meta:
+        store.save_meta(meta)
+
+    users = _read_json(users_file, {})
+    store.save_users(users)
+
+    access_codes = _read_json(access_codes_file, {"codes": [], "authorized_users": []})
+    store._access_state = store._access_snapshot({})
+    store.save_access_codes(access_codes)
+
+    broadcasts = _read_json(broadcasts_file, {})
+    for broadcast in broadcasts.values():
+        broadcast['message_ids'] = {str(user_id): msg_id for user_id, msg_id in broadcast.get('message_ids', {}).items()}
+    store.save_broadcasts(broadcasts)
+
+    return {
+        "categories": sum(1 for products in catalog.values() if isinstance(products, list)),
+        "products": sum(len(products) for products in catalog.values() if isinstance(products, list)),
+        "users": len(users),
+        "codes": len(access_codes.get("codes", [])),
+        "broadcasts": len(broadcasts)
+    }
@@ -0,0 +1,257 @@
+import logging
+import json
+import os
+import asyncio
+from datetime import datetime
+from modules.stats_ranking import SortedTotals, TopK
+
+logger = logging.getLogger(__name__)
+
+
+def empty_stats() -> dict:
+    now = datetime.utcnow()
+    return {
+        "total_views": 0,
+        "category_views": {},
+        "product_views": {},
+        "last_updated": now.strftime("%Y-%m-%d %H:%M:%S"),
+        "last_reset": now.strftime("%Y-%m-%d")
+    }
+
+
+class StatsAggregator:
+    """Agrège les compteurs de vues en mémoire et les écrit périodiquement dans un fichier dédié
+
+    Les incréments sont appliqués immédiatement en mémoire (les lectures sont donc
+    toujours à jour) et persistés toutes les `flush_interval` secondes ou dès que
+    `flush_threshold` vues sont en attente : en cas d'arrêt brutal, au plus une
+    fenêtre de `flush_interval` secondes de vues est perdue.
+
+    Le classement des `top_k` produits les plus vus et les totaux triés des
+    catégories sont mis à jour à chaque vue : l'écran des statistiques les lit tels
+    quels. Les statistiques des produits et catégories supprimés ou renommés sont
+    corrigées au moment de la modification du catalogue (prune, rename_*).
+    """
+
+    def __init__(self, stats_file: str = 'data/stats.json', flush_interval: float = 10.0,
+                 flush_threshold: int = 500, legacy_stats: dict = None, executor=None, top_k: int = 5):
+        self.stats_file = stats_file
+        self.executor = executor
+        self.flush_interval = flush_interval
+        self.flush_threshold = flush_threshold
+        self._pending = 0
+        self._wakeup = None
+        self._flush_task = None
+        self.stats = self._load_stats(legacy_stats)
+        self._top_products = TopK(top_k)
+        self._rebuild_rankings()
+
+    def _product_counts(self):
+        for category, products in self.stats['product_views'].items():
+            for product_name, views in products.items():
+                yield (category, product_name), views
+
+    def _rebuild_rankings(self) -> None:
+        self._category_totals = SortedTotals(self.stats['category_views'])
+        self._top_products.rebuild(self._product_counts())
+
+    def _load_stats(self, legacy_stats: dict = None) -> dict:
+        """Charge les statistiques depuis le fichier, ou reprend celles de l'ancien catalogue"""
+        try:
+            with open(self.stats_file, 'r', encoding='utf-8') as f:
+                stats = json.load(f)
+        except FileNotFoundError:
+            stats = None
+        except json.JSONDecodeError as e:
+            logger.error(f"Erreur de décodage du fichier de statistiques : {e}")
+            stats = None
+
+        if stats is None and legacy_stats:
+            stats = legacy_stats
+            self._pending = 1
+
+        base = empty_stats()
+        if stats:
+            base.update(stats)
+        return base
+
+    def _touch(self, views: int = 1):
+        self.stats['last_updated'] = datetime.utcnow().strftime("%Y-%m-%d %H:%M:%S")
+        self._pending += views
+        if self._wakeup and self._pending >= self.flush_threshold:
+            self._wakeup.set()
+
+    def record_category_view(self, category: str) -> None:
+        """Incrémente les vues d'une catégorie"""
+        category_views = self.stats['category_views']
+        category_views[category] = category_views.get(category, 0) + 1
+        self._category_totals.set(category, category_views[category])
+        self.stats['total_views'] += 1
+        self._touch()
+
+    def record_product_view(self, category: str, product_name: str) -> None:
+        """Incrémente les vues d'un produit"""
+        products = self.stats['product_views'].setdefault(category, {})
+        products[product_name] = products.get(product_name, 0) + 1
+        self._top_products.update((category, product_name), products[product_name])
+        self.stats['total_views'] += 1
+        self._touch()
+
+    def record_listing(self, category: str, product_names) -> None:
+        """Incrémente les vues de tous les produits affichés dans une catégorie"""
+        products = self.stats['product_views'].setdefault(category, {})
+        count = 0
+        for product_name in product_names:
+            products[product_name] = products.get(product_name, 0) + 1
+            self._top_products.update((category, product_name), products[product_name])
+            count += 1
+        if count:
+            self._touch(count)
+
+    def reset(self) -> dict:
+        """Réinitialise toutes les statistiques"""
+        self.stats = empty_stats()
+        self._rebuild_rankings()
+        self._touch()
+        return self.stats
+
+    def mark_dirty(self) -> None:
+        """Signale une modification faite directement sur le dictionnaire de statistiques"""
+        self._touch(0 if self._pending else 1)
+
+    def top_products(self) -> list:
+        """[(catégorie, produit, vues)] des produits les plus vus, du plus vu au moins vu"""
+        return [(category, product_name, views) for (category, product_name), views in self._top_products.items()]
+
+    def top_categories(self, limit: int = None) -> list:
+        """[(catégorie, vues)] triées par vues décroissantes"""
+        return self._category_totals.top(limit)
+
+    @property
+    def category_count(self) -> int:
+        return len(self._category_totals)
+
+    def prune(self, catalog: dict, categories=None) -> int:
+        """Supprime les statistiques des catégories et produits absents du catalogue
+
+        Limité à `categories` si elles sont précisées. Retourne le nombre d'entrées supprimées.
+        """
+        category_views = self.stats['category_views']
+        product_views = self.stats['product_views']
+        if categories is None:
+            categories = set(category_views) | set(product_views)
+
+        removed = 0
+        for category in categories:
+            products = catalog.get(category)
+            if not isinstance(products, list):
+                if category_views.pop(category, None) is not None:
+                    self._category_totals.remove(category)
+                    removed += 1
+                removed += len(product_views.pop(category, None) or ())
+                continue
+
+            views = product_views.get(category)
+            if not views:
+                continue
+            existing = {product['name'] for product in products}
+            for product_name in [name for name in views if name not in existing]:
+                del views[product_name]
+                removed += 1
+            if not views:
+                del product_views[category]
+
+        if removed:
+            logger.info(f"🧹 Statistiques retirées pour {removed} produits ou catégories supprimés")
+            self._top_products.rebuild(self._product_counts())
+            self.mark_dirty()
+        return removed
+
+    def rename_category(self, old_name: str, new_name: str) -> None:
+        """Reporte les statistiques d'une catégorie renommée"""
+        moved = False
+        views = self.stats['category_views'].pop(old_name, None)
+        if views is not None:
+            self.stats['category_views'][new_name] = views
+            self._category_totals.remove(old_name)
+            self._category_totals.set(new_name, views)
+            moved = True
+        products = self.stats['product_views'].pop(old_name, None)
+        if products is not None:
+            self.stats['product_views'][new_name] = products
+            self._top_products.rebuild(self._product_counts())
+            moved = True
+        if moved:
+            self.mark_dirty()
+
+    def rename_product(self, category: str, old_name: str, new_name: str) -> None:
+        """Reporte les vues d'un produit renommé (cumulées si le nouveau nom en avait déjà)"""
+        products = self.stats['product_views'].get(category)
+        if not products or old_name not in products or old_name == new_name:
+            return
+        products[new_name] = products.get(new_name, 0) + products.pop(old_name)
+        self._top_products.rebuild(self._product_counts())
+        self.mark_dirty()
+
+    def _write(self, data: str):
+        """Écrit le fichier de manière atomique (fichier temporaire + renommage)"""
+        tmp_file = f"{self.stats_file}.tmp"
+        with open(tmp_file, 'w', encoding='utf-8') as f:
+            f.write(data)
+        os.replace(tmp_file, self.stats_file)
+
+    def _snapshot(self):
+        if not self._pending:
+            return None
+        self._pending = 0
+        return json.dumps(self.stats, indent=4, ensure_ascii=False)
+
+    def flush_now(self) -> None:
+        """Écrit immédiatement les compteurs en attente"""
+        data = self._snapshot()
+        if data is None:
+            return
+        try:
+            self._write(data)
+        except Exception as e:
+            logger.error(f"Erreur lors de la sauvegarde des statistiques : {e}")
+
+    async def flush(self) -> None:
+        """Écrit les compteurs en attente sans bloquer la boucle d'événements"""
+        data = self._snapshot()
+        if data is None:
+            return
+        try:
+            if self.executor is not None:
+                await self.executor.run(self._write, data)
+            else:
+                await asyncio.to_thread(self._write, data)
+        except Exception as e:
+            logger.error(f"Erreur lors de la sauvegarde des statistiques : {e}")
+
+    async def _flush_loop(self):
+        while True:
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=self.flush_interval)
+            except asyncio.TimeoutError:
+                pass
+            self._wakeup.clear()
+            await self.flush()
+
+    async def start(self) -> None:
+        """Démarre la tâche d'écriture périodique"""
+        if self._flush_task is None:
+            self._wakeup = asyncio.Event()
+            self._flush_task = asyncio.create_task(self._flush_loop())
+
+    async def stop(self) -> None:
+        """Arrête la tâche périodique et écrit les derniers compteurs"""
+        if self._flush_task is not None:
+            self._flush_task.cancel()
+            try:
+                await self._flush_task
+            except asyncio.CancelledError:
+                pass
+            self._flush_task = None
+            self._wakeup = None
+        self.flush_now()
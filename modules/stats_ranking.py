@@ -0,0 +1,102 @@
+import heapq
+from bisect import bisect_left, insort
+
+
+class TopK:
+    """Les `k` plus grands compteurs, tenus à jour à chaque incrément
+
+    Tas min des membres du classement, avec suppression paresseuse : un incrément
+    ajoute une nouvelle entrée au tas et l'ancienne est ignorée quand elle remonte
+    au sommet. Comme les compteurs ne font qu'augmenter, un élément hors du
+    classement n'y entre que s'il dépasse le plus petit membre : O(log k) par vue.
+    Une suppression (produit effacé ou renommé) impose un rebuild().
+    """
+
+    def __init__(self, k: int = 5):
+        self.k = max(1, k)
+        self._members = {}
+        self._heap = []
+
+    def _floor(self):
+        """Entrée valide la plus petite du tas (retire les entrées périmées au passage)"""
+        heap = self._heap
+        while heap:
+            value, key = heap[0]
+            if self._members.get(key) == value:
+                return heap[0]
+            heapq.heappop(heap)
+        return None
+
+    def _compact(self) -> None:
+        if len(self._heap) > 4 * self.k + 64:
+            self._heap = [(value, key) for key, value in self._members.items()]
+            heapq.heapify(self._heap)
+
+    def update(self, key, value) -> None:
+        """Nouvelle valeur (plus grande) du compteur `key`"""
+        members = self._members
+        if key in members:
+            members[key] = value
+            heapq.heappush(self._heap, (value, key))
+            self._compact()
+            return
+
+        if len(members) < self.k:
+            members[key] = value
+            heapq.heappush(self._heap, (value, key))
+            return
+
+        floor = self._floor()
+        if floor is not None and value > floor[0]:
+            heapq.heappop(self._heap)
+            del members[floor[1]]
+            members[key] = value
+            heapq.heappush(self._heap, (value, key))
+
+    def rebuild(self, items) -> None:
+        """Recalcule le classement à partir de tous les couples (clé, valeur) : O(n log k)"""
+        largest = heapq.nlargest(self.k, items, key=lambda item: item[1])
+        self._members = dict(largest)
+        self._heap = [(value, key) for key, value in largest]
+        heapq.heapify(self._heap)
+
+    def items(self) -> list:
+        """[(clé, valeur)] du plus grand au plus petit"""
+        return sorted(self._members.items(), key=lambda item: item[1], reverse=True)
+
+
+class SortedTotals:
+    """Totaux gardés triés par valeur décroissante, lecture des n premiers en O(n)
+
+    Une mise à jour cherche sa place par dichotomie (O(log n) comparaisons) puis insère
+    dans la liste, ce qui déplace O(n) éléments : un simple memmove, rapide pour les
+    quelques centaines de catégories d'un catalogue.
+    """
+
+    def __init__(self, totals: dict = None):
+        self._values = {}
+        self._order = []  # (-valeur, clé), donc du plus grand au plus petit
+        for key, value in (totals or {}).items():
+            self._values[key] = value
+            self._order.append((-value, key))
+        self._order.sort()
+
+    def set(self, key, value) -> None:
+        old = self._values.get(key)
+        if old is not None:
+            del self._order[bisect_left(self._order, (-old, key))]
+        self._values[key] = value
+        insort(self._order, (-value, key))
+
+    def remove(self, key) -> None:
+        old = self._values.pop(key, None)
+        if old is not None:
+            del self._order[bisect_left(self._order, (-old, key))]
+
+    def top(self, limit: int = None) -> list:
+        """[(clé, valeur)] des `limit` plus grands totaux (tous si limit est None)"""
+        entries = self._order if limit is None else self._order[:limit]
+        return [(key, -value) for value, key in entries]
+
+    def __len__(self) -> int:
+        return len(self._values)
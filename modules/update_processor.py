@@ -0,0 +1,59 @@
+import asyncio
+from telegram.ext import BaseUpdateProcessor
+
+
+class PerChatUpdateProcessor(BaseUpdateProcessor):
+    """Traite les updates en parallèle, mais ceux d'une même conversation dans l'ordre d'arrivée
+
+    Au plus `max_concurrent_updates` updates sont traités en même temps. Un verrou par
+    conversation (chat, ou utilisateur à défaut) garantit que l'état des ConversationHandler
+    n'est jamais modifié par deux updates du même chat à la fois. Les verrous sont
+    supprimés dès qu'aucun update du chat n'est en attente.
+
+    Le verrou du chat est pris avant une des `max_concurrent_updates` places : un update
+    qui attend son tour dans un chat occupé ne bloque pas les autres chats.
+    """
+
+    def __init__(self, max_concurrent_updates: int):
+        super().__init__(max_concurrent_updates)
+        self._locks = {}
+
+    @staticmethod
+    def _key(update):
+        chat = getattr(update, 'effective_chat', None)
+        if chat is not None:
+            return chat.id
+        user = getattr(update, 'effective_user', None)
+        return user.id if user is not None else None
+
+    async def process_update(self, update, coroutine) -> None:
+        key = self._key(update)
+        if key is None:
+            await super().process_update(update, coroutine)
+            return
+
+        entry = self._locks.get(key)
+        if entry is None:
+            entry = self._locks[key] = [asyncio.Lock(), 0]
+        entry[1] += 1
+        try:
+            async with entry[0]:
+                # BaseUpdateProcessor.process_update prend la place puis appelle do_process_update
+                await super().process_update(update, coroutine)
+        finally:
+            entry[1] -= 1
+            if entry[1] == 0:
+                del self._locks[key]
+
+    async def do_process_update(self, update, coroutine) -> None:
+        await coroutine
+
+    @property
+    def active_chats(self) -> int:
+        return len(self._locks)
+
+    async def initialize(self) -> None:
+        pass
+
+    async def shutdown(self) -> None:
+        pass
@@ -0,0 +1,89 @@
+_PUBLIC = frozenset()
+
+
+class VisibilityIndex:
+    """Listes ordonnées des produits visibles, par catégorie et par ensemble de groupes d'accès
+
+    Un produit dont le nom commence par "<groupe>_" n'est visible que des membres de ce
+    groupe. Les listes sont calculées une fois par (catégorie, groupes de l'utilisateur),
+    puis réutilisées jusqu'à ce que la catégorie ou les groupes changent.
+    """
+
+    def __init__(self, catalog: dict):
+        self.catalog = catalog
+        self._groups = {}
+        self._source = None
+        self._user_groups = {}
+        self._product_groups = {}
+        self._lists = {}
+
+    def set_groups(self, groups: dict) -> bool:
+        """Met à jour les groupes d'accès. Retourne True si l'index a dû être reconstruit"""
+        if groups is self._source:
+            return False
+        if groups == self._groups:
+            self._source = groups
+            return False
+
+        self._source = groups
+        self._groups = {name: list(members) for name, members in groups.items()}
+        self._user_groups = {}
+        for name, members in groups.items():
+            for user_id in members:
+                self._user_groups[user_id] = self._user_groups.get(user_id, _PUBLIC) | {name}
+        self._product_groups.clear()
+        self._lists.clear()
+        return True
+
+    def invalidate(self, *categories) -> None:
+        """Oublie les listes des catégories données (toutes si aucune n'est précisée)"""
+        if not categories:
+            self._product_groups.clear()
+            self._lists.clear()
+            return
+        for category in categories:
+            self._product_groups.pop(category, None)
+        self._lists = {key: value for key, value in self._lists.items() if key[0] not in categories}
+
+    def _group_of(self, product_name: str):
+        for name in self._groups:
+            if product_name.startswith(f"{name}_"):
+                return name
+        return None
+
+    def _tagged_products(self, category):
+        """[(id, groupe ou None)] dans l'ordre du catalogue"""
+        tagged = self._product_groups.get(category)
+        if tagged is None:
+            tagged = [
+                (product['id'], self._group_of(product['name']))
+                for product in self.catalog.get(category, [])
+                if isinstance(product, dict) and 'id' in product
+            ]
+            self._product_groups[category] = tagged
+        return tagged
+
+    def visible(self, category, user_id=None):
+        """Retourne (ids visibles, {id: position}) pour cet utilisateur"""
+        user_groups = self._user_groups.get(user_id, _PUBLIC)
+        key = (category, user_groups)
+        entry = self._lists.get(key)
+        if entry is None:
+            ids = [
+                product_id for product_id, group in self._tagged_products(category)
+                if group is None or group in user_groups
+            ]
+            entry = (ids, {product_id: position for position, product_id in enumerate(ids)})
+            self._lists[key] = entry
+        return entry
+
+    def siblings(self, category, product_id, user_id=None):
+        """Retourne les ids (précédent, suivant) visibles autour d'un produit"""
+        ids, positions = self.visible(category, user_id)
+        position = positions.get(product_id)
+        if position is None:
+            # Produit masqué pour cet utilisateur : seul le premier produit visible est proposé
+            return None, ids[0] if ids else None
+        prev_id = ids[position - 1] if position > 0 else None
+        next_id = ids[position + 1] if position < len(ids) - 1 else None
+        return prev_id, next_id
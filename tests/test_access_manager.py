@@ -0,0 +1,130 @@
+import asyncio
+import json
+import os
+from datetime import datetime, timedelta
+
+import pytest
+
+from modules.access_manager import AccessManager
+
+ACCESS_FILE = os.path.join("data", "access_codes.json")
+
+
+def _read():
+    with open(ACCESS_FILE) as f:
+        return json.load(f)
+
+
+def _write(data):
+    with open(ACCESS_FILE, "w") as f:
+        json.dump(data, f, indent=4)
+
+
+@pytest.fixture
+def workdir(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    return tmp_path
+
+
+def test_file_changes_are_picked_up_after_the_check_interval(workdir):
+    async def scenario():
+        manager = AccessManager(check_interval=0)
+        assert not await manager.is_authorized(7)
+        data = _read()
+        data["authorized_users"].append(7)
+        _write(data)
+        return await manager.is_authorized(7)
+
+    assert asyncio.run(scenario())
+
+
+def test_reads_use_the_cache_within_the_check_interval(workdir):
+    async def scenario():
+        manager = AccessManager(check_interval=60)
+        await manager.is_authorized(7)
+        data = _read()
+        data["authorized_users"].append(7)
+        _write(data)
+        return await manager.is_authorized(7)
+
+    assert not asyncio.run(scenario())
+
+
+def test_writes_reload_changes_made_by_others(workdir):
+    async def scenario():
+        manager = AccessManager(check_interval=60)
+        await manager.is_authorized(1)
+        # Bannissement écrit par AdminFeatures pendant l'intervalle de vérification
+        data = _read()
+        data["banned_users"] = [42]
+        data["authorized_users"].append(5)
+        _write(data)
+
+        code, _ = await manager.generate_code(1)
+        return code
+
+    code = asyncio.run(scenario())
+    data = _read()
+    assert data["banned_users"] == [42]
+    assert data["authorized_users"] == [5]
+    assert [c["code"] for c in data["codes"]] == [code]
+
+
+def test_verify_code_results(workdir):
+    async def scenario():
+        manager = AccessManager(check_interval=0)
+        code, _ = await manager.generate_code(1)
+        data = _read()
+        data["codes"].append({
+            "code": "EXPIRED1",
+            "expiration": (datetime.now() - timedelta(hours=1)).isoformat(),
+            "created_by": 1,
+            "used": False
+        })
+        _write(data)
+        return [
+            await manager.verify_code("NOPE0000", 10),
+            await manager.verify_code("EXPIRED1", 10),
+            await manager.verify_code(code, 10),
+            await manager.verify_code(code, 10),
+            await manager.verify_code(code, 11),
+            await manager.is_authorized(10),
+        ]
+
+    assert asyncio.run(scenario()) == [
+        (False, "invalid"),
+        (False, "expired"),
+        (True, "success"),
+        (True, "already_authorized"),
+        (False, "invalid"),
+        True,
+    ]
+    assert _read()["authorized_users"] == [10]
+
+
+def test_disabled_system_authorizes_everyone(workdir):
+    async def scenario():
+        manager = AccessManager()
+        assert await manager.toggle_access_code() is False
+        return await manager.is_authorized(99), await manager.verify_code("ANY", 99)
+
+    assert asyncio.run(scenario()) == (True, (True, "success"))
+    assert _read()["authorized_users"] == [99]
+
+
+def test_failed_write_does_not_leave_the_cache_ahead_of_the_file(workdir):
+    async def scenario():
+        manager = AccessManager(check_interval=60)
+        assert await manager.list_active_codes() == []
+
+        def broken_write(data):
+            raise OSError("disque plein")
+
+        manager._write_file = broken_write
+        with pytest.raises(OSError):
+            await manager.generate_code(1)
+        del manager._write_file
+        return await manager.list_active_codes()
+
+    assert asyncio.run(scenario()) == []
+    assert _read()["codes"] == []
@@ -0,0 +1,53 @@
+from modules import bounded_store
+from modules.bounded_store import BoundedStore
+
+
+class _Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_least_recently_used_entry_is_evicted(monkeypatch):
+    monkeypatch.setattr(bounded_store.time, "monotonic", _Clock())
+    evicted = []
+    store = BoundedStore(max_entries=2, ttl=60, on_evict=lambda key, value: evicted.append((key, value)))
+    store["a"] = 1
+    store["b"] = 2
+    assert store.get("a") == 1
+    store["c"] = 3
+
+    assert evicted == [("b", 2)]
+    assert len(store) == 2
+    assert "a" in store and "c" in store and "b" not in store
+    assert store.stats()["evicted"] == 1
+
+
+def test_idle_entries_expire(monkeypatch):
+    clock = _Clock()
+    monkeypatch.setattr(bounded_store.time, "monotonic", clock)
+    evicted = []
+    store = BoundedStore(max_entries=10, ttl=60, on_evict=lambda key, value: evicted.append(key))
+    store["a"] = 1
+    store["b"] = 2
+    clock.now += 30
+    assert store.get("b") == 2  # l'accès repousse l'expiration de b
+    clock.now += 45
+
+    assert store.get("a") is None
+    store["c"] = 3
+    assert evicted == ["a"]
+    assert len(store) == 2
+    assert store.stats()["expired"] == 1
+    assert store.stats()["misses"] == 1
+
+
+def test_pop_does_not_call_on_evict():
+    evicted = []
+    store = BoundedStore(max_entries=2, on_evict=lambda key, value: evicted.append(key))
+    store["a"] = 1
+    assert store.pop("a") == 1
+    assert store.pop("a", "absent") == "absent"
+    assert evicted == []
@@ -0,0 +1,95 @@
+import asyncio
+import time
+from types import SimpleNamespace
+
+import pytest
+
+pytest.importorskip("telegram")
+
+from telegram.error import BadRequest, RetryAfter
+
+from broadcast.engine import BroadcastEngine, TokenBucket
+
+
+class _FakeSend:
+    """send(chat_id) : lève les erreurs prévues pour un chat, sinon renvoie un message"""
+
+    def __init__(self, errors: dict = None, delay: float = 0.0):
+        self.errors = {chat_id: list(items) for chat_id, items in (errors or {}).items()}
+        self.delay = delay
+        self.calls = []
+
+    async def __call__(self, chat_id):
+        self.calls.append((chat_id, time.monotonic()))
+        if self.delay:
+            await asyncio.sleep(self.delay)
+        pending = self.errors.get(chat_id)
+        if pending:
+            raise pending.pop(0)
+        return SimpleNamespace(message_id=1000 + chat_id)
+
+
+def test_token_bucket_limits_the_rate():
+    async def scenario():
+        bucket = TokenBucket(rate=100, capacity=10)
+        started = time.monotonic()
+        for _ in range(30):
+            await bucket.acquire()
+        return time.monotonic() - started
+
+    # 10 jetons de rafale puis 20 au rythme de 100 par seconde
+    assert asyncio.run(scenario()) >= 0.18
+
+
+def test_all_recipients_are_delivered():
+    send = _FakeSend()
+    result = asyncio.run(BroadcastEngine(rate=1000, concurrency=4).run(range(10), send))
+    assert (result.total, result.success, result.failed) == (10, 10, 0)
+    assert result.message_ids == {str(chat_id): 1000 + chat_id for chat_id in range(10)}
+
+
+def test_retry_after_only_delays_that_chat():
+    send = _FakeSend({0: [RetryAfter(0.3)]})
+    engine = BroadcastEngine(rate=1000, concurrency=4)
+
+    async def scenario():
+        started = time.monotonic()
+        result = await engine.run(range(20), send)
+        return result, started
+
+    result, started = asyncio.run(scenario())
+    assert result.success == 20
+    others = [at - started for chat_id, at in send.calls if chat_id != 0]
+    assert max(others) < 0.2
+    assert [chat_id for chat_id, _ in send.calls].count(0) == 2
+
+
+def test_recipient_is_abandoned_after_max_retries():
+    send = _FakeSend({1: [RetryAfter(0)] * 10})
+    result = asyncio.run(BroadcastEngine(rate=1000, max_retries=2).run([1, 2], send))
+    assert (result.success, result.failed) == (1, 1)
+    assert [chat_id for chat_id, _ in send.calls].count(1) == 3
+    assert "1" not in result.message_ids
+
+
+def test_other_errors_are_not_retried():
+    send = _FakeSend({1: [BadRequest("Chat not found")]})
+    result = asyncio.run(BroadcastEngine(rate=1000).run([1, 2], send))
+    assert (result.success, result.failed) == (1, 1)
+    assert [chat_id for chat_id, _ in send.calls].count(1) == 1
+
+
+def test_progress_is_reported_without_repeating_text():
+    edits = []
+
+    class _Message:
+        async def edit_text(self, text, parse_mode=None):
+            edits.append(text)
+
+    engine = BroadcastEngine(rate=1000, concurrency=1, progress_interval=0.01)
+    result = asyncio.run(engine.run(range(10), _FakeSend(delay=0.01), _Message(), lambda r: f"{r.done}/{r.total}"))
+
+    assert result.success == 10
+    assert edits
+    assert all(a != b for a, b in zip(edits, edits[1:]))
+    assert all(text.endswith("/10") for text in edits)
@@ -0,0 +1,45 @@
+import pytest
+
+from modules import callback_codec
+from modules.callback_codec import ENCODED_LENGTH, MARKER, Payload, decode, encode
+
+
+@pytest.mark.parametrize("route, obj_id, page, media", [
+    (0, 0, 0, 0),
+    (1, 1, 0, 0),
+    (12, 4294967295, 65535, 65535),
+    (255, 123456, 7, 3),
+])
+def test_round_trip(route, obj_id, page, media):
+    data = encode(route, obj_id, page, media)
+    assert len(data) == ENCODED_LENGTH
+    assert len(data.encode()) <= 64
+    assert data.startswith(MARKER)
+    assert decode(data) == Payload(route, obj_id, page, media)
+
+
+def test_out_of_range_values_are_rejected():
+    with pytest.raises(ValueError):
+        encode(256, 1)
+    with pytest.raises(ValueError):
+        encode(1, 2 ** 32)
+    with pytest.raises(ValueError):
+        encode(1, 1, page=-1)
+
+
+@pytest.mark.parametrize("data", [
+    "",
+    "product_1234",
+    MARKER,
+    MARKER + "!" * (ENCODED_LENGTH - 1),
+    encode(1, 2) + "A",
+    "x" + encode(1, 2)[1:],
+])
+def test_invalid_data_decodes_to_none(data):
+    assert decode(data) is None
+
+
+def test_other_version_decodes_to_none(monkeypatch):
+    data = encode(3, 42)
+    monkeypatch.setattr(callback_codec, "VERSION", callback_codec.VERSION + 1)
+    assert decode(data) is None
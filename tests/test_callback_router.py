@@ -0,0 +1,55 @@
+import pytest
+
+from modules.callback_router import CallbackRouter
+
+
+def _router():
+    router = CallbackRouter()
+
+    @router.exact("admin", "show_categories")
+    def menu():
+        pass
+
+    @router.prefix("view_")
+    def view():
+        pass
+
+    @router.prefix("view_all_")
+    def view_all():
+        pass
+
+    return router, menu, view, view_all
+
+
+def test_exact_routes():
+    router, menu, _, _ = _router()
+    assert router.resolve("admin") is menu
+    assert router.resolve("show_categories") is menu
+    assert router.resolve("admi") is None
+
+
+def test_longest_prefix_wins():
+    router, _, view, view_all = _router()
+    assert router.resolve("view_Fleurs") is view
+    assert router.resolve("view_all_2") is view_all
+    assert router.resolve("view_") is view
+    assert router.resolve("vie") is None
+
+
+def test_exact_route_takes_precedence_over_prefix():
+    router, _, view, _ = _router()
+
+    @router.exact("view_special")
+    def special():
+        pass
+
+    assert router.resolve("view_special") is special
+    assert router.resolve("view_specials") is view
+
+
+def test_duplicate_routes_are_rejected():
+    router, _, _, _ = _router()
+    with pytest.raises(ValueError):
+        router.add_exact("admin", lambda: None)
+    with pytest.raises(ValueError):
+        router.add_prefix("view_", lambda: None)
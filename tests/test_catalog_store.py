@@ -0,0 +1,89 @@
+import json
+import os
+
+from modules.catalog_store import CatalogStore
+
+
+def _catalog():
+    return {
+        "Fleurs": [{"id": 1, "name": "Rose"}],
+        "Fruits": [{"id": 2, "name": "Pomme"}],
+    }
+
+
+def test_journal_is_replayed_and_compacted_on_load(tmp_path):
+    path = str(tmp_path / "catalog.json")
+    store = CatalogStore(path)
+    catalog = _catalog()
+    store.save(catalog)
+
+    catalog["Fleurs"].append({"id": 3, "name": "Iris"})
+    store.record(catalog, "Fleurs")
+    del catalog["Fruits"]
+    store.record(catalog, "Fruits")
+    catalog["Légumes"] = []
+    store.record(catalog, "Légumes")
+    assert os.path.exists(store.journal_path)
+
+    reloaded = CatalogStore(path)
+    assert reloaded.load() == catalog
+    assert not os.path.exists(reloaded.journal_path)
+    with open(path, encoding="utf-8") as f:
+        assert json.load(f) == catalog
+
+
+def test_truncated_journal_line_is_ignored(tmp_path):
+    path = str(tmp_path / "catalog.json")
+    store = CatalogStore(path)
+    catalog = _catalog()
+    store.save(catalog)
+
+    catalog["Fleurs"] = []
+    store.record(catalog, "Fleurs")
+    # Arrêt brutal pendant l'écriture de l'entrée suivante
+    with open(store.journal_path, "a", encoding="utf-8") as f:
+        f.write('{"op":"del","categ')
+
+    expected = _catalog()
+    expected["Fleurs"] = []
+    assert CatalogStore(path).load() == expected
+
+
+def test_journal_is_compacted_after_compact_every_entries(tmp_path):
+    path = str(tmp_path / "catalog.json")
+    store = CatalogStore(path, compact_every=3)
+    # Catalogue bien plus gros que chaque entrée : seul le nombre d'entrées déclenche la compaction
+    catalog = {f"Catégorie {c}": [{"id": c, "name": f"Produit {c}", "description": "x" * 200}] for c in range(20)}
+    store.save(catalog)
+
+    for c in range(2):
+        catalog[f"Catégorie {c}"][0]["name"] = f"Renommé {c}"
+        store.record(catalog, f"Catégorie {c}")
+    assert os.path.exists(store.journal_path)
+
+    catalog["Catégorie 2"][0]["name"] = "Renommé 2"
+    store.record(catalog, "Catégorie 2")
+    assert not os.path.exists(store.journal_path)
+    assert CatalogStore(path).load() == catalog
+
+
+def test_compact_merges_pending_journal(tmp_path):
+    path = str(tmp_path / "catalog.json")
+    store = CatalogStore(path)
+    catalog = _catalog()
+    store.save(catalog)
+    catalog["Fruits"].append({"id": 4, "name": "Poire"})
+    store.record(catalog, "Fruits")
+
+    store.compact(catalog)
+    assert not os.path.exists(store.journal_path)
+    with open(path, encoding="utf-8") as f:
+        assert json.load(f) == catalog
+
+
+def test_meta_round_trip(tmp_path):
+    store = CatalogStore(str(tmp_path / "catalog.json"))
+    assert store.load_meta() == {}
+    meta = {"next_product_id": 5, "next_category_id": 3, "category_ids": {"Fleurs": 1, "Fruits": 2}}
+    store.save_meta(meta)
+    assert store.load_meta() == meta
@@ -0,0 +1,99 @@
+import asyncio
+
+import pytest
+
+pytest.importorskip("telegram")
+
+from telegram.error import BadRequest, NetworkError
+
+from modules.media_health import MediaHealth, is_file_id_error
+
+
+def _media(*file_ids):
+    return [{'media_id': file_id, 'media_type': 'photo', 'order_index': i} for i, file_id in enumerate(file_ids)]
+
+
+class _Bot:
+    """getFile qui lève l'erreur associée au file_id, ou réussit"""
+
+    def __init__(self, errors: dict):
+        self.errors = errors
+        self.calls = []
+
+    async def get_file(self, file_id):
+        self.calls.append(file_id)
+        error = self.errors.get(file_id)
+        if error is not None:
+            raise error
+
+
+def test_bad_media_are_skipped_until_marked_ok():
+    health = MediaHealth()
+    media = _media("a", "b", "c")
+    assert health.usable(media) == media
+
+    health.mark_bad("b")
+    health.mark_bad("b")
+    assert [m['media_id'] for m in health.usable(media)] == ["a", "c"]
+    assert health.is_bad("b")
+    assert health.stats()["bad"] == 1
+
+    health.mark_ok("b")
+    assert health.usable(media) == media
+    assert health.stats() == {"known": 1, "bad": 0, "queued": 0}
+
+
+@pytest.mark.parametrize("message, expected", [
+    ("Wrong file identifier/http url specified", True),
+    ("Wrong remote file identifier specified: wrong padding in the string", True),
+    ("Bad Request: invalid file_id", True),
+    ("Can't parse entities: unsupported start tag \"b\" at byte offset 3", False),
+    ("Message caption is too long", False),
+    ("Chat not found", False),
+])
+def test_bad_request_classification(message, expected):
+    assert is_file_id_error(BadRequest(message)) is expected
+
+
+def test_non_bad_request_errors_are_not_file_id_errors():
+    assert not is_file_id_error(NetworkError("wrong file identifier"))
+    assert not is_file_id_error(ValueError("wrong file identifier"))
+
+
+def test_check_marks_only_file_id_errors():
+    health = MediaHealth()
+    health._bot = _Bot({
+        "gone": BadRequest("Wrong file identifier/http url specified"),
+        "big": BadRequest("File is too big"),
+        "other": BadRequest("Something unrelated"),
+        "network": NetworkError("connection reset"),
+    })
+
+    async def scenario():
+        for file_id in ("ok", "gone", "big", "other", "network"):
+            await health._check(file_id)
+
+    asyncio.run(scenario())
+    assert health.is_bad("gone")
+    assert not health.is_bad("ok") and not health.is_bad("big")
+    assert "other" not in health._state and "network" not in health._state
+    assert health.stats()["bad"] == 1
+
+
+def test_validation_loop_survives_unexpected_errors():
+    health = MediaHealth(validation_delay=0)
+    bot = _Bot({"boom": RuntimeError("inattendu")})
+
+    async def scenario():
+        await health.start(bot, lambda: ["boom", "ok"])
+        for _ in range(100):
+            if "ok" in health._state:
+                break
+            await asyncio.sleep(0.01)
+        running = not health._task.done()
+        await health.stop()
+        return running
+
+    assert asyncio.run(scenario())
+    assert bot.calls[:2] == ["boom", "ok"]
+    assert health._state == {"ok": MediaHealth.OK}
@@ -0,0 +1,90 @@
+import pytest
+
+pytest.importorskip("telegram")
+
+from telegram import InlineKeyboardButton
+
+from modules.pagination import PAGE_INDICATOR, PagedMenu
+
+FOOTER = [InlineKeyboardButton("🔙 Retour", callback_data="back")]
+
+
+def _menu(catalog, page_size=3):
+    reads = []
+
+    def items(key):
+        reads.append(key)
+        return catalog.get(key, [])
+
+    menu = PagedMenu(
+        items,
+        lambda key, item: InlineKeyboardButton(item, callback_data=f"item_{item}"),
+        lambda key, page: f"page_{key}_{page}",
+        footer=[FOOTER],
+        page_size=page_size
+    )
+    return menu, reads
+
+
+def _data(markup):
+    return [[button.callback_data for button in row] for row in markup.inline_keyboard]
+
+
+def test_pages_and_navigation():
+    menu, _ = _menu({"fruits": [f"p{i}" for i in range(7)]})
+
+    markup, page, total = menu.render("fruits", 0)
+    assert (page, total) == (0, 3)
+    assert _data(markup) == [["item_p0"], ["item_p1"], ["item_p2"], [PAGE_INDICATOR, "page_fruits_1"], ["back"]]
+
+    markup, page, _ = menu.render("fruits", 1)
+    assert _data(markup)[-2] == ["page_fruits_0", PAGE_INDICATOR, "page_fruits_2"]
+    assert markup.inline_keyboard[-2][1].text == "2/3"
+
+    markup, page, _ = menu.render("fruits", 2)
+    assert _data(markup) == [["item_p6"], ["page_fruits_1", PAGE_INDICATOR], ["back"]]
+    assert menu.page_of(6) == 2
+
+
+def test_out_of_range_pages_are_clamped():
+    menu, _ = _menu({"fruits": [f"p{i}" for i in range(7)]})
+    assert menu.render("fruits", 9)[1:] == (2, 3)
+    assert menu.render("fruits", -4)[1:] == (0, 3)
+
+
+def test_single_page_has_no_navigation():
+    menu, _ = _menu({"fruits": ["p0", "p1", "p2"]})
+    markup, page, total = menu.render("fruits", 0)
+    assert (page, total) == (0, 1)
+    assert _data(markup) == [["item_p0"], ["item_p1"], ["item_p2"], ["back"]]
+
+
+def test_empty_category_keeps_footer():
+    menu, _ = _menu({"vide": []})
+    markup, page, total = menu.render("vide", 3)
+    assert (page, total) == (0, 1)
+    assert _data(markup) == [["back"]]
+
+
+def test_pages_are_cached_until_invalidated():
+    catalog = {"fruits": ["p0", "p1"], "legumes": ["l0"]}
+    menu, reads = _menu(catalog)
+
+    first = menu.render("fruits", 0)
+    assert menu.render("fruits", 0) is first
+    menu.render("legumes", 0)
+    assert reads == ["fruits", "legumes"]
+
+    # Le catalogue change : la page reste celle du cache tant que le menu n'est pas invalidé
+    catalog["fruits"].append("p2")
+    assert menu.render("fruits", 0) is first
+
+    menu.invalidate("fruits")
+    markup, _, _ = menu.render("fruits", 0)
+    assert _data(markup) == [["item_p0"], ["item_p1"], ["item_p2"], ["back"]]
+    assert menu.render("legumes", 0)[0] is not None
+    assert reads == ["fruits", "legumes", "fruits"]
+
+    menu.invalidate()
+    menu.render("legumes", 0)
+    assert reads[-1] == "legumes" and len(reads) == 4
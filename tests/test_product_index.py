@@ -0,0 +1,88 @@
+from modules.catalog_store import CatalogStore
+from modules.product_index import CategoryIndex, ProductIndex
+
+
+def _reload(store):
+    """Même séquence que le chargement de main.py"""
+    catalog = store.load()
+    meta = store.load_meta()
+    products = ProductIndex(catalog, meta.get('next_product_id', 1))
+    categories = CategoryIndex(catalog, meta.get('category_ids'), meta.get('next_category_id', 1))
+    products.assign_ids()
+    categories.assign_ids()
+    products.rebuild()
+    return catalog, products, categories
+
+
+def _save(store, catalog, products, categories):
+    products.assign_ids()
+    categories.assign_ids()
+    store.save(catalog)
+    store.save_meta({
+        "next_product_id": products.next_id,
+        "next_category_id": categories.next_id,
+        "category_ids": categories.to_dict(),
+    })
+
+
+def test_ids_survive_a_reload(tmp_path):
+    store = CatalogStore(str(tmp_path / "catalog.json"))
+    store.save({"Fleurs": [{"name": "Rose"}, {"name": "Iris"}], "Fruits": [{"name": "Pomme"}]})
+
+    catalog, products, categories = _reload(store)
+    ids = {product['name']: product['id'] for product in products.products()}
+    assert sorted(ids.values()) == [1, 2, 3]
+    category_ids = categories.to_dict()
+    _save(store, catalog, products, categories)
+
+    catalog, products, categories = _reload(store)
+    assert {product['name']: product['id'] for product in products.products()} == ids
+    assert categories.to_dict() == category_ids
+    assert products.get(ids["Iris"]) == ("Fleurs", 1, catalog["Fleurs"][1])
+    assert products.category_ids("Fleurs") == [ids["Rose"], ids["Iris"]]
+
+
+def test_deleted_ids_are_not_reused_after_a_reload(tmp_path):
+    store = CatalogStore(str(tmp_path / "catalog.json"))
+    store.save({"Fleurs": [{"name": "Rose"}, {"name": "Iris"}], "Fruits": [{"name": "Pomme"}]})
+    catalog, products, categories = _reload(store)
+
+    # Suppression du produit et de la catégorie portant les plus grands identifiants
+    deleted_product = catalog["Fruits"][0]['id']
+    deleted_category = categories.id_of("Fruits")
+    del catalog["Fruits"]
+    products.rebuild("Fruits")
+    assert deleted_product not in products
+    _save(store, catalog, products, categories)
+
+    catalog, products, categories = _reload(store)
+    assert products.next_id == deleted_product + 1
+    assert categories.next_id == deleted_category + 1
+
+    catalog["Fruits"] = [{"name": "Poire"}]
+    products.assign_ids()
+    categories.assign_ids()
+    assert catalog["Fruits"][0]['id'] == deleted_product + 1
+    assert categories.id_of("Fruits") == deleted_category + 1
+    assert categories.name_of(deleted_category) is None
+
+
+def test_renamed_category_keeps_its_id():
+    catalog = {"Fleurs": []}
+    categories = CategoryIndex(catalog)
+    categories.assign_ids()
+    category_id = categories.id_of("Fleurs")
+
+    catalog["Plantes"] = catalog.pop("Fleurs")
+    categories.rename("Fleurs", "Plantes")
+    assert not categories.assign_ids()
+    assert categories.name_of(category_id) == "Plantes"
+
+
+def test_lookup_rejects_invalid_ids():
+    products = ProductIndex({"Fleurs": [{"id": 4, "name": "Rose"}]})
+    products.rebuild()
+    assert products.get_product("4")['name'] == "Rose"
+    assert products.get("abc") is None
+    assert products.get(None) is None
+    assert 5 not in products
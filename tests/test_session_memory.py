@@ -0,0 +1,76 @@
+import asyncio
+import importlib
+
+import pytest
+
+pytest.importorskip("telegram")
+
+from bench.harness import TimedUpdateProcessor, write_workdir
+from bench.workloads import media_swipe
+from tools.fake_telegram import FakeBotAPI
+
+MAX_SESSIONS = 20
+CONCURRENCY = 8
+
+
+def _module_state(bot) -> dict:
+    return {
+        name: len(value) for name, value in vars(bot).items()
+        if isinstance(value, (dict, list, set)) and not name.startswith('__')
+    }
+
+
+def test_session_memory_stays_bounded_after_product_views(tmp_path, monkeypatch):
+    async def scenario():
+        api = FakeBotAPI('127.0.0.1', 0)
+        await api.start()
+        try:
+            user_ids = write_workdir(
+                str(tmp_path), api.base_url, users=60, categories=3, products=4, media=3,
+                config_overrides={"session_max_entries": MAX_SESSIONS, "log_file": str(tmp_path / "bot.log")}
+            )
+            monkeypatch.chdir(tmp_path)
+            bot = importlib.import_module('main')
+
+            processor = TimedUpdateProcessor(CONCURRENCY)
+            application = bot.build_application(update_processor=processor)
+            await application.initialize()
+            await application.post_init(application)
+            await application.start()
+            await application.updater.start_polling(poll_interval=0.0, timeout=1)
+
+            async def replay(updates):
+                processor.expect(len(updates))
+                for update in updates:
+                    api.push_update(update)
+                await processor.wait(60)
+
+            samples = []
+            try:
+                for seed in range(3):
+                    workload = media_swipe(bot, user_ids, 400, seed)
+                    await replay(workload.warmup + workload.updates)
+                    samples.append((
+                        len(application.user_data),
+                        frozenset(key for data in application.user_data.values() for key in data),
+                        len(bot.active_sessions),
+                        _module_state(bot)
+                    ))
+            finally:
+                # Arrêt complet même en cas d'échec : le thread d'E/S empêcherait pytest de se terminer
+                await application.updater.stop()
+                await application.stop()
+                await application.shutdown()
+                await application.post_shutdown(application)
+            return samples
+        finally:
+            await api.stop()
+
+    samples = asyncio.run(scenario())
+    for users, _, sessions, _ in samples:
+        # Les updates en cours d'un utilisateur évincé peuvent recréer sa session jusqu'au suivant
+        assert users <= MAX_SESSIONS + CONCURRENCY
+        assert sessions <= MAX_SESSIONS
+    # Après le premier passage, ni les clés de session ni l'état du module ne grandissent
+    assert samples[2][1] <= samples[1][1]
+    assert samples[2][3] == samples[1][3]
@@ -0,0 +1,21 @@
+from modules.sqlite_store import SQLiteStore
+
+
+def test_partial_writes_keep_category_order(tmp_path):
+    store = SQLiteStore(str(tmp_path / "bot.db"))
+    catalog = {"A": [{"id": 1, "name": "a"}], "B": [{"id": 2, "name": "b"}], "C": []}
+    store.save(catalog)
+
+    del catalog["A"]
+    store.record(catalog, "A")
+    catalog["D"] = [{"id": 3, "name": "d"}]
+    store.record(catalog, "D")
+    assert list(store.load()) == ["B", "C", "D"]
+
+    positions = [position for (position,) in store.conn.execute("SELECT position FROM categories")]
+    assert len(set(positions)) == len(positions)
+
+    reordered = {"D": catalog["D"], "B": catalog["B"], "C": catalog["C"]}
+    store.record(reordered, "D")
+    assert store.load() == reordered
+    store.close()
@@ -0,0 +1,57 @@
+import random
+
+from modules.stats_ranking import SortedTotals, TopK
+
+
+def _expected_top(counts: dict, k: int) -> list:
+    return sorted(counts.values(), reverse=True)[:k]
+
+
+def test_topk_follows_increments():
+    rng = random.Random(0)
+    top = TopK(5)
+    counts = {}
+    for _ in range(5000):
+        key = f"p{int(rng.paretovariate(1.2)) % 200}"
+        counts[key] = counts.get(key, 0) + 1
+        top.update(key, counts[key])
+        assert len(top.items()) == min(5, len(counts))
+
+    items = top.items()
+    assert [value for _, value in items] == _expected_top(counts, 5)
+    assert all(counts[key] == value for key, value in items)
+
+
+def test_topk_rebuild_after_removal():
+    counts = {f"p{i}": i for i in range(1, 21)}
+    top = TopK(3)
+    for key, value in counts.items():
+        top.update(key, value)
+    assert [key for key, _ in top.items()] == ["p20", "p19", "p18"]
+
+    del counts["p20"]
+    top.rebuild(counts.items())
+    assert [key for key, _ in top.items()] == ["p19", "p18", "p17"]
+
+
+def test_topk_heap_stays_bounded():
+    top = TopK(2)
+    for value in range(1, 10000):
+        top.update("a", value)
+        top.update("b", value)
+    assert len(top._heap) <= 4 * top.k + 64
+    assert dict(top.items()) == {"a": 9999, "b": 9999}
+
+
+def test_sorted_totals():
+    totals = SortedTotals({"a": 3, "b": 1, "c": 2})
+    assert totals.top() == [("a", 3), ("c", 2), ("b", 1)]
+
+    totals.set("b", 5)
+    totals.set("d", 4)
+    assert totals.top(2) == [("b", 5), ("d", 4)]
+
+    totals.remove("b")
+    totals.remove("absent")
+    assert totals.top() == [("d", 4), ("a", 3), ("c", 2)]
+    assert len(totals) == 3
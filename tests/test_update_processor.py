@@ -0,0 +1,83 @@
+import asyncio
+import time
+from types import SimpleNamespace
+
+import pytest
+
+pytest.importorskip("telegram")
+
+from modules.update_processor import PerChatUpdateProcessor
+
+
+def _update(chat_id):
+    return SimpleNamespace(effective_chat=SimpleNamespace(id=chat_id), effective_user=None)
+
+
+async def _handle(log, name, duration):
+    await asyncio.sleep(duration)
+    log.append(name)
+
+
+def test_updates_of_one_chat_keep_their_order():
+    async def scenario():
+        processor = PerChatUpdateProcessor(4)
+        log = []
+        # Les premiers updates sont les plus lents : sans verrou, l'ordre serait inversé
+        await asyncio.gather(*(
+            processor.process_update(_update(1), _handle(log, i, 0.01 * (5 - i))) for i in range(5)
+        ))
+        return log, processor.active_chats
+
+    log, active_chats = asyncio.run(scenario())
+    assert log == [0, 1, 2, 3, 4]
+    assert active_chats == 0
+
+
+def test_busy_chat_does_not_block_other_chats():
+    async def scenario():
+        processor = PerChatUpdateProcessor(4)
+        log = []
+        busy = [
+            asyncio.create_task(processor.process_update(_update(1), _handle(log, f"a{i}", 0.2)))
+            for i in range(6)
+        ]
+        await asyncio.sleep(0)
+        started = time.perf_counter()
+        await processor.process_update(_update(2), _handle(log, "b", 0.01))
+        elapsed = time.perf_counter() - started
+        await asyncio.gather(*busy)
+        return log, elapsed
+
+    log, elapsed = asyncio.run(scenario())
+    # Le chat 2 n'attend pas les 6 × 0,2 s du chat 1
+    assert elapsed < 0.15
+    assert log.index("b") < log.index("a1")
+    assert [name for name in log if name != "b"] == [f"a{i}" for i in range(6)]
+
+
+def test_concurrency_is_bounded_across_chats():
+    async def scenario():
+        processor = PerChatUpdateProcessor(2)
+        running = peak = 0
+
+        async def handle():
+            nonlocal running, peak
+            running += 1
+            peak = max(peak, running)
+            await asyncio.sleep(0.01)
+            running -= 1
+
+        await asyncio.gather(*(processor.process_update(_update(chat_id), handle()) for chat_id in range(6)))
+        return peak
+
+    assert asyncio.run(scenario()) == 2
+
+
+def test_update_without_chat_is_processed():
+    async def scenario():
+        processor = PerChatUpdateProcessor(1)
+        log = []
+        await processor.process_update(SimpleNamespace(), _handle(log, "poll", 0))
+        return log
+
+    assert asyncio.run(scenario()) == ["poll"]
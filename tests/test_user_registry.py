@@ -0,0 +1,122 @@
+import asyncio
+import json
+import threading
+import time
+from types import SimpleNamespace
+
+import pytest
+
+pytest.importorskip("pytz")
+
+from users import registry as registry_module
+from users.registry import UserRegistry
+
+
+def _user(user_id, username=None):
+    return SimpleNamespace(id=user_id, username=username or f"user{user_id}", first_name="Prénom", last_name=None)
+
+
+class _Backend:
+    def __init__(self):
+        self.rows = {}
+        self.fail = False
+
+    def load_users(self):
+        return {}
+
+    def save_users(self, rows):
+        if self.fail:
+            raise OSError("base verrouillée")
+        self.rows.update(rows)
+
+
+def test_json_flush_writes_every_user(tmp_path):
+    path = tmp_path / "users.json"
+    registry = UserRegistry(str(path))
+    registry.touch(_user(1))
+    registry.touch(_user(2))
+    assert registry.dirty_count == 2
+
+    asyncio.run(registry.flush())
+    assert registry.dirty_count == 0
+    with open(path, encoding="utf-8") as f:
+        data = json.load(f)
+    assert sorted(data) == ["1", "2"]
+    assert data["1"]["username"] == "user1"
+
+    assert UserRegistry(str(path)).users == data
+
+
+def test_json_is_serialized_off_the_event_loop(tmp_path, monkeypatch):
+    threads = []
+    dumps = registry_module.json.dumps
+
+    def spy(*args, **kwargs):
+        threads.append(threading.current_thread())
+        return dumps(*args, **kwargs)
+
+    monkeypatch.setattr(registry_module.json, "dumps", spy)
+    registry = UserRegistry(str(tmp_path / "users.json"))
+    registry.touch(_user(1))
+    asyncio.run(registry.flush())
+    assert threads and threading.main_thread() not in threads
+
+
+def test_backend_receives_only_dirty_rows():
+    backend = _Backend()
+    registry = UserRegistry(backend=backend)
+    registry.touch(_user(1))
+    registry.touch(_user(2))
+    asyncio.run(registry.flush())
+    registry.touch(_user(2, "renommé"))
+    asyncio.run(registry.flush())
+    assert backend.rows["2"]["username"] == "renommé"
+    assert sorted(backend.rows) == ["1", "2"]
+
+
+def test_failed_flush_keeps_users_pending():
+    backend = _Backend()
+    registry = UserRegistry(backend=backend)
+    registry.touch(_user(1))
+
+    backend.fail = True
+    registry.flush_now()
+    asyncio.run(registry.flush())
+    assert registry.dirty_count == 1
+    assert backend.rows == {}
+
+    backend.fail = False
+    asyncio.run(registry.flush())
+    assert registry.dirty_count == 0
+    assert list(backend.rows) == ["1"]
+
+
+def test_stop_waits_for_the_write_in_progress(tmp_path):
+    path = tmp_path / "users.json"
+    registry = UserRegistry(str(path), flush_interval=60, flush_threshold=1)
+    write = registry._write
+    started = threading.Event()
+    active = []
+
+    def slow_write(data):
+        active.append(1)
+        assert len(active) == 1, "deux écritures simultanées"
+        started.set()
+        time.sleep(0.2)
+        write(data)
+        active.pop()
+
+    registry._write = slow_write
+
+    async def scenario():
+        await registry.start()
+        registry.touch(_user(1))
+        while not started.is_set():
+            await asyncio.sleep(0.01)
+        registry.touch(_user(2))
+        await registry.stop()
+
+    asyncio.run(scenario())
+    with open(path, encoding="utf-8") as f:
+        assert sorted(json.load(f)) == ["1", "2"]
+    assert not (tmp_path / "users.json.tmp").exists()
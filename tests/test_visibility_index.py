@@ -0,0 +1,66 @@
+from modules.visibility_index import VisibilityIndex
+
+VIP = 42
+GUEST = 7
+
+
+def _index():
+    catalog = {
+        "Fleurs": [
+            {"id": 1, "name": "Rose"},
+            {"id": 2, "name": "vip_Orchidée"},
+            {"id": 3, "name": "Iris"},
+            {"id": 4, "name": "vip_Lys"},
+        ]
+    }
+    index = VisibilityIndex(catalog)
+    index.set_groups({"vip": [VIP]})
+    return catalog, index
+
+
+def test_group_products_are_only_visible_to_members():
+    _, index = _index()
+    assert index.visible("Fleurs", GUEST)[0] == [1, 3]
+    assert index.visible("Fleurs")[0] == [1, 3]
+    ids, positions = index.visible("Fleurs", VIP)
+    assert ids == [1, 2, 3, 4]
+    assert positions[3] == 2
+
+
+def test_siblings_skip_products_of_other_groups():
+    _, index = _index()
+    assert index.siblings("Fleurs", 1, GUEST) == (None, 3)
+    assert index.siblings("Fleurs", 3, GUEST) == (1, None)
+
+    assert index.siblings("Fleurs", 1, VIP) == (None, 2)
+    assert index.siblings("Fleurs", 2, VIP) == (1, 3)
+    assert index.siblings("Fleurs", 4, VIP) == (3, None)
+
+
+def test_hidden_product_offers_the_first_visible_one():
+    _, index = _index()
+    assert index.siblings("Fleurs", 2, GUEST) == (None, 1)
+    assert index.siblings("Vide", 1, GUEST) == (None, None)
+
+
+def test_group_changes_rebuild_the_lists():
+    _, index = _index()
+    assert index.siblings("Fleurs", 1, GUEST) == (None, 3)
+
+    groups = {"vip": [VIP, GUEST]}
+    assert index.set_groups(groups)
+    assert not index.set_groups(groups)
+    assert not index.set_groups({"vip": [VIP, GUEST]})
+    assert index.siblings("Fleurs", 1, GUEST) == (None, 2)
+
+
+def test_catalog_changes_need_invalidation():
+    catalog, index = _index()
+    assert index.visible("Fleurs", GUEST)[0] == [1, 3]
+
+    catalog["Fleurs"].insert(1, {"id": 5, "name": "Tulipe"})
+    assert index.visible("Fleurs", GUEST)[0] == [1, 3]
+
+    index.invalidate("Fleurs")
+    assert index.visible("Fleurs", GUEST)[0] == [1, 5, 3]
+    assert index.siblings("Fleurs", 5, VIP) == (1, 2)
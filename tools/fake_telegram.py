@@ -0,0 +1,337 @@
+"""Faux serveur de l'API Telegram et injecteur d'updates pour tester le bot hors ligne
+
+Usage :
+    python tools/fake_telegram.py serve --port 8081
+        Démarre une fausse API Bot. Dans config/config.json :
+        "bot_api_base_url": "http://127.0.0.1:8081"
+
+    python tools/fake_telegram.py post --url http://127.0.0.1:8443/telegram --secret <secret_token>
+        Envoie des updates (messages /start et clics sur des boutons) au webhook du bot
+        et affiche le débit et la latence des réponses.
+
+Uniquement la bibliothèque standard : aucune dépendance à installer.
+"""
+import argparse
+import asyncio
+import itertools
+import json
+import random
+import sys
+import time
+from collections import Counter, deque
+from urllib.parse import parse_qsl, urlsplit
+
+BOT_USER = {"id": 1, "is_bot": True, "first_name": "FakeBot", "username": "fake_bot",
+            "can_join_groups": False, "can_read_all_group_messages": False, "supports_inline_queries": False}
+
+MESSAGE_METHODS = {
+    "sendmessage", "editmessagetext", "sendphoto", "sendvideo", "senddocument", "sendanimation",
+    "editmessagecaption", "editmessagemedia", "editmessagereplymarkup", "forwardmessage"
+}
+
+
+def _user(user_id: int) -> dict:
+    return {"id": user_id, "is_bot": False, "first_name": f"User{user_id}", "username": f"user{user_id}"}
+
+
+def message_update(update_id: int, user_id: int, text: str, message_id: int = None) -> dict:
+    """Update contenant un message texte (commande si le texte commence par /)"""
+    message = {
+        "message_id": message_id or update_id,
+        "date": int(time.time()),
+        "chat": {"id": user_id, "type": "private"},
+        "from": _user(user_id),
+        "text": text
+    }
+    if text.startswith('/'):
+        message["entities"] = [{"type": "bot_command", "offset": 0, "length": len(text.split()[0])}]
+    return {"update_id": update_id, "message": message}
+
+
+def callback_update(update_id: int, user_id: int, data: str, message_id: int = 1) -> dict:
+    """Update correspondant à un clic sur un bouton inline"""
+    return {
+        "update_id": update_id,
+        "callback_query": {
+            "id": str(update_id),
+            "from": _user(user_id),
+            "chat_instance": str(user_id),
+            "data": data,
+            "message": {
+                "message_id": message_id,
+                "date": int(time.time()),
+                "chat": {"id": user_id, "type": "private"},
+                "from": BOT_USER,
+                "text": "menu"
+            }
+        }
+    }
+
+
+async def _read_request(reader):
+    """Lit une requête HTTP/1.1. Retourne (méthode, chemin, en-têtes, corps) ou None à la fermeture"""
+    request_line = await reader.readline()
+    if not request_line.strip():
+        return None
+    method, path, _ = request_line.decode('latin-1').split(' ', 2)
+    headers = {}
+    while True:
+        line = await reader.readline()
+        if line in (b'\r\n', b'\n', b''):
+            break
+        name, value = line.decode('latin-1').split(':', 1)
+        headers[name.strip().lower()] = value.strip()
+    body = await reader.readexactly(int(headers.get('content-length', 0)))
+    return method, path, headers, body
+
+
+def _response(status: int, payload, reason: str = "OK") -> bytes:
+    data = json.dumps(payload).encode()
+    head = (
+        f"HTTP/1.1 {status} {reason}\r\n"
+        f"Content-Type: application/json\r\n"
+        f"Content-Length: {len(data)}\r\n"
+        f"Connection: keep-alive\r\n\r\n"
+    )
+    return head.encode() + data
+
+
+class FakeBotAPI:
+    """Fausse API Bot : répond à chaque méthode avec un résultat plausible et compte les appels
+
+    Les updates ajoutés avec `push_update()` sont servis par getUpdates, ce qui permet
+    aussi de tester le mode polling.
+    """
+
+    def __init__(self, host: str = '127.0.0.1', port: int = 8081, latency: float = 0.0):
+        self.host = host
+        self.port = port
+        self.latency = latency
+        self.calls = Counter()
+        self.bytes_received = 0
+        self.pending_updates = deque()
+        self._updates_event = asyncio.Event()
+        self._message_ids = itertools.count(1000)
+        self._server = None
+
+    @property
+    def base_url(self) -> str:
+        return f"http://{self.host}:{self.port}"
+
+    def push_update(self, update: dict) -> None:
+        self.pending_updates.append(update)
+        self._updates_event.set()
+
+    async def start(self) -> None:
+        self._server = await asyncio.start_server(self._handle, self.host, self.port)
+        if self.port == 0:
+            self.port = self._server.sockets[0].getsockname()[1]
+
+    async def stop(self) -> None:
+        if self._server is not None:
+            self._server.close()
+            await self._server.wait_closed()
+            self._server = None
+
+    def _params(self, headers: dict, body: bytes) -> dict:
+        content_type = headers.get('content-type', '')
+        if content_type.startswith('application/json'):
+            return json.loads(body or b'{}')
+        if content_type.startswith('application/x-www-form-urlencoded'):
+            params = {}
+            for key, value in parse_qsl(body.decode()):
+                try:
+                    params[key] = json.loads(value)
+                except ValueError:
+                    params[key] = value
+            return params
+        # multipart (envoi de fichiers) : les paramètres ne sont pas nécessaires pour répondre
+        return {}
+
+    def _message(self, params: dict) -> dict:
+        message = {
+            "message_id": next(self._message_ids),
+            "date": int(time.time()),
+            "chat": {"id": int(params.get('chat_id') or 1), "type": "private"},
+            "from": BOT_USER
+        }
+        if 'text' in params:
+            message["text"] = str(params['text'])
+        if 'caption' in params:
+            message["caption"] = str(params['caption'])
+        return message
+
+    async def _get_updates(self, params: dict) -> list:
+        offset = int(params.get('offset') or 0)
+        while self.pending_updates and self.pending_updates[0]['update_id'] < offset:
+            self.pending_updates.popleft()
+        if not self.pending_updates:
+            self._updates_event.clear()
+            try:
+                await asyncio.wait_for(self._updates_event.wait(), timeout=min(float(params.get('timeout') or 0), 1.0))
+            except asyncio.TimeoutError:
+                pass
+        limit = int(params.get('limit') or 100)
+        return list(itertools.islice(self.pending_updates, limit))
+
+    async def dispatch(self, bot_method: str, params: dict):
+        name = bot_method.lower()
+        if name == 'getme':
+            return BOT_USER
+        if name == 'getupdates':
+            return await self._get_updates(params)
+        if name in MESSAGE_METHODS:
+            return self._message(params)
+        if name == 'sendmediagroup':
+            return [self._message(params) for _ in params.get('media', [None])]
+        if name == 'copymessage':
+            return {"message_id": next(self._message_ids)}
+        if name == 'getfile':
+            file_id = params.get('file_id', 'file')
+            return {"file_id": file_id, "file_unique_id": f"u{file_id}", "file_size": 1, "file_path": f"files/{file_id}"}
+        if name == 'getwebhookinfo':
+            return {"url": "", "has_custom_certificate": False, "pending_update_count": 0}
+        return True
+
+    async def _handle(self, reader, writer):
+        try:
+            while True:
+                request = await _read_request(reader)
+                if request is None:
+                    break
+                _, path, headers, body = request
+                self.bytes_received += len(body)
+                bot_method = path.rstrip('/').rsplit('/', 1)[-1]
+                self.calls[bot_method] += 1
+                if self.latency:
+                    await asyncio.sleep(self.latency)
+                result = await self.dispatch(bot_method, self._params(headers, body))
+                writer.write(_response(200, {"ok": True, "result": result}))
+                await writer.drain()
+        except (asyncio.IncompleteReadError, ConnectionResetError):
+            pass
+        except asyncio.CancelledError:
+            # Arrêt du serveur pendant une requête (long polling de getUpdates) : fermeture sans trace
+            pass
+        finally:
+            writer.close()
+
+
+def _percentile(values: list, fraction: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * fraction))]
+
+
+async def post_updates(url: str, updates, secret_token: str = None, concurrency: int = 10) -> dict:
+    """Envoie les updates au webhook avec `concurrency` connexions et mesure les latences"""
+    target = urlsplit(url)
+    host, port = target.hostname, target.port or 80
+    path = target.path or '/'
+    queue = deque(updates)
+    latencies = []
+    statuses = Counter()
+
+    async def worker():
+        reader, writer = await asyncio.open_connection(host, port)
+        try:
+            while queue:
+                body = json.dumps(queue.popleft()).encode()
+                head = (
+                    f"POST {path} HTTP/1.1\r\nHost: {host}:{port}\r\n"
+                    f"Content-Type: application/json\r\nContent-Length: {len(body)}\r\n"
+                )
+                if secret_token:
+                    head += f"X-Telegram-Bot-Api-Secret-Token: {secret_token}\r\n"
+                started = time.perf_counter()
+                writer.write(head.encode() + b"\r\n" + body)
+                await writer.drain()
+
+                status_line = await reader.readline()
+                headers = {}
+                while True:
+                    line = await reader.readline()
+                    if line in (b'\r\n', b'\n', b''):
+                        break
+                    name, value = line.decode('latin-1').split(':', 1)
+                    headers[name.strip().lower()] = value.strip()
+                await reader.readexactly(int(headers.get('content-length', 0)))
+                latencies.append(time.perf_counter() - started)
+                statuses[int(status_line.split()[1])] += 1
+        finally:
+            writer.close()
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(max(1, min(concurrency, len(queue))))))
+    elapsed = time.perf_counter() - started
+
+    return {
+        "updates": len(latencies),
+        "seconds": elapsed,
+        "updates_per_second": len(latencies) / elapsed if elapsed else 0.0,
+        "p50_ms": _percentile(latencies, 0.50) * 1000,
+        "p99_ms": _percentile(latencies, 0.99) * 1000,
+        "statuses": dict(statuses)
+    }
+
+
+def generate_updates(count: int, users: int, callbacks=("show_categories", "back_to_home"), seed: int = 0) -> list:
+    """Mélange reproductible de /start et de clics répartis sur `users` utilisateurs"""
+    rng = random.Random(seed)
+    updates = []
+    for update_id in range(1, count + 1):
+        user_id = 100000 + rng.randrange(users)
+        if rng.random() < 0.2:
+            updates.append(message_update(update_id, user_id, "/start"))
+        else:
+            updates.append(callback_update(update_id, user_id, rng.choice(callbacks)))
+    return updates
+
+
+async def _serve(args):
+    api = FakeBotAPI(args.host, args.port, latency=args.latency)
+    await api.start()
+    print(f"Fausse API Telegram sur {api.base_url} (Ctrl+C pour arrêter)")
+    try:
+        while True:
+            await asyncio.sleep(10)
+            if api.calls:
+                print(f"Appels reçus : {dict(api.calls)}")
+    finally:
+        await api.stop()
+
+
+async def _post(args):
+    updates = generate_updates(args.count, args.users, seed=args.seed)
+    result = await post_updates(args.url, updates, args.secret, args.concurrency)
+    print(json.dumps(result, indent=4))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    serve = commands.add_parser('serve', help="démarre une fausse API Bot")
+    serve.add_argument('--host', default='127.0.0.1')
+    serve.add_argument('--port', type=int, default=8081)
+    serve.add_argument('--latency', type=float, default=0.0, help="délai ajouté à chaque réponse (secondes)")
+
+    post = commands.add_parser('post', help="envoie des updates au webhook du bot")
+    post.add_argument('--url', default='http://127.0.0.1:8443/telegram')
+    post.add_argument('--secret', default=None)
+    post.add_argument('--count', type=int, default=1000)
+    post.add_argument('--users', type=int, default=50)
+    post.add_argument('--concurrency', type=int, default=20)
+    post.add_argument('--seed', type=int, default=0)
+
+    args = parser.parse_args()
+    try:
+        asyncio.run(_serve(args) if args.command == 'serve' else _post(args))
+    except KeyboardInterrupt:
+        pass
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,265 @@
+"""Génère un jeu de données synthétique et reproductible pour les tests à grande échelle
+
+Usage :
+    python tools/generate_fixtures.py --out fixtures/large --categories 50 --products 200 --media 5 \\
+        --users 1000000 --codes 100000 --stats-views 5000000 --seed 42
+
+Écrit dans le dossier --out, avec la même arborescence que le bot :
+    config/catalog.json    N catégories × M produits × K médias (photos et vidéos)
+    data/users.json        utilisateurs, écrits au fil de l'eau (des millions possibles)
+    data/access_codes.json codes d'accès, utilisateurs autorisés et bannis, groupes
+    data/stats.json        vues par catégorie et par produit (avec --stats-views)
+
+À graine égale, les fichiers produits sont identiques octet pour octet. Pour lancer le
+bot dessus, copiez config/config.json dans le dossier et démarrez-le depuis ce dossier
+(tools/migrate_to_sqlite.py y fonctionne aussi pour tester le stockage SQLite).
+"""
+import argparse
+import json
+import os
+import random
+import string
+import sys
+from datetime import datetime, timedelta
+
+# Date de référence fixe : les dates générées ne dépendent pas du jour de l'exécution
+BASE_DATE = datetime(2025, 1, 1)
+FIRST_USER_ID = 100000
+CODE_ALPHABET = string.ascii_uppercase + string.digits
+SOLD_OUT_PRODUCT = {
+    'name': 'SOLD OUT ! ❌',
+    'price': 'Non disponible',
+    'description': 'Cette catégorie est temporairement en rupture de stock.',
+    'media': []
+}
+
+WORDS = (
+    "alpha", "bravo", "citron", "delta", "écho", "fraise", "gamma", "hibiscus", "iris", "jade",
+    "kiwi", "lotus", "mangue", "néroli", "olive", "pêche", "quartz", "rubis", "safran", "topaze"
+)
+
+
+def _words(rng: random.Random, count: int) -> str:
+    return " ".join(rng.choice(WORDS) for _ in range(count))
+
+
+def group_names(groups: int) -> list:
+    return [f"groupe{g + 1}" for g in range(groups)]
+
+
+def generate_catalog(categories: int, products: int, media: int, seed: int = 0, video_ratio: float = 0.2,
+                     sold_out_ratio: float = 0.0, groups: int = 0, restricted_ratio: float = 0.0) -> dict:
+    """Catalogue de `categories` × `products` produits ayant chacun `media` médias
+
+    Une part `sold_out_ratio` des catégories ne contient que le produit SOLD OUT, et une
+    part `restricted_ratio` des produits est réservée à un groupe (nom préfixé "<groupe>_").
+    """
+    rng = random.Random(seed)
+    names = group_names(groups)
+    catalog = {}
+    for c in range(categories):
+        category = f"Catégorie {c + 1:0{len(str(categories))}d} {rng.choice(WORDS).capitalize()}"
+        if rng.random() < sold_out_ratio:
+            catalog[category] = [dict(SOLD_OUT_PRODUCT)]
+            continue
+
+        items = []
+        for p in range(products):
+            name = f"{_words(rng, rng.randint(1, 3)).capitalize()} {c + 1}.{p + 1}"
+            if names and rng.random() < restricted_ratio:
+                name = f"{rng.choice(names)}_{name}"
+            items.append({
+                'name': name,
+                'price': f"{rng.randint(5, 500)} €",
+                'description': _words(rng, rng.randint(5, 40)),
+                'media': [
+                    {
+                        'media_id': f"{'video' if is_video else 'photo'}-{c}-{p}-{m}",
+                        'media_type': 'video' if is_video else 'photo',
+                        'order_index': m + 1
+                    }
+                    for m, is_video in ((m, rng.random() < video_ratio) for m in range(media))
+                ]
+            })
+        catalog[category] = items
+    return catalog
+
+
+def iter_users(count: int, seed: int = 0, first_id: int = FIRST_USER_ID):
+    """(identifiant, fiche) de `count` utilisateurs, sans tout garder en mémoire"""
+    rng = random.Random(seed)
+    for i in range(count):
+        user_id = first_id + i
+        last_seen = BASE_DATE - timedelta(seconds=rng.randrange(365 * 86400))
+        yield user_id, {
+            'username': f"user{user_id}" if rng.random() < 0.7 else None,
+            'first_name': rng.choice(WORDS).capitalize(),
+            'last_name': rng.choice(WORDS).capitalize() if rng.random() < 0.3 else None,
+            'last_seen': last_seen.strftime("%Y-%m-%d %H:%M:%S")
+        }
+
+
+def write_users(path: str, count: int, seed: int = 0, first_id: int = FIRST_USER_ID) -> None:
+    """Écrit users.json au format du bot (indentation 4) au fil de l'eau"""
+    _makedirs(path)
+    with open(path, 'w', encoding='utf-8') as f:
+        f.write('{')
+        for i, (user_id, entry) in enumerate(iter_users(count, seed, first_id)):
+            f.write(',\n    ' if i else '\n    ')
+            f.write(f'"{user_id}": ')
+            f.write(json.dumps(entry, ensure_ascii=False, indent=4).replace('\n', '\n    '))
+        f.write('\n}' if count else '}')
+
+
+def generate_access_codes(users: int, seed: int = 0, first_id: int = FIRST_USER_ID, codes: int = 0,
+                          authorized_ratio: float = 1.0, banned_ratio: float = 0.0, groups: int = 0,
+                          admin_id: int = 1) -> dict:
+    """Contenu de access_codes.json pour les utilisateurs first_id .. first_id + users - 1
+
+    L'admin est toujours autorisé. Chaque groupe reçoit environ 1 % des utilisateurs autorisés.
+    """
+    rng = random.Random(seed)
+    authorized = [admin_id]
+    banned = []
+    members = {name: [] for name in group_names(groups)}
+    for user_id in range(first_id, first_id + users):
+        if rng.random() >= authorized_ratio:
+            continue
+        if rng.random() < banned_ratio:
+            banned.append(user_id)
+            continue
+        authorized.append(user_id)
+        if members and rng.random() < 0.01:
+            members[rng.choice(list(members))].append(user_id)
+
+    generated = set()
+    code_list = []
+    while len(code_list) < codes:
+        code = ''.join(rng.choices(CODE_ALPHABET, k=8))
+        if code in generated:
+            continue
+        generated.add(code)
+        code_list.append({
+            "code": code,
+            "expiration": (BASE_DATE + timedelta(hours=rng.randint(-720, 72))).isoformat(),
+            "created_by": admin_id,
+            "used": rng.random() < 0.5
+        })
+
+    data = {
+        "codes": code_list,
+        "authorized_users": authorized,
+        "banned_users": banned,
+        "is_enabled": True
+    }
+    if members:
+        data["groups"] = members
+    return data
+
+
+def generate_stats(catalog: dict, total_views: int, seed: int = 0) -> dict:
+    """Vues réparties selon une loi de puissance : quelques produits concentrent la plupart des vues"""
+    rng = random.Random(seed)
+    products = [
+        (category, product['name'])
+        for category, items in catalog.items() for product in items
+        if product['name'] != SOLD_OUT_PRODUCT['name']
+    ]
+    weights = [1.0 / (rank + 1) for rank in range(len(products))]
+    rng.shuffle(products)
+
+    product_views = {}
+    category_views = {}
+    if products and total_views:
+        for (category, name), views in zip(products, _split(rng, total_views, weights)):
+            if views:
+                product_views.setdefault(category, {})[name] = views
+                category_views[category] = category_views.get(category, 0) + views // 4
+
+    return {
+        "total_views": total_views,
+        "category_views": category_views,
+        "product_views": product_views,
+        "last_updated": BASE_DATE.strftime("%Y-%m-%d %H:%M:%S"),
+        "last_reset": (BASE_DATE - timedelta(days=30)).strftime("%Y-%m-%d")
+    }
+
+
+def _split(rng: random.Random, total: int, weights: list) -> list:
+    """Partage `total` proportionnellement aux poids, avec un léger bruit, sans perte d'unités"""
+    noisy = [weight * rng.uniform(0.5, 1.5) for weight in weights]
+    scale = total / sum(noisy)
+    shares = [int(weight * scale) for weight in noisy]
+    shares[0] += total - sum(shares)
+    return shares
+
+
+def _makedirs(path: str) -> None:
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+
+
+def write_json(path: str, data) -> None:
+    _makedirs(path)
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(data, f, ensure_ascii=False, indent=4)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--out', default='fixtures', help="dossier de sortie")
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--categories', type=int, default=20)
+    parser.add_argument('--products', type=int, default=50, help="produits par catégorie")
+    parser.add_argument('--media', type=int, default=3, help="médias par produit")
+    parser.add_argument('--video-ratio', type=float, default=0.2)
+    parser.add_argument('--sold-out', type=float, default=0.0, help="part des catégories en rupture")
+    parser.add_argument('--groups', type=int, default=0, help="groupes d'accès")
+    parser.add_argument('--restricted', type=float, default=0.1, help="part des produits réservés à un groupe")
+    parser.add_argument('--users', type=int, default=10000)
+    parser.add_argument('--first-user-id', type=int, default=FIRST_USER_ID)
+    parser.add_argument('--authorized', type=float, default=0.9, help="part des utilisateurs autorisés")
+    parser.add_argument('--banned', type=float, default=0.01, help="part des autorisés qui sont bannis")
+    parser.add_argument('--codes', type=int, default=1000, help="codes d'accès")
+    parser.add_argument('--admin-id', type=int, default=1)
+    parser.add_argument('--stats-views', type=int, default=0, help="vues totales de data/stats.json (0 : pas de fichier)")
+    parser.add_argument('--force', action='store_true', help="écrase les fichiers existants")
+    args = parser.parse_args()
+
+    paths = {
+        'catalog': os.path.join(args.out, 'config', 'catalog.json'),
+        'users': os.path.join(args.out, 'data', 'users.json'),
+        'access_codes': os.path.join(args.out, 'data', 'access_codes.json'),
+        'stats': os.path.join(args.out, 'data', 'stats.json'),
+    }
+    existing = [path for path in paths.values() if os.path.exists(path)]
+    if existing and not args.force:
+        print(f"Fichiers déjà présents : {', '.join(existing)}. Relancez avec --force pour les remplacer.")
+        return 1
+
+    # Une graine dérivée par fichier : changer la taille d'un fichier ne modifie pas les autres
+    catalog = generate_catalog(
+        args.categories, args.products, args.media, args.seed, args.video_ratio,
+        args.sold_out, args.groups, args.restricted
+    )
+    write_json(paths['catalog'], catalog)
+    write_users(paths['users'], args.users, args.seed + 1, args.first_user_id)
+    write_json(paths['access_codes'], generate_access_codes(
+        args.users, args.seed + 2, args.first_user_id, args.codes,
+        args.authorized, args.banned, args.groups, args.admin_id
+    ))
+    if args.stats_views:
+        write_json(paths['stats'], generate_stats(catalog, args.stats_views, args.seed + 3))
+    elif os.path.exists(paths['stats']):
+        os.remove(paths['stats'])
+
+    print(f"Jeu de données généré dans {args.out} (graine {args.seed}) :")
+    for name, path in paths.items():
+        if os.path.exists(path):
+            print(f"  {name}: {path} ({os.path.getsize(path) / 1024 / 1024:.1f} Mo)")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
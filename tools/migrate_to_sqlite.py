@@ -0,0 +1,38 @@
+"""Migration unique des fichiers JSON vers la base SQLite
+
+Usage : python tools/migrate_to_sqlite.py [--force]
+
+Lit config/config.json pour trouver le catalogue et la base (`sqlite_file`, par
+défaut data/bot.db). Ajoutez ensuite "storage_backend": "sqlite" dans config.json.
+"""
+import json
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from modules.sqlite_store import SQLiteStore, migrate_from_json
+
+
+def main():
+    with open('config/config.json', 'r', encoding='utf-8') as f:
+        config = json.load(f)
+
+    store = SQLiteStore(config.get('sqlite_file', 'data/bot.db'))
+    if not store.is_empty() and '--force' not in sys.argv:
+        print(f"La base {store.path} contient déjà des données. Relancez avec --force pour réimporter.")
+        store.close()
+        return 1
+
+    counts = migrate_from_json(store, config['catalog_file'])
+    store.close()
+
+    print(f"Migration terminée vers {store.path} :")
+    for name, count in counts.items():
+        print(f"  {name}: {count}")
+    print('Activez la base avec "storage_backend": "sqlite" dans config/config.json')
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,176 @@
+import logging
+import json
+import os
+import asyncio
+import threading
+import pytz
+from datetime import datetime
+
+logger = logging.getLogger(__name__)
+
+paris_tz = pytz.timezone('Europe/Paris')
+
+
+class UserRegistry:
+    """Registre des utilisateurs gardé en mémoire avec écriture différée sur disque
+
+    Avec un `backend` SQLite, seuls les utilisateurs modifiés sont écrits (une ligne chacun)
+    au lieu du fichier complet.
+    """
+
+    def __init__(self, users_file: str = 'data/users.json', flush_interval: float = 30.0, flush_threshold: int = 50,
+                 backend=None, executor=None):
+        self.users_file = users_file
+        self.flush_interval = flush_interval
+        self.flush_threshold = flush_threshold
+        self.backend = backend
+        self.executor = executor
+        self.users = self._load_users()
+        self._dirty = set()
+        self._wakeup = None
+        self._flush_task = None
+        self._writing = None
+        # flush_now() (boucle) et flush() (thread d'E/S) écrivent le même fichier temporaire
+        self._write_lock = threading.Lock()
+
+    def _load_users(self):
+        """Charge les utilisateurs depuis le fichier"""
+        if self.backend is not None:
+            return self.backend.load_users()
+        try:
+            with open(self.users_file, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return {}
+        except json.JSONDecodeError as e:
+            logger.error(f"Erreur de décodage du fichier utilisateurs : {e}")
+            return {}
+
+    def touch(self, user) -> None:
+        """Met à jour un utilisateur en mémoire et le marque comme modifié"""
+        user_id = str(user.id)
+        last_seen = datetime.now(paris_tz).strftime("%Y-%m-%d %H:%M:%S")
+
+        entry = self.users.get(user_id)
+        if entry is None:
+            self.users[user_id] = {
+                'username': user.username,
+                'first_name': user.first_name,
+                'last_name': user.last_name,
+                'last_seen': last_seen
+            }
+        else:
+            # Les mises à jour successives de last_seen sont fusionnées en une seule écriture
+            entry['username'] = user.username
+            entry['first_name'] = user.first_name
+            entry['last_name'] = user.last_name
+            entry['last_seen'] = last_seen
+
+        self._dirty.add(user_id)
+        if self._wakeup and len(self._dirty) >= self.flush_threshold:
+            self._wakeup.set()
+
+    @property
+    def dirty_count(self) -> int:
+        return len(self._dirty)
+
+    def _write(self, data):
+        """Écrit le fichier de manière atomique (fichier temporaire + renommage)
+
+        La sérialisation JSON se fait ici, donc dans le thread d'E/S pour flush().
+        """
+        if self.backend is not None:
+            self.backend.save_users(data)
+            return
+        tmp_file = f"{self.users_file}.tmp"
+        with self._write_lock:
+            with open(tmp_file, 'w', encoding='utf-8') as f:
+                f.write(json.dumps(data, indent=4, ensure_ascii=False))
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(tmp_file, self.users_file)
+
+    def _snapshot(self):
+        """Capture l'état courant et remet à zéro les modifications en attente
+
+        Retourne (identifiants modifiés, données) ou None : en cas d'échec de l'écriture,
+        les identifiants sont remis en attente par _write_failed(). En JSON, seule une copie
+        superficielle du registre est faite ici ; un utilisateur modifié pendant l'écriture
+        est de nouveau marqué et sera réécrit au passage suivant.
+        """
+        if not self._dirty:
+            return None
+        dirty = self._dirty
+        self._dirty = set()
+        if self.backend is not None:
+            return dirty, {user_id: dict(self.users[user_id]) for user_id in dirty if user_id in self.users}
+        return dirty, dict(self.users)
+
+    def _write_failed(self, dirty, error) -> None:
+        # Le backend SQLite n'écrit que les lignes modifiées : sans cela, elles seraient perdues
+        self._dirty |= dirty
+        logger.error(f"Erreur lors de la sauvegarde des utilisateurs : {error}")
+
+    def flush_now(self) -> None:
+        """Écrit immédiatement les modifications en attente"""
+        snapshot = self._snapshot()
+        if snapshot is None:
+            return
+        dirty, data = snapshot
+        try:
+            self._write(data)
+        except Exception as e:
+            self._write_failed(dirty, e)
+
+    async def _write_async(self, dirty, data) -> None:
+        try:
+            if self.executor is not None:
+                await self.executor.run(self._write, data)
+            else:
+                await asyncio.to_thread(self._write, data)
+        except Exception as e:
+            self._write_failed(dirty, e)
+
+    async def flush(self) -> None:
+        """Écrit les modifications en attente sans bloquer la boucle d'événements"""
+        snapshot = self._snapshot()
+        if snapshot is None:
+            return
+        # Protégée de l'annulation : stop() attend la fin de cette écriture avant l'écriture finale
+        self._writing = asyncio.ensure_future(self._write_async(*snapshot))
+        try:
+            await asyncio.shield(self._writing)
+        finally:
+            if self._writing.done():
+                self._writing = None
+
+    async def _flush_loop(self):
+        while True:
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=self.flush_interval)
+            except asyncio.TimeoutError:
+                pass
+            self._wakeup.clear()
+            await self.flush()
+
+    async def start(self) -> None:
+        """Démarre la tâche d'écriture en arrière-plan"""
+        if self._flush_task is None:
+            self._wakeup = asyncio.Event()
+            self._flush_task = asyncio.create_task(self._flush_loop())
+
+    async def stop(self) -> None:
+        """Arrête la tâche d'arrière-plan et effectue l'écriture finale"""
+        if self._flush_task is not None:
+            self._flush_task.cancel()
+            try:
+                await self._flush_task
+            except asyncio.CancelledError:
+                pass
+            self._flush_task = None
+            self._wakeup = None
+        if self._writing is not None:
+            # Écriture interrompue par l'annulation : le fichier temporaire est encore utilisé
+            await self._writing
+            self._writing = None
+        self.flush_now()